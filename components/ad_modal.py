@@ -6,6 +6,9 @@ from services.scraper import OlxScraper
 from services.delivery import get_delivery_quote_async, DeliveryQuote
 import re
 
+# Um scraper para todos os modais: só guarda headers, e o modal é criado a cada página
+_scraper = OlxScraper()
+
 
 class AdModal:
     def __init__(self, on_update=None):
@@ -14,7 +17,6 @@ class AdModal:
         self.current_ad = None
         self.current_image_index = 0
         self.dots = []
-        self.scraper = OlxScraper()
         self.watch_btn = None
         self.status_changed = False
         # Containers para atualização assíncrona
@@ -31,7 +33,7 @@ class AdModal:
         """Verifica status do anúncio de forma assíncrona"""
         try:
             new_status = await background_tasks.run_cpu_bound(
-                self.scraper.check_ad_status, ad.url
+                _scraper.check_ad_status, ad.url
             )
 
             if new_status is None:
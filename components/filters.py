@@ -1,6 +1,6 @@
 from nicegui import ui
 from typing import Callable
-from services.database import get_distinct_states
+from services.database import get_state_options
 
 
 class Filters:
@@ -25,8 +25,6 @@ class Filters:
             ui.button(icon='search', on_click=lambda: self._set_search_text(self.search_input.value)).props('flat round dense')
 
     def create(self):
-        states = get_distinct_states()
-
         with ui.expansion('Filtros', icon='filter_list').classes('w-full rounded-xl overflow-hidden').props('dense header-class="text-weight-medium"'):
             with ui.row().classes('w-full flex-wrap gap-3 items-center py-2'):
                 self.sort_select = ui.select(
@@ -75,14 +73,9 @@ class Filters:
                     on_change=lambda e: self._set_days(e.value)
                 ).props('dense outlined rounded').classes('min-w-[100px]')
 
-                state_options = {None: 'Todos'}
-                for s in states:
-                    if s:
-                        state_options[s] = s.replace('#', '')
-
                 self.state_select = ui.select(
                     label='Estado',
-                    options=state_options,
+                    options=get_state_options(),
                     value=None,
                     on_change=lambda e: self._set_state(e.value)
                 ).props('dense outlined rounded').classes('min-w-[100px]')
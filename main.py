@@ -1,10 +1,13 @@
+import secrets
 from pathlib import Path
 from nicegui import ui, app
 from fastapi import Request
 from fastapi.responses import JSONResponse
-from services.database import init_db, save_push_subscription
+from services.database import init_db, save_push_subscription, get_setting, set_setting
 from services.scheduler import start_scheduler, stop_scheduler
 from services.notifications import get_vapid_public_key
+from services.scraper import close_shared_scraper
+from services.delivery import close_clients as close_delivery_clients
 from components.navbar import create_navbar
 from pages.home import HomePage
 from pages.watching import WatchingPage
@@ -16,6 +19,12 @@ from pages.notifications import NotificationsPage
 
 init_db()
 
+# Segredo do app.storage.user (estado por navegador, ex.: permissão de notificação)
+STORAGE_SECRET = get_setting('storage_secret')
+if not STORAGE_SECRET:
+    STORAGE_SECRET = secrets.token_urlsafe(32)
+    set_setting('storage_secret', STORAGE_SECRET)
+
 # Servir imagens locais
 IMAGES_DIR = Path(__file__).parent / "data" / "images"
 IMAGES_DIR.mkdir(parents=True, exist_ok=True)
@@ -31,6 +40,8 @@ app.add_static_file(local_file=STATIC_DIR / "service_worker.js", url_path="/sw.j
 ui.add_head_html('''
 <link rel="preconnect" href="https://fonts.googleapis.com">
 <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+<link rel="preconnect" href="https://img.olx.com.br">
+<link rel="dns-prefetch" href="https://img.olx.com.br">
 <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap" rel="stylesheet">
 <link rel="manifest" href="/static/manifest.json">
 <link rel="apple-touch-icon" href="/static/icon-192.png">
@@ -204,8 +215,10 @@ def on_startup():
 
 
 @app.on_shutdown
-def on_shutdown():
+async def on_shutdown():
     stop_scheduler()
+    await close_shared_scraper()
+    await close_delivery_clients()
 
 
 ui.run(
@@ -213,5 +226,6 @@ ui.run(
     favicon='🔍',
     dark=False,
     reload=False,
-    port=8088
+    port=8088,
+    storage_secret=STORAGE_SECRET
 )
@@ -39,7 +39,7 @@ class Search:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Ad:
     id: Optional[int] = None
     url: str = ""
@@ -66,6 +66,11 @@ class Ad:
     watching: bool = False
     status: str = "active"
     cheap_threshold: Optional[float] = None  # Threshold da busca que encontrou o anúncio
+    # Pré-calculados por get_watching_ads(with_history=True)
+    recent_prices: list = field(default_factory=list)
+    variation: float = 0.0
+    distinct_price_count: int = 0
+    last5_display: str = ""  # "R$ 100 → R$ 90 → ..." montado uma vez em from_dict
 
     @classmethod
     def from_dict(cls, data: dict) -> "Ad":
@@ -73,6 +78,10 @@ class Ad:
         if isinstance(images, str):
             images = json.loads(images) if images else []
 
+        recent_prices = data.get("recent_prices") or []
+        if isinstance(recent_prices, str):
+            recent_prices = json.loads(recent_prices)
+
         return cls(
             id=data.get("id"),
             url=data.get("url", ""),
@@ -98,9 +107,17 @@ class Ad:
             seen=bool(data.get("seen", False)),
             watching=bool(data.get("watching", False)),
             status=data.get("status", "active"),
-            cheap_threshold=data.get("cheap_threshold")
+            cheap_threshold=data.get("cheap_threshold"),
+            recent_prices=recent_prices,
+            variation=data.get("variation") or 0.0,
+            distinct_price_count=data.get("distinct_price_count") or 0,
+            last5_display=" → ".join(f"R$ {p}" for p in recent_prices)
         )
 
+    @property
+    def variation_str(self) -> str:
+        return format_variation(self.variation)
+
     @property
     def is_cheap(self) -> bool:
         """Verifica se o preço está abaixo do threshold da busca"""
@@ -188,7 +205,7 @@ class Ad:
         return " > ".join(parts)
 
 
-@dataclass
+@dataclass(slots=True)
 class PriceHistory:
     id: Optional[int] = None
     ad_id: int = 0
@@ -205,11 +222,14 @@ class PriceHistory:
         )
 
 
+_PRICE_TRANS = str.maketrans({".": "", ",": "."})
+
+
 def parse_price_to_float(price_str: str) -> float:
     if not price_str:
         return 0.0
     try:
-        cleaned = price_str.replace(".", "").replace(",", ".").strip()
+        cleaned = price_str.translate(_PRICE_TRANS).strip()
         return float(cleaned)
     except:
         return 0.0
@@ -226,5 +246,9 @@ def calculate_price_variation(history: list[PriceHistory]) -> tuple[float, str]:
         return 0.0, "0%"
 
     variation = ((last_price - first_price) / first_price) * 100
+    return variation, format_variation(variation)
+
+
+def format_variation(variation: float) -> str:
     sign = "+" if variation > 0 else ""
-    return variation, f"{sign}{variation:.0f}%"
+    return f"{sign}{variation:.0f}%"
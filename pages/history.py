@@ -1,7 +1,7 @@
-from nicegui import ui
+from nicegui import ui, background_tasks
 from models import Ad
-from services.database import get_inactive_ads, get_distinct_states
-from services.scheduler import run_status_check_now, get_task_status
+from services.database import get_inactive_ads, get_state_options
+from services.scheduler import run_status_check_now, get_task_status, wait_for_task
 from components.ad_modal import AdModal
 
 
@@ -14,7 +14,6 @@ class HistoryPage:
         self.max_price = None
         self.state = None
         self.search_text = None
-        self.check_timer = None
         self.is_checking = False
         self.last_result = None
 
@@ -61,8 +60,6 @@ class HistoryPage:
         self.refresh()
 
     def _create_filters(self):
-        states = get_distinct_states()
-
         with ui.expansion('Filtros', icon='filter_list').classes('w-full rounded-xl overflow-hidden').props('dense header-class="text-weight-medium"'):
             with ui.row().classes('w-full flex-wrap gap-3 items-center py-2'):
                 self.min_input = ui.number(
@@ -75,14 +72,9 @@ class HistoryPage:
                     on_change=lambda e: self._set_max_price(e.value)
                 ).props('dense outlined rounded prefix="R$"').classes('w-28')
 
-                state_options = {None: 'Todos'}
-                for s in states:
-                    if s:
-                        state_options[s] = s.replace('#', '')
-
                 self.state_select = ui.select(
                     label='Estado',
-                    options=state_options,
+                    options=get_state_options(),
                     value=None,
                     on_change=lambda e: self._set_state(e.value)
                 ).props('dense outlined rounded').classes('min-w-[100px]')
@@ -126,30 +118,32 @@ class HistoryPage:
         self.is_checking = True
         self.last_result = None
         self._rebuild_button()
-        self.check_timer = ui.timer(1.0, self._check_progress)
+        background_tasks.create(self._await_check())
 
-    def _check_progress(self):
-        status = get_task_status('status_check')
-        if not status['running']:
-            if self.check_timer:
-                self.check_timer.cancel()
-                self.check_timer = None
+    async def _await_check(self):
+        """Espera o scheduler avisar o fim da verificação e atualiza a tela uma vez"""
+        status = await wait_for_task('status_check')
+        if not self.button_container:
+            return
+        with self.button_container:
+            self._check_progress(status)
 
-            self.is_checking = False
-            result = status['result']
+    def _check_progress(self, status: dict):
+        self.is_checking = False
+        result = status['result']
 
-            if result and result.get('success'):
-                self.last_result = result
-                deactivated = result.get('deactivated', 0)
-                if deactivated > 0:
-                    ui.notify(f'{deactivated} anúncios marcados como inativos!', type='warning')
-                else:
-                    ui.notify('Nenhum anúncio inativo encontrado', type='info')
-                self.refresh()
-            elif result:
-                ui.notify('Erro ao verificar status', type='negative')
+        if result and result.get('success'):
+            self.last_result = result
+            deactivated = result.get('deactivated', 0)
+            if deactivated > 0:
+                ui.notify(f'{deactivated} anúncios marcados como inativos!', type='warning')
+            else:
+                ui.notify('Nenhum anúncio inativo encontrado', type='info')
+            self.refresh()
+        elif result:
+            ui.notify('Erro ao verificar status', type='negative')
 
-            self._rebuild_button()
+        self._rebuild_button()
 
     def refresh(self):
         if self.container:
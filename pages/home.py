@@ -1,7 +1,7 @@
-from nicegui import ui
+from nicegui import ui, background_tasks
 from models import Ad
-from services.database import get_ads, get_all_searches, get_ads_count_by_search, get_ads_count
-from services.scheduler import run_search_now, get_task_status
+from services.database import get_ads_page, get_all_searches, get_ads_count_by_search, get_ads_count
+from services.scheduler import run_search_now, get_task_status, wait_for_task
 from components.ad_grid import create_ad_grid
 from components.ad_modal import AdModal
 from components.filters import Filters
@@ -19,9 +19,9 @@ class HomePage:
         self.selected_search_id = None
         self.current_filters = {}
         self.tab_buttons = {}
-        self.update_timer = None
         self.current_offset = 0
         self.total_count = 0
+        self.has_more = False
         self.loaded_ads = []
         self.load_more_container = None
         self.is_updating = False
@@ -70,32 +70,33 @@ class HomePage:
         self.is_updating = True
         self.last_result = None
         self._rebuild_button()
-        self.update_timer = ui.timer(1.0, self._check_update_progress)
+        background_tasks.create(self._await_update())
 
-    def _check_update_progress(self):
-        status = get_task_status('search')
-
-        if not status['running']:
-            if self.update_timer:
-                self.update_timer.cancel()
-                self.update_timer = None
+    async def _await_update(self):
+        """Espera o scheduler avisar o fim da busca e atualiza a tela uma vez"""
+        status = await wait_for_task('search')
+        if not self.tabs_container:
+            return
+        with self.tabs_container:
+            self._check_update_progress(status)
 
-            self.is_updating = False
-            result = status['result']
+    def _check_update_progress(self, status: dict):
+        self.is_updating = False
+        result = status['result']
 
-            if result and result.get('success'):
-                self.last_result = result
-                total = result.get('total_new', 0)
-                if total > 0:
-                    ui.notify(f'{total} novos anúncios encontrados!', type='positive')
-                else:
-                    ui.notify('Nenhum anúncio novo encontrado', type='info')
-                self.refresh()
-                self._refresh_tabs()
-            elif result:
-                ui.notify('Erro ao buscar anúncios', type='negative')
+        if result and result.get('success'):
+            self.last_result = result
+            total = result.get('total_new', 0)
+            if total > 0:
+                ui.notify(f'{total} novos anúncios encontrados!', type='positive')
+            else:
+                ui.notify('Nenhum anúncio novo encontrado', type='info')
+            self.refresh()
+            self._refresh_tabs()
+        elif result:
+            ui.notify('Erro ao buscar anúncios', type='negative')
 
-            self._rebuild_button()
+        self._rebuild_button()
 
     def _refresh_tabs(self):
         """Recarrega as tabs com as novas contagens"""
@@ -180,7 +181,7 @@ class HomePage:
                 search_text=self.current_filters.get('search_text')
             )
 
-            ads_data = get_ads(
+            ads_data, self.has_more = get_ads_page(
                 search_id=self.selected_search_id,
                 status=self.current_filters.get('status', 'all'),
                 min_price=self.current_filters.get('min_price'),
@@ -205,7 +206,7 @@ class HomePage:
             self._update_load_more_button()
 
     def _load_more(self):
-        ads_data = get_ads(
+        ads_data, self.has_more = get_ads_page(
             search_id=self.selected_search_id,
             status=self.current_filters.get('status', 'all'),
             min_price=self.current_filters.get('min_price'),
@@ -234,11 +235,12 @@ class HomePage:
     def _update_load_more_button(self):
         if self.load_more_container:
             self.load_more_container.clear()
-            remaining = self.total_count - len(self.loaded_ads)
-            if remaining > 0:
+            # has_more vem da própria página; o total só serve para o texto
+            if self.has_more:
+                remaining = self.total_count - len(self.loaded_ads)
                 with self.load_more_container:
                     ui.button(
-                        f'Carregar mais ({remaining} restantes)',
+                        f'Carregar mais ({remaining} restantes)' if remaining > 0 else 'Carregar mais',
                         on_click=self._load_more
                     ).props('color=primary outline rounded')
 
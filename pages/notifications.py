@@ -1,9 +1,42 @@
-from nicegui import ui
+from nicegui import ui, app
 from models import Ad
 from services.database import get_notification_history, mark_notifications_read, get_ad_by_id
 from components.ad_modal import AdModal
 
 
+_TYPE_CONFIG = {
+    'cheap_ad': {
+        'icon': 'local_offer',
+        'color': 'orange',
+        'label': 'Preço Baixo'
+    },
+    'price_drop': {
+        'icon': 'trending_down',
+        'color': 'blue',
+        'label': 'Preço Caiu'
+    },
+    'price_alert': {
+        'icon': 'notifications_active',
+        'color': 'orange',
+        'label': 'Alerta de Preço'
+    }
+}
+
+# Tipos desconhecidos usam o próprio tipo como label
+_DEFAULT_CONFIG = {
+    'icon': 'notifications',
+    'color': 'grey',
+}
+
+
+# Badge e visibilidade do botão "Ativar" para cada permissão do navegador
+_PERMISSION_STATUS = {
+    'granted': ('Ativo', 'green', False),
+    'denied': ('Bloqueado', 'red', False),
+    'default': ('Inativo', 'orange', True),
+}
+
+
 class NotificationsPage:
     PAGE_SIZE = 20
 
@@ -40,8 +73,12 @@ class NotificationsPage:
                 self.enable_btn = ui.button('Ativar', icon='notifications_active', on_click=self._request_permission).props('color=primary rounded')
                 self.enable_btn.set_visibility(False)
 
-        # Verificar status atual
-        ui.timer(0.5, self._check_status, once=True)
+        # Permissão já conhecida neste navegador: pinta o status sem esperar o JS,
+        # mas consulta o navegador a cada conexão (pode ter mudado nas configurações)
+        permission = app.storage.user.get('notif_permission')
+        if permission:
+            self._update_status({'supported': permission != 'unsupported', 'permission': permission})
+        ui.context.client.on_connect(self._check_status)
 
     async def _check_status(self):
         try:
@@ -56,32 +93,32 @@ class NotificationsPage:
                     };
                 })();
             ''', timeout=5.0)
+            supported = bool(result and result.get('supported'))
+            app.storage.user['notif_permission'] = result.get('permission') if supported else 'unsupported'
             self._update_status(result)
         except Exception:
-            self.status_badge.text = 'Erro'
-            self.status_badge.props('color=grey')
+            # Sem resposta do navegador: mantém o status em cache, se houver
+            if not app.storage.user.get('notif_permission'):
+                self._set_status('Erro', 'grey', False)
 
     def _update_status(self, result):
         if not result or not result.get('supported'):
-            self.status_badge.text = 'Não suportado'
-            self.status_badge.props('color=grey')
+            self._set_status('Não suportado', 'grey', False)
             return
 
         permission = result.get('permission')
-        if permission == 'granted':
-            self.status_badge.text = 'Ativo'
-            self.status_badge.props('color=green')
-            self.enable_btn.set_visibility(False)
-        elif permission == 'denied':
-            self.status_badge.text = 'Bloqueado'
-            self.status_badge.props('color=red')
-            self.enable_btn.set_visibility(False)
-        else:
-            self.status_badge.text = 'Inativo'
-            self.status_badge.props('color=orange')
-            self.enable_btn.set_visibility(True)
+        self._set_status(*_PERMISSION_STATUS.get(permission, _PERMISSION_STATUS['default']))
+
+    def _set_status(self, text: str, color: str, show_button: bool):
+        """Aplica badge e botão juntos, para sair um único patch por transição"""
+        self.status_badge.props(f'color={color}')
+        self.status_badge.text = text
+        if self.enable_btn.visible != show_button:
+            self.enable_btn.set_visibility(show_button)
 
     async def _request_permission(self):
+        # A permissão vai mudar (ou não) no navegador; não confiar mais no cache
+        app.storage.user.pop('notif_permission', None)
         try:
             result = await ui.run_javascript('''
                 (async () => {
@@ -91,17 +128,18 @@ class NotificationsPage:
             ''', timeout=30.0)
 
             if result and result.get('granted'):
-                self.status_badge.text = 'Ativo'
-                self.status_badge.props('color=green')
-                self.enable_btn.set_visibility(False)
+                app.storage.user['notif_permission'] = 'granted'
+                self._set_status(*_PERMISSION_STATUS['granted'])
                 ui.notify('Notificações ativadas!', type='positive')
             else:
                 ui.notify('Não foi possível ativar', type='warning')
+                await self._check_status()
         except Exception:
             ui.notify('Erro ao ativar notificações', type='negative')
 
     def _load_notifications(self):
-        notifications = get_notification_history(limit=self.PAGE_SIZE, offset=self.offset)
+        # Busca um item a mais só para saber se existe próxima página
+        notifications = get_notification_history(limit=self.PAGE_SIZE + 1, offset=self.offset)
 
         if not notifications and self.offset == 0:
             with self.container:
@@ -110,9 +148,8 @@ class NotificationsPage:
                     ui.label('Nenhuma notificação ainda').classes('text-gray-500')
             return
 
-        # Se retornou menos do que o PAGE_SIZE, não há mais
-        if len(notifications) < self.PAGE_SIZE:
-            self.has_more = False
+        self.has_more = len(notifications) > self.PAGE_SIZE
+        notifications = notifications[:self.PAGE_SIZE]
 
         with self.container:
             for notif in notifications:
@@ -155,29 +192,7 @@ class NotificationsPage:
             ui.notify('Anúncio não encontrado', type='warning')
 
     def _create_notification_card(self, notif: dict):
-        type_config = {
-            'cheap_ad': {
-                'icon': 'local_offer',
-                'color': 'orange',
-                'label': 'Preço Baixo'
-            },
-            'price_drop': {
-                'icon': 'trending_down',
-                'color': 'blue',
-                'label': 'Preço Caiu'
-            },
-            'price_alert': {
-                'icon': 'notifications_active',
-                'color': 'orange',
-                'label': 'Alerta de Preço'
-            }
-        }
-
-        config = type_config.get(notif['type'], {
-            'icon': 'notifications',
-            'color': 'grey',
-            'label': notif['type']
-        })
+        config = _TYPE_CONFIG.get(notif['type']) or {**_DEFAULT_CONFIG, 'label': notif['type']}
 
         card_classes = 'w-full p-3 rounded-xl cursor-pointer hover:shadow-lg transition-shadow'
         with ui.card().classes(card_classes).on('click', lambda n=notif: self._open_ad(n)):
@@ -190,7 +205,7 @@ class NotificationsPage:
                         ui.icon(config['icon'], size='md').classes(f'text-{config["color"]}-600')
 
                 # Conteúdo
-                with ui.column().classes('flex-grow gap-1'):
+                with ui.column().classes('flex-grow min-w-0 gap-1'):
                     with ui.row().classes('items-center gap-2'):
                         ui.badge(config['label']).props(f'color={config["color"]}')
                         if notif.get('search_name'):
@@ -199,8 +214,7 @@ class NotificationsPage:
                             ui.badge('Falhou').props('color=red')
 
                     # Título
-                    title = notif.get('title', 'Sem título')
-                    ui.label(title[:60] + ('...' if len(title) > 60 else '')).classes('font-medium')
+                    ui.label(notif.get('title', 'Sem título')).classes('font-medium line-clamp-1')
 
                     # Preço
                     with ui.row().classes('items-center gap-2'):
@@ -1,23 +1,80 @@
-from nicegui import ui
-from models import Ad, PriceHistory, calculate_price_variation
-from services.database import get_watching_ads, get_price_history, get_distinct_states, create_ad, toggle_ad_watching
-from services.scheduler import run_price_check_now, get_task_status
-from services.scraper import OlxScraper
+from nicegui import ui, background_tasks
+from html import escape
+from models import Ad
+from services.database import get_watching_ads, get_state_options, create_ad, get_ad_by_url, toggle_ad_watching
+from services.scheduler import run_price_check_now, get_task_status, wait_for_task
+from services.scraper import get_shared_scraper
 from services.validators import validate_olx_url, ValidationError
 from components.ad_modal import AdModal
 
+# Espera após a última mudança de filtro antes de consultar (digitação no preço)
+FILTER_DEBOUNCE = 0.25
+
+# Campos que uma verificação de preço altera; mudanças só neles são aplicadas no card existente
+PATCHABLE_FIELDS = ('price', 'last_price', 'variation', 'recent_prices', 'distinct_price_count')
+
+
+# Classes dos cards, já montadas para cada variante (ativo / inativo)
+_CARD_CLASSES = 'cursor-pointer hover:shadow-lg transition-shadow rounded-xl overflow-hidden'
+_INACTIVE_CARD_CLASSES = f'{_CARD_CLASSES} opacity-75'
+_IMAGE_CLASSES = 'w-full h-28 sm:h-40 object-cover'
+_INACTIVE_IMAGE_CLASSES = f'{_IMAGE_CLASSES} grayscale'
+_BODY_CLASSES = 'p-2 sm:p-3 gap-1 sm:gap-2'
+_TITLE_CLASSES = 'font-semibold text-xs sm:text-sm line-clamp-2'
+_PRICE_ROW_CLASSES = 'items-center justify-between flex-wrap gap-1'
+_ACTIVE_PRICE_CLASSES = 'text-sm sm:text-lg font-bold text-green-600'
+_INACTIVE_PRICE_CLASSES = 'text-sm sm:text-lg font-bold text-gray-500 line-through'
+_CHIP_CLASSES = 'flex items-center gap-1 px-1 sm:px-2 py-0.5 sm:py-1 rounded-full'
+# Chip de variação por direção: preço caiu (True) ou subiu (False) -> (cores, ícone)
+_CHIP = {
+    True: ('bg-green-100 text-green-700', 'trending_down'),
+    False: ('bg-red-100 text-red-700', 'trending_up'),
+}
+
+
+def _without_patchable(row: dict) -> dict:
+    return {key: value for key, value in row.items() if key not in PATCHABLE_FIELDS}
+
+
+# Partes estáticas do card vão como um único ui.html, em vez de um elemento NiceGUI
+# (com estado no servidor e mensagem no websocket) para cada imagem, ícone e label
+def _image_html(ad: Ad, image_classes: str) -> str:
+    if ad.first_image:
+        return f'<img src="{escape(ad.first_image)}" alt="" loading="lazy" decoding="async" class="{image_classes}">'
+    return ('<div class="w-full h-28 sm:h-40 bg-gray-100 flex items-center justify-center">'
+            '<span class="material-icons text-5xl text-gray-300">image</span></div>')
+
+
+def _footer_html(ad: Ad) -> str:
+    # Localização; datas só em desktop
+    html = f'<div class="text-xs text-gray-500 truncate">{escape(ad.location)}</div>'
+    if ad.found_at_formatted:
+        html += f'<div class="text-xs text-gray-400 hidden sm:block">Encontrado: {escape(ad.found_at_formatted)}</div>'
+    return html
+
 
 class WatchingPage:
     def __init__(self):
         self.container = None
+        self.grid = None
+        self.empty_state = None
         self.button_container = None
-        self.modal = AdModal(on_update=self.refresh)
+        self.check_btn = None
+        self.modal = AdModal(on_update=lambda: self.refresh(force=True))
         self.min_price = None
         self.max_price = None
         self.state = None
-        self.check_timer = None
+        self._filter_timer = None
+        self._suspend_refresh = False
+        self._last_filter_sig = None
         self.is_checking = False
         self.last_result = None
+        # Cards já renderizados, para atualizar o grid de forma incremental
+        self._cards_by_id: dict[int, ui.card] = {}
+        self._rows_by_id: dict[int, dict] = {}
+        self._order: list[int] = []
+        # Partes atualizáveis dos cards ativos (label do preço e slots de badge/variação/histórico)
+        self._parts_by_id: dict[int, dict] = {}
 
     def create(self):
         with ui.column().classes('w-full max-w-7xl mx-auto p-4 gap-4'):
@@ -25,32 +82,33 @@ class WatchingPage:
                 ui.label('Acompanhando').classes('text-2xl font-bold')
                 with ui.row().classes('gap-2'):
                     ui.button('+ Adicionar URL', icon='add_link', on_click=self._show_add_url_dialog).props('outline color=primary rounded')
-                    self.button_container = ui.element('div')
-                    self._rebuild_button()
+                    with ui.element('div') as self.button_container:
+                        self.check_btn = ui.button('Verificar Preços', icon='price_check', on_click=self._on_check_click).props('outline color=primary rounded')
+                    self._update_button()
             self._create_filters()
             self.container = ui.element('div').classes('w-full')
+            with self.container:
+                with ui.column().classes('w-full items-center py-10') as self.empty_state:
+                    ui.icon('visibility_off', size='xl').classes('text-gray-400')
+                    ui.label('Nenhum anúncio sendo acompanhado').classes('text-gray-500')
+                    ui.label('Clique em "Acompanhar" em um anúncio para monitorar o preço').classes('text-sm text-gray-400')
+                self.grid = ui.element('div').classes('grid grid-cols-2 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 xl:grid-cols-5 gap-2 sm:gap-4 w-full')
             self.refresh()
 
-    def _rebuild_button(self):
-        """Recria o botão baseado no estado atual"""
-        if not self.button_container:
+    def _update_button(self):
+        """Atualiza o botão no lugar: texto e props vão juntos num único patch"""
+        if not self.check_btn:
             return
-        self.button_container.clear()
-        with self.button_container:
-            if self.is_checking:
-                ui.button('Verificando...', icon='price_check').props('loading outline color=primary rounded disable')
-            elif self.last_result:
-                changes = self.last_result.get('price_changes', 0)
-                if changes > 0:
-                    ui.button(f'{changes} alterados!', icon='price_check', on_click=self._on_check_click).props('outline color=primary rounded')
-                else:
-                    ui.button('Verificar Preços', icon='price_check', on_click=self._on_check_click).props('outline color=primary rounded')
-            else:
-                ui.button('Verificar Preços', icon='price_check', on_click=self._on_check_click).props('outline color=primary rounded')
+        changes = self.last_result.get('price_changes', 0) if self.last_result else 0
 
-    def _create_filters(self):
-        states = get_distinct_states()
+        if self.is_checking:
+            self.check_btn.props('loading disable')
+            self.check_btn.text = 'Verificando...'
+        else:
+            self.check_btn.props(remove='loading disable')
+            self.check_btn.text = f'{changes} alterados!' if changes > 0 else 'Verificar Preços'
 
+    def _create_filters(self):
         with ui.expansion('Filtros', icon='filter_list').classes('w-full rounded-xl overflow-hidden').props('dense header-class="text-weight-medium"'):
             with ui.row().classes('w-full flex-wrap gap-3 items-center py-2'):
                 self.min_input = ui.number(
@@ -63,14 +121,9 @@ class WatchingPage:
                     on_change=lambda e: self._set_max_price(e.value)
                 ).props('dense outlined rounded prefix="R$"').classes('w-28')
 
-                state_options = {None: 'Todos'}
-                for s in states:
-                    if s:
-                        state_options[s] = s.replace('#', '')
-
                 self.state_select = ui.select(
                     label='Estado',
-                    options=state_options,
+                    options=get_state_options(),
                     value=None,
                     on_change=lambda e: self._set_state(e.value)
                 ).props('dense outlined rounded').classes('min-w-[100px]')
@@ -79,23 +132,45 @@ class WatchingPage:
 
     def _set_min_price(self, value):
         self.min_price = value if value else None
-        self.refresh()
+        self._schedule_refresh()
 
     def _set_max_price(self, value):
         self.max_price = value if value else None
-        self.refresh()
+        self._schedule_refresh()
 
     def _set_state(self, value):
         self.state = value
+        self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        """Agrupa uma sequência de mudanças de filtro num único refresh"""
+        if self._suspend_refresh:
+            return
+        if self._filter_timer:
+            self._filter_timer.cancel()
+        self._filter_timer = ui.timer(FILTER_DEBOUNCE, self._run_scheduled_refresh, once=True)
+
+    def _run_scheduled_refresh(self):
+        self._filter_timer = None
+        self._suspend_refresh = False
         self.refresh()
 
     def _clear_filters(self):
+        # set_value dispara o on_change de cada campo; consultar só uma vez, no fim
+        self._suspend_refresh = True
+        try:
+            self.min_input.set_value(None)
+            self.max_input.set_value(None)
+            self.state_select.set_value(None)
+        finally:
+            self._suspend_refresh = False
         self.min_price = None
         self.max_price = None
         self.state = None
-        self.min_input.set_value(None)
-        self.max_input.set_value(None)
-        self.state_select.set_value(None)
+
+        if self._filter_timer:
+            self._filter_timer.cancel()
+            self._filter_timer = None
         self.refresh()
 
     def _show_add_url_dialog(self):
@@ -124,9 +199,7 @@ class WatchingPage:
                 status_label.set_text('Buscando informações do anúncio...')
 
                 try:
-                    scraper = OlxScraper()
-                    ad = await scraper.get_ad_info_async(url)
-                    await scraper.close()
+                    ad = await get_shared_scraper().get_ad_info_async(url)
 
                     if not ad:
                         ui.notify('Não foi possível obter informações do anúncio', type='negative')
@@ -140,14 +213,21 @@ class WatchingPage:
                         published_at=ad.published_at, main_category=ad.main_category,
                         sub_category=ad.sub_category, hobbie_type=ad.hobbie_type,
                         images=ad.images, olx_pay=ad.olx_pay, olx_delivery=ad.olx_delivery,
-                        search_id=0
+                        search_id=None, watching=True
                     )
 
-                    toggle_ad_watching(ad_id)
+                    # URL já cadastrada: reaproveita o anúncio existente
+                    if ad_id is None:
+                        existing = get_ad_by_url(ad.url)
+                        if existing['watching']:
+                            ui.notify('Anúncio já está sendo acompanhado', type='info')
+                            status_label.set_text('')
+                            return
+                        toggle_ad_watching(existing['id'])
 
                     ui.notify(f'Anúncio adicionado: {ad.title[:50]}...', type='positive')
                     dialog.close()
-                    self.refresh()
+                    self.refresh(force=True)
                 except Exception as e:
                     ui.notify(f'Erro: {e}', type='negative')
                     status_label.set_text('')
@@ -171,117 +251,184 @@ class WatchingPage:
 
         self.is_checking = True
         self.last_result = None
-        self._rebuild_button()
-        self.check_timer = ui.timer(1.0, self._check_progress)
+        self._update_button()
+        background_tasks.create(self._await_check())
 
-    def _check_progress(self):
-        status = get_task_status('price_check')
-        if not status['running']:
-            if self.check_timer:
-                self.check_timer.cancel()
-                self.check_timer = None
-
-            self.is_checking = False
-            result = status['result']
-
-            if result and result.get('success'):
-                self.last_result = result
-                changes = result.get('price_changes', 0)
-                if changes > 0:
-                    ui.notify(f'{changes} alterações de preço encontradas!', type='positive')
-                else:
-                    ui.notify('Nenhuma alteração de preço', type='info')
-                self.refresh()
-            elif result:
-                ui.notify('Erro ao verificar preços', type='negative')
-
-            self._rebuild_button()
-
-    def refresh(self):
-        if self.container:
-            self.container.clear()
-
-            ads_data = get_watching_ads(
-                min_price=self.min_price,
-                max_price=self.max_price,
-                state=self.state
-            )
-
-            if not ads_data:
-                with self.container:
-                    with ui.column().classes('w-full items-center py-10'):
-                        ui.icon('visibility_off', size='xl').classes('text-gray-400')
-                        ui.label('Nenhum anúncio sendo acompanhado').classes('text-gray-500')
-                        ui.label('Clique em "Acompanhar" em um anúncio para monitorar o preço').classes('text-sm text-gray-400')
-                return
+    async def _await_check(self):
+        """Espera o scheduler avisar o fim da verificação e atualiza a tela uma vez"""
+        status = await wait_for_task('price_check')
+        if not self.button_container:
+            return
+        with self.button_container:
+            self._check_progress(status)
 
-            with self.container:
-                with ui.element('div').classes('grid grid-cols-2 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 xl:grid-cols-5 gap-2 sm:gap-4 w-full'):
-                    for ad_data in ads_data:
-                        ad = Ad.from_dict(ad_data)
-                        self._create_watching_card(ad)
-
-    def _create_watching_card(self, ad: Ad):
-        history_data = get_price_history(ad.id)
-        history = [PriceHistory.from_dict(h) for h in history_data]
-        variation_value, variation_str = calculate_price_variation(history)
-        is_inactive = ad.status == 'inactive'
-
-        card_classes = 'cursor-pointer hover:shadow-lg transition-shadow rounded-xl overflow-hidden'
-        if is_inactive:
-            card_classes += ' opacity-75'
-
-        with ui.card().classes(card_classes).on('click', lambda: self.modal.show(ad)):
-            # Imagem
-            if ad.first_image:
-                img_classes = 'w-full h-28 sm:h-40 object-cover'
-                if is_inactive:
-                    img_classes += ' grayscale'
-                ui.image(ad.first_image).classes(img_classes)
+    def _check_progress(self, status: dict):
+        self.is_checking = False
+        result = status['result']
+
+        if result and result.get('success'):
+            self.last_result = result
+            changes = result.get('price_changes', 0)
+            if changes > 0:
+                ui.notify(f'{changes} alterações de preço encontradas!', type='positive')
             else:
-                with ui.element('div').classes('w-full h-28 sm:h-40 bg-gray-100 flex items-center justify-center'):
-                    ui.icon('image', size='xl').classes('text-gray-300')
+                ui.notify('Nenhuma alteração de preço', type='info')
+            self.refresh(force=True)
+        elif result:
+            ui.notify('Erro ao verificar preços', type='negative')
+
+        self._update_button()
+
+    def refresh(self, force: bool = False):
+        """
+        Atualiza o grid aplicando só a diferença em relação ao que já está na tela.
+        Sem force, não consulta de novo se os filtros não mudaram (ex: blur no campo
+        de preço); quem mudou os dados (verificação, modal, nova URL) passa force=True.
+        """
+        if not self.container:
+            return
 
-            with ui.column().classes('p-2 sm:p-3 gap-1 sm:gap-2'):
-                # Título
-                ui.label(ad.title).classes('font-semibold text-xs sm:text-sm line-clamp-2')
+        filter_sig = (self.min_price, self.max_price, self.state)
+        if filter_sig == self._last_filter_sig and not force:
+            return
 
-                # Preço e variação/status
-                with ui.row().classes('items-center justify-between flex-wrap gap-1'):
+        ads_data = get_watching_ads(
+            min_price=self.min_price,
+            max_price=self.max_price,
+            state=self.state,
+            with_history=True
+        )
+        self._last_filter_sig = filter_sig
+
+        self.empty_state.set_visibility(not ads_data)
+        self.grid.set_visibility(bool(ads_data))
+
+        rows_by_id = {ad_data['id']: ad_data for ad_data in ads_data}
+        new_ids = list(rows_by_id)
+
+        # Remover cards que saíram do filtro; se só o preço mudou, atualizar no lugar
+        for ad_id in self._order:
+            old_row, new_row = self._rows_by_id[ad_id], rows_by_id.get(ad_id)
+            if old_row == new_row:
+                continue
+            if new_row and ad_id in self._parts_by_id and _without_patchable(old_row) == _without_patchable(new_row):
+                self._patch_card(new_row)
+                continue
+            self._cards_by_id.pop(ad_id).delete()
+            self._parts_by_id.pop(ad_id, None)
+            del self._rows_by_id[ad_id]
+        current = [ad_id for ad_id in self._order if ad_id in self._cards_by_id]
+
+        # Criar apenas os cards novos
+        with self.grid:
+            for ad_id in new_ids:
+                if ad_id not in self._cards_by_id:
+                    self._cards_by_id[ad_id] = self._create_watching_card(rows_by_id[ad_id])
+                    self._rows_by_id[ad_id] = rows_by_id[ad_id]
+                    current.append(ad_id)
+
+        # Reordenar sem recriar os cards que permaneceram
+        for index, ad_id in enumerate(new_ids):
+            if current[index] != ad_id:
+                self._cards_by_id[ad_id].move(target_index=index)
+                current.remove(ad_id)
+                current.insert(index, ad_id)
+
+        self._order = new_ids
+
+    def _patch_card(self, ad_data: dict):
+        """Aplica preço, variação e histórico novos num card ativo sem recriá-lo"""
+        ad = Ad.from_dict(ad_data)
+        parts = self._parts_by_id[ad.id]
+        parts['price'].set_text(f'R$ {ad.price}')
+        for slot, builder in (('cheap', self._create_cheap_badge),
+                              ('variation', self._create_variation_chip),
+                              ('trail', self._create_price_trail)):
+            parts[slot].clear()
+            with parts[slot]:
+                builder(ad)
+        self._rows_by_id[ad.id] = ad_data
+
+    def _create_cheap_badge(self, ad: Ad):
+        if ad.is_cheap:
+            ui.badge('Preço Baixo').props('color=orange dense')
+
+    def _create_variation_chip(self, ad: Ad):
+        if ad.variation != 0:
+            color, icon = _CHIP[ad.variation < 0]
+            with ui.element('div').classes(f'{_CHIP_CLASSES} {color}'):
+                ui.icon(icon, size='xs')
+                ui.label(ad.variation_str).classes('text-xs font-medium')
+        else:
+            with ui.element('div').classes(f'{_CHIP_CLASSES} bg-gray-100 text-gray-600'):
+                ui.icon('remove', size='xs')
+                ui.label('Estável').classes('text-xs')
+
+    def _create_price_trail(self, ad: Ad):
+        # Histórico resumido (só em desktop)
+        if ad.distinct_price_count > 1:
+            ui.label(ad.last5_display).classes('text-xs text-gray-400 truncate hidden sm:block')
+
+    def _create_watching_card(self, ad_data: dict) -> ui.card:
+        # Variação e últimos preços já vêm calculados na consulta dos anúncios
+        ad = Ad.from_dict(ad_data)
+        if ad.status == 'inactive':
+            return self._create_inactive_card(ad)
+        return self._create_active_card(ad)
+
+    def _card_shell(self, ad: Ad, card_classes: str, image_classes: str) -> ui.card:
+        """Card clicável com a imagem; o chamador preenche o corpo dentro do `with`"""
+        ad_id = ad.id
+        # O modal lê a linha atual, que pode ter sido atualizada por _patch_card
+        on_click = lambda: self.modal.show(Ad.from_dict(self._rows_by_id[ad_id]))
+        with ui.card().classes(card_classes).on('click', on_click) as card:
+            ui.html(_image_html(ad, image_classes)).classes('w-full')
+        return card
+
+    def _create_footer(self, ad: Ad):
+        ui.html(_footer_html(ad)).classes('w-full flex flex-col gap-1 sm:gap-2 min-w-0')
+
+    def _create_active_card(self, ad: Ad) -> ui.card:
+        with self._card_shell(ad, _CARD_CLASSES, _IMAGE_CLASSES) as card:
+            with ui.column().classes(_BODY_CLASSES):
+                ui.label(ad.title).classes(_TITLE_CLASSES)
+
+                # Preço e variação
+                with ui.row().classes(_PRICE_ROW_CLASSES):
                     with ui.row().classes('items-center gap-1'):
-                        price_classes = 'text-sm sm:text-lg font-bold'
-                        if is_inactive:
-                            price_classes += ' text-gray-500 line-through'
-                        else:
-                            price_classes += ' text-green-600'
-                        ui.label(f'R$ {ad.price}').classes(price_classes)
-
-                        if not is_inactive and ad.is_cheap:
-                            ui.badge('Preço Baixo').props('color=orange dense')
-
-                    if is_inactive:
-                        ui.badge('Inativo').props('color=red dense')
-                    elif variation_value != 0:
-                        color = 'bg-green-100 text-green-700' if variation_value < 0 else 'bg-red-100 text-red-700'
-                        icon = 'trending_down' if variation_value < 0 else 'trending_up'
-                        with ui.element('div').classes(f'flex items-center gap-1 px-1 sm:px-2 py-0.5 sm:py-1 rounded-full {color}'):
-                            ui.icon(icon, size='xs')
-                            ui.label(variation_str).classes('text-xs font-medium')
-                    else:
-                        with ui.element('div').classes('flex items-center gap-1 px-1 sm:px-2 py-0.5 sm:py-1 rounded-full bg-gray-100 text-gray-600'):
-                            ui.icon('remove', size='xs')
-                            ui.label('Estável').classes('text-xs')
-
-                # Histórico resumido (só em desktop)
-                if history and len(history) > 1:
-                    prices = [h.price for h in history[-5:]]
-                    if len(set(prices)) > 1:
-                        ui.label(' → '.join(f'R$ {p}' for p in prices)).classes('text-xs text-gray-400 truncate hidden sm:block')
-
-                # Localização
-                ui.label(ad.location).classes('text-xs text-gray-500 truncate')
-                # Datas só em desktop
-                if ad.found_at_formatted:
-                    ui.label(f'Encontrado: {ad.found_at_formatted}').classes('text-xs text-gray-400 hidden sm:block')
-                if is_inactive and ad.deactivated_at_formatted:
+                        price_label = ui.label(f'R$ {ad.price}').classes(_ACTIVE_PRICE_CLASSES)
+                        # 'contents' não gera caixa: o slot não ocupa espaço nem gap quando vazio
+                        with ui.element('div').classes('contents') as cheap_slot:
+                            self._create_cheap_badge(ad)
+
+                    with ui.element('div').classes('contents') as variation_slot:
+                        self._create_variation_chip(ad)
+
+                with ui.element('div').classes('contents') as trail_slot:
+                    self._create_price_trail(ad)
+
+                self._create_footer(ad)
+
+        self._parts_by_id[ad.id] = {
+            'price': price_label,
+            'cheap': cheap_slot,
+            'variation': variation_slot,
+            'trail': trail_slot,
+        }
+        return card
+
+    def _create_inactive_card(self, ad: Ad) -> ui.card:
+        with self._card_shell(ad, _INACTIVE_CARD_CLASSES, _INACTIVE_IMAGE_CLASSES) as card:
+            with ui.column().classes(_BODY_CLASSES):
+                ui.label(ad.title).classes(_TITLE_CLASSES)
+
+                # Preço riscado e status
+                with ui.row().classes(_PRICE_ROW_CLASSES):
+                    ui.label(f'R$ {ad.price}').classes(_INACTIVE_PRICE_CLASSES)
+                    ui.badge('Inativo').props('color=red dense')
+
+                self._create_price_trail(ad)
+                self._create_footer(ad)
+                if ad.deactivated_at_formatted:
                     ui.label(f'Inativo: {ad.deactivated_at_formatted}').classes('text-xs text-red-400')
+        return card
@@ -3,48 +3,84 @@
 Script para atualizar COVERAGE.md com dados atuais
 """
 
-import subprocess
-import re
+import hashlib
+import json
+import sys
+import time
 from datetime import datetime
 from pathlib import Path
 
+ROOT = Path(__file__).resolve().parent.parent
+# Hash do código da última execução; se nada mudou, não roda os testes de novo
+CACHE_FILE = ROOT / '.coverage_cache.json'
+HASHED_DIRS = ['services', 'tests']
+
+
+def _tree_hash(dirs: list[str]) -> str:
+    """Hash BLAKE2 dos .py (caminho + conteúdo) das pastas e deste script"""
+    h = hashlib.blake2b(digest_size=16)
+    files = sorted(path for d in dirs for path in (ROOT / d).rglob('*.py'))
+    files.append(Path(__file__).resolve())
+    for path in files:
+        h.update(str(path.relative_to(ROOT)).encode())
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def _load_cache() -> dict:
+    try:
+        return json.loads(CACHE_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+class _PassedCounter:
+    """Plugin do pytest que conta os testes que passaram"""
+
+    def __init__(self):
+        self.passed = 0
+
+    def pytest_runtest_logreport(self, report):
+        if report.when == 'call' and report.passed:
+            self.passed += 1
+
 
 def get_coverage_data():
-    """Roda pytest com coverage e extrai os dados"""
-    result = subprocess.run(
-        ['./venv/bin/pytest', 'tests/', '--cov=services', '--cov-report=term', '-q'],
-        capture_output=True,
-        text=True
-    )
-
-    output = result.stdout + result.stderr
-
-    # Extrair contagem de testes
-    test_match = re.search(r'(\d+) passed', output)
-    test_count = test_match.group(1) if test_match else '?'
-
-    # Extrair tempo
-    time_match = re.search(r'in ([\d.]+)s', output)
-    time_taken = time_match.group(1) if time_match else '?'
-
-    # Extrair cobertura por módulo
-    coverage = {}
-    for line in output.split('\n'):
-        match = re.match(r'services/(\w+)\.py\s+\d+\s+\d+\s+(\d+)%', line)
-        if match:
-            module = match.group(1)
-            percent = int(match.group(2))
-            coverage[module] = percent
-
-    # Calcular cobertura geral
-    total_match = re.search(r'TOTAL\s+\d+\s+\d+\s+(\d+)%', output)
-    total_coverage = total_match.group(1) if total_match else '?'
+    """Roda pytest com coverage no próprio processo e lê os números do coverage.py"""
+    import coverage
+    import pytest
+
+    services_dir = ROOT / 'services'
+    cov = coverage.Coverage(source=[str(services_dir)], data_file=str(ROOT / '.coverage'))
+    counter = _PassedCounter()
+
+    start = time.perf_counter()
+    cov.start()
+    try:
+        pytest.main([str(ROOT / 'tests'), '-q', '-p', 'no:cacheprovider'], plugins=[counter])
+    finally:
+        cov.stop()
+    elapsed = time.perf_counter() - start
+    cov.save()
+
+    # Cobertura por módulo, a partir das linhas executáveis e das não executadas
+    coverage_by_module = {}
+    total_statements = total_missing = 0
+    for path in sorted(services_dir.glob('*.py')):
+        _, statements, _, missing, _ = cov.analysis2(str(path))
+        if not statements:
+            continue
+        coverage_by_module[path.stem] = round(100 * (len(statements) - len(missing)) / len(statements))
+        total_statements += len(statements)
+        total_missing += len(missing)
+
+    total_coverage = round(100 * (total_statements - total_missing) / total_statements) if total_statements else '?'
 
     return {
-        'test_count': test_count,
-        'time': time_taken,
+        'test_count': counter.passed,
+        'time': f'{elapsed:.2f}',
         'total': total_coverage,
-        'modules': coverage
+        'modules': coverage_by_module
     }
 
 
@@ -138,13 +174,22 @@ tests/
 
 
 def main():
+    tree_hash = _tree_hash(HASHED_DIRS)
+    cache = _load_cache()
+    if '--force' not in sys.argv and cache.get('hash') == tree_hash:
+        data = cache['data']
+        print(f"✅ Nada mudou em {', '.join(HASHED_DIRS)}; COVERAGE.md mantido "
+              f"({data['test_count']} testes, {data['total']}% cobertura)")
+        return
+
     print("📊 Atualizando cobertura...")
 
     data = get_coverage_data()
     content = generate_markdown(data)
 
-    coverage_file = Path(__file__).parent.parent / 'COVERAGE.md'
+    coverage_file = ROOT / 'COVERAGE.md'
     coverage_file.write_text(content)
+    CACHE_FILE.write_text(json.dumps({'hash': tree_hash, 'data': data}))
 
     print(f"✅ COVERAGE.md atualizado ({data['test_count']} testes, {data['total']}% cobertura)")
 
@@ -1,159 +1,366 @@
 import sqlite3
-import json
+import time
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 from contextlib import contextmanager
+from services.logger import get_logger
+
+# orjson serializa as listas JSON (images, queries...) em C; json da stdlib fica de fallback
+try:
+    import orjson
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    _loads = orjson.loads
+except ImportError:
+    from json import dumps as _dumps, loads as _loads
+
+logger = get_logger("olx_monitor.database")
 
 DB_PATH = Path(__file__).parent.parent / "data" / "olx.db"
 
+# Estados mudam raramente; guardamos a lista e as opções do filtro por alguns minutos
+STATES_CACHE_TTL = 300
+_states_cache: Optional[tuple[float, list[str], dict]] = None
 
-@contextmanager
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+
+# Preço em centavos derivado do texto "1.234,56"; coluna gerada para nunca divergir de price
+PRICE_CENTS_EXPR = "CAST(ROUND(CAST(REPLACE(REPLACE(price, '.', ''), ',', '.') AS REAL) * 100) AS INTEGER)"
+
+
+def _cents(value: float) -> int:
+    return round(value * 100)
+
+
+# "1.234,56" -> "1234.56" numa passada só
+_PRICE_TRANS = str.maketrans({'.': '', ',': '.'})
+
+
+def _price_to_float(price) -> Optional[float]:
+    """price_num(): texto "1.234,56" -> 1234.56; mesmo resultado do CAST para valores inválidos"""
+    if price is None:
+        return None
     try:
-        yield conn
+        return float(price.translate(_PRICE_TRANS))
+    except (ValueError, AttributeError):
+        return 0.0
+
+
+def register_functions(conn: sqlite3.Connection):
+    """Funções SQL da aplicação; deterministic permite usá-las em índices de expressão"""
+    conn.create_function("price_num", 1, _price_to_float, deterministic=True)
+
+
+# Versão do schema gravada em PRAGMA user_version; incremente ao adicionar uma migration
+SCHEMA_VERSION = 2
+
+# Colunas que bancos antigos podem não ter (migration 1); as tabelas novas já as criam
+LEGACY_COLUMNS = {
+    'ads': {
+        'status': "TEXT DEFAULT 'active'",
+        'deactivated_at': "DATETIME",
+        'cheap_threshold': "REAL",
+        'price_cents': f"INTEGER GENERATED ALWAYS AS ({PRICE_CENTS_EXPR}) VIRTUAL",
+    },
+    'searches': {
+        'state': "TEXT DEFAULT ''",
+        'region': "TEXT DEFAULT ''",
+        'category': "TEXT DEFAULT 'games'",
+        'subcategory': "TEXT DEFAULT ''",
+        'cheap_threshold': "REAL",
+    },
+    'notification_history': {
+        'read_at': "DATETIME",
+    },
+}
+
+
+# Schema final de cada tabela; bancos novos nascem assim e as migrations levam os antigos até aqui
+TABLE_SCHEMAS = {
+    'searches': """
+    CREATE TABLE IF NOT EXISTS searches (
+        id INTEGER PRIMARY KEY,
+        name TEXT UNIQUE,
+        base_url TEXT,
+        queries TEXT,
+        categories TEXT,
+        exclude_keywords TEXT,
+        active BOOLEAN DEFAULT 1,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        state TEXT DEFAULT '',
+        region TEXT DEFAULT '',
+        category TEXT DEFAULT 'games',
+        subcategory TEXT DEFAULT '',
+        cheap_threshold REAL
+    )
+    """,
+    'ads': f"""
+    CREATE TABLE IF NOT EXISTS ads (
+        id INTEGER PRIMARY KEY,
+        url TEXT UNIQUE,
+        title TEXT,
+        price TEXT,
+        description TEXT,
+        state TEXT,
+        municipality TEXT,
+        neighbourhood TEXT,
+        zipcode TEXT,
+        seller TEXT,
+        condition TEXT,
+        published_at TEXT,
+        main_category TEXT,
+        sub_category TEXT,
+        hobbie_type TEXT,
+        images TEXT,
+        olx_pay BOOLEAN DEFAULT 0,
+        olx_delivery BOOLEAN DEFAULT 0,
+        search_id INTEGER,
+        found_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        seen BOOLEAN DEFAULT 0,
+        watching BOOLEAN DEFAULT 0,
+        status TEXT DEFAULT 'active',
+        deactivated_at DATETIME,
+        cheap_threshold REAL,
+        price_cents INTEGER GENERATED ALWAYS AS ({PRICE_CENTS_EXPR}) VIRTUAL,
+        FOREIGN KEY (search_id) REFERENCES searches(id) ON DELETE CASCADE
+    )
+    """,
+    'price_history': """
+    CREATE TABLE IF NOT EXISTS price_history (
+        id INTEGER PRIMARY KEY,
+        ad_id INTEGER,
+        price TEXT,
+        checked_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (ad_id) REFERENCES ads(id) ON DELETE CASCADE
+    )
+    """,
+    'settings': """
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """,
+    'price_alerts': """
+    CREATE TABLE IF NOT EXISTS price_alerts (
+        id INTEGER PRIMARY KEY,
+        ad_id INTEGER UNIQUE,
+        target_price REAL,
+        notify_below BOOLEAN DEFAULT 1,
+        active BOOLEAN DEFAULT 1,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        triggered_at DATETIME,
+        FOREIGN KEY (ad_id) REFERENCES ads(id) ON DELETE CASCADE
+    )
+    """,
+    'push_subscriptions': """
+    CREATE TABLE IF NOT EXISTS push_subscriptions (
+        id INTEGER PRIMARY KEY,
+        endpoint TEXT UNIQUE,
+        p256dh TEXT,
+        auth TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    'notification_history': """
+    CREATE TABLE IF NOT EXISTS notification_history (
+        id INTEGER PRIMARY KEY,
+        type TEXT NOT NULL,
+        ad_id INTEGER,
+        title TEXT,
+        price TEXT,
+        old_price TEXT,
+        target_price REAL,
+        url TEXT,
+        image TEXT,
+        search_name TEXT,
+        sent_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        success INTEGER DEFAULT 1,
+        read_at DATETIME,
+        FOREIGN KEY (ad_id) REFERENCES ads(id) ON DELETE SET NULL
+    )
+    """,
+}
+
+
+# Tabelas cujas FKs ganharam ON DELETE na migration 2 (SQLite só muda FK recriando a tabela)
+FK_REBUILD_TABLES = ('ads', 'price_history', 'notification_history')
+
+
+def _rebuild_tables(conn: sqlite3.Connection, tables: tuple[str, ...]):
+    """Recria as tabelas com o DDL atual de TABLE_SCHEMAS, preservando ids e dados"""
+    conn.commit()
+    # foreign_keys não muda dentro de transação; desligado, o DROP não dispara cascatas
+    conn.execute("PRAGMA foreign_keys=OFF")
+    try:
+        conn.execute("BEGIN")
+        # Linhas que violariam as novas FKs: anúncios de buscas apagadas (ou search_id 0) ficam sem busca
+        conn.execute("UPDATE ads SET search_id = NULL WHERE search_id NOT IN (SELECT id FROM searches)")
+        conn.execute("DELETE FROM price_history WHERE ad_id NOT IN (SELECT id FROM ads)")
+        conn.execute("DELETE FROM price_alerts WHERE ad_id NOT IN (SELECT id FROM ads)")
+        conn.execute("UPDATE notification_history SET ad_id = NULL WHERE ad_id NOT IN (SELECT id FROM ads)")
+
+        for table in tables:
+            new_table = f"_new_{table}"
+            conn.execute(TABLE_SCHEMAS[table].replace(f"IF NOT EXISTS {table} (", f"{new_table} (", 1))
+            # table_info omite colunas geradas, que não podem receber INSERT
+            new_columns = {col[1] for col in conn.execute(f"PRAGMA table_info({new_table})")}
+            columns = ', '.join(col[1] for col in conn.execute(f"PRAGMA table_info({table})")
+                                if col[1] in new_columns)
+            conn.execute(f"INSERT INTO {new_table} ({columns}) SELECT {columns} FROM {table}")
+            conn.execute(f"DROP TABLE {table}")
+            conn.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
     finally:
-        conn.close()
+        conn.execute("PRAGMA foreign_keys=ON")
 
 
-def init_db():
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+def _add_missing_columns(cursor: sqlite3.Cursor, table: str, columns: dict[str, str]):
+    # table_xinfo também lista colunas geradas (price_cents), que table_info omite
+    cursor.execute(f"PRAGMA table_xinfo({table})")
+    existing = {col[1] for col in cursor.fetchall()}
+    for name, definition in columns.items():
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
 
-    with get_connection() as conn:
-        cursor = conn.cursor()
 
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS searches (
-                id INTEGER PRIMARY KEY,
-                name TEXT UNIQUE,
-                base_url TEXT,
-                queries TEXT,
-                categories TEXT,
-                exclude_keywords TEXT,
-                active BOOLEAN DEFAULT 1,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+ADS_FTS_SCHEMA = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS ads_fts USING fts5(
+        title, description, content='ads', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ads_fts_ai AFTER INSERT ON ads BEGIN
+        INSERT INTO ads_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ads_fts_ad AFTER DELETE ON ads BEGIN
+        INSERT INTO ads_fts(ads_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS ads_fts_au AFTER UPDATE OF title, description ON ads BEGIN
+        INSERT INTO ads_fts(ads_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO ads_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+)
+
+
+def _fts_query(search_text: str) -> Optional[str]:
+    """Converte o texto digitado em consulta FTS5: cada palavra vira prefixo, todas obrigatórias"""
+    words = search_text.replace('"', ' ').split()
+    return ' '.join(f'"{word}"*' for word in words) or None
+
+
+# PRAGMAs aplicados a cada conexão nova (WAL exige SQLite >= 3.7)
+CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+def _apply_pragmas(conn: sqlite3.Connection):
+    """WAL deixa a UI ler enquanto o scheduler grava; não se aplica a banco em memória"""
+    if str(DB_PATH) != ':memory:':
+        conn.execute("PRAGMA journal_mode=WAL").fetchone()
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+
+
+# Cache de statements compilados por conexão; cobre as queries fixas e as variações de filtro
+CACHED_STATEMENTS = 256
+
+# Uma conexão por thread, reaproveitada entre chamadas para manter o cache de páginas do SQLite
+_local = threading.local()
+
+
+def _get_conn() -> sqlite3.Connection:
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False,
+                               cached_statements=CACHED_STATEMENTS)
+        conn.row_factory = sqlite3.Row
+        register_functions(conn)
+        _apply_pragmas(conn)
+        _local.conn = conn
+    return conn
+
+
+def close_connection():
+    """Fecha a conexão da thread atual (a próxima chamada abre outra)"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        _local.conn = None
+        conn.close()
 
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS ads (
-                id INTEGER PRIMARY KEY,
-                url TEXT UNIQUE,
-                title TEXT,
-                price TEXT,
-                description TEXT,
-                state TEXT,
-                municipality TEXT,
-                neighbourhood TEXT,
-                zipcode TEXT,
-                seller TEXT,
-                condition TEXT,
-                published_at TEXT,
-                main_category TEXT,
-                sub_category TEXT,
-                hobbie_type TEXT,
-                images TEXT,
-                olx_pay BOOLEAN DEFAULT 0,
-                olx_delivery BOOLEAN DEFAULT 0,
-                search_id INTEGER,
-                found_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                seen BOOLEAN DEFAULT 0,
-                watching BOOLEAN DEFAULT 0,
-                status TEXT DEFAULT 'active',
-                deactivated_at DATETIME,
-                FOREIGN KEY (search_id) REFERENCES searches(id)
-            )
-        """)
 
-        # Migration: add status columns if not exist
-        cursor.execute("PRAGMA table_info(ads)")
-        columns = [col[1] for col in cursor.fetchall()]
-        if 'status' not in columns:
-            cursor.execute("ALTER TABLE ads ADD COLUMN status TEXT DEFAULT 'active'")
-        if 'deactivated_at' not in columns:
-            cursor.execute("ALTER TABLE ads ADD COLUMN deactivated_at DATETIME")
-        if 'cheap_threshold' not in columns:
-            cursor.execute("ALTER TABLE ads ADD COLUMN cheap_threshold REAL")
-
-        # Migration: add location/category columns to searches if not exist
-        cursor.execute("PRAGMA table_info(searches)")
-        search_columns = [col[1] for col in cursor.fetchall()]
-        if 'state' not in search_columns:
-            cursor.execute("ALTER TABLE searches ADD COLUMN state TEXT DEFAULT ''")
-        if 'region' not in search_columns:
-            cursor.execute("ALTER TABLE searches ADD COLUMN region TEXT DEFAULT ''")
-        if 'category' not in search_columns:
-            cursor.execute("ALTER TABLE searches ADD COLUMN category TEXT DEFAULT 'games'")
-        if 'subcategory' not in search_columns:
-            cursor.execute("ALTER TABLE searches ADD COLUMN subcategory TEXT DEFAULT ''")
-        if 'cheap_threshold' not in search_columns:
-            cursor.execute("ALTER TABLE searches ADD COLUMN cheap_threshold REAL")
+atexit.register(close_connection)
 
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS price_history (
-                id INTEGER PRIMARY KEY,
-                ad_id INTEGER,
-                price TEXT,
-                checked_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (ad_id) REFERENCES ads(id)
-            )
-        """)
 
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT
-            )
-        """)
+def _fetch_dicts(cursor: sqlite3.Cursor) -> list[dict]:
+    """Linhas como dicts; as colunas saem uma vez de cursor.description em vez de por linha"""
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS price_alerts (
-                id INTEGER PRIMARY KEY,
-                ad_id INTEGER UNIQUE,
-                target_price REAL,
-                notify_below BOOLEAN DEFAULT 1,
-                active BOOLEAN DEFAULT 1,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                triggered_at DATETIME,
-                FOREIGN KEY (ad_id) REFERENCES ads(id) ON DELETE CASCADE
-            )
-        """)
 
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS push_subscriptions (
-                id INTEGER PRIMARY KEY,
-                endpoint TEXT UNIQUE,
-                p256dh TEXT,
-                auth TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+@contextmanager
+def get_connection():
+    conn = _get_conn()
+    try:
+        yield conn
+    except BaseException:
+        # Não deixa transação pela metade na conexão compartilhada
+        conn.rollback()
+        raise
 
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS notification_history (
-                id INTEGER PRIMARY KEY,
-                type TEXT NOT NULL,
-                ad_id INTEGER,
-                title TEXT,
-                price TEXT,
-                old_price TEXT,
-                target_price REAL,
-                url TEXT,
-                image TEXT,
-                search_name TEXT,
-                sent_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                success INTEGER DEFAULT 1,
-                read_at DATETIME,
-                FOREIGN KEY (ad_id) REFERENCES ads(id)
-            )
-        """)
 
-        # Migration: add read_at column to notification_history if not exist
-        cursor.execute("PRAGMA table_info(notification_history)")
-        notif_columns = [col[1] for col in cursor.fetchall()]
-        if 'read_at' not in notif_columns:
-            cursor.execute("ALTER TABLE notification_history ADD COLUMN read_at DATETIME")
+def init_db():
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        # Banco novo já nasce com o schema final abaixo; migrations só valem para bancos antigos
+        stored_version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ads'")
+        version = stored_version if cursor.fetchone() else SCHEMA_VERSION
+
+        for statement in TABLE_SCHEMAS.values():
+            cursor.execute(statement)
+
+        # Migrations: só roda o que falta para chegar em SCHEMA_VERSION
+        if version < 1:
+            # Bancos anteriores ao user_version têm colunas em estados variados; confere uma a uma
+            for table, columns in LEGACY_COLUMNS.items():
+                _add_missing_columns(cursor, table, columns)
+        if version < 2:
+            _rebuild_tables(conn, FK_REBUILD_TABLES)
+        if stored_version < SCHEMA_VERSION:
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+        # Busca textual: índice FTS5 de title/description, sincronizado por triggers
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'ads_fts'")
+        fts_exists = cursor.fetchone() is not None
+        for statement in ADS_FTS_SCHEMA:
+            cursor.execute(statement)
+        if not fts_exists:
+            cursor.execute("INSERT INTO ads_fts(ads_fts) VALUES ('rebuild')")
 
         # Create indexes for better query performance
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_ads_search_id ON ads(search_id)")
@@ -162,22 +369,39 @@ def init_db():
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_ads_found_at ON ads(found_at DESC)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_ads_status_found ON ads(status, found_at DESC)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_ads_watching_found ON ads(watching, found_at DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_ads_price_cents ON ads(price_cents)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_ads_status_price ON ads(status, price_cents)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_ads_search_status_found ON ads(search_id, status, found_at DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_ads_state_found ON ads(state, found_at DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_ads_seen_status ON ads(seen, status, search_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_history_ad ON price_history(ad_id, checked_at DESC)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_searches_active ON searches(active)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_alerts_active ON price_alerts(active, ad_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_push_subscriptions_endpoint ON push_subscriptions(endpoint)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_notification_history_unread ON notification_history(id) WHERE read_at IS NULL")
 
         conn.commit()
 
+        # Estatísticas para o planner escolher entre os índices compostos
+        cursor.execute("ANALYZE")
+        conn.commit()
+
 
 # ==================== SETTINGS ====================
 
+# Configurações só mudam via set_setting; guardamos o valor lido (None se ausente) por chave
+_settings_cache: dict[str, Optional[str]] = {}
+
+
 def get_setting(key: str, default: str = None) -> Optional[str]:
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
-        row = cursor.fetchone()
-        return row['value'] if row else default
+    if key not in _settings_cache:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
+            row = cursor.fetchone()
+            _settings_cache[key] = row['value'] if row else None
+    value = _settings_cache[key]
+    return value if value is not None else default
 
 
 def set_setting(key: str, value: str):
@@ -188,6 +412,7 @@ def set_setting(key: str, value: str):
             ON CONFLICT(key) DO UPDATE SET value = ?
         """, (key, value, value))
         conn.commit()
+    _settings_cache.pop(key, None)
 
 
 # ==================== SEARCHES ====================
@@ -196,16 +421,14 @@ def get_all_searches():
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM searches ORDER BY name")
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        return _fetch_dicts(cursor)
 
 
 def get_active_searches():
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM searches WHERE active = 1 ORDER BY name")
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        return _fetch_dicts(cursor)
 
 
 def get_search_by_id(search_id: int):
@@ -224,7 +447,7 @@ def create_search(name: str, base_url: str, queries: list, categories: list, exc
         cursor.execute("""
             INSERT INTO searches (name, base_url, queries, categories, exclude_keywords, state, region, category, subcategory, cheap_threshold)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (name, base_url, json.dumps(queries), json.dumps(categories), json.dumps(exclude_keywords),
+        """, (name, base_url, _dumps(queries), _dumps(categories), _dumps(exclude_keywords),
               state, region, category, subcategory, cheap_threshold))
         conn.commit()
         return cursor.lastrowid
@@ -240,16 +463,20 @@ def update_search(search_id: int, name: str, base_url: str, queries: list, categ
             SET name = ?, base_url = ?, queries = ?, categories = ?, exclude_keywords = ?, active = ?,
                 state = ?, region = ?, category = ?, subcategory = ?, cheap_threshold = ?
             WHERE id = ?
-        """, (name, base_url, json.dumps(queries), json.dumps(categories), json.dumps(exclude_keywords), active,
+        """, (name, base_url, _dumps(queries), _dumps(categories), _dumps(exclude_keywords), active,
               state, region, category, subcategory, cheap_threshold, search_id))
         conn.commit()
 
 
 def delete_search(search_id: int):
+    """Remove a busca e, via ON DELETE CASCADE, seus anúncios com histórico e alertas.
+    Anúncios acompanhados são mantidos, sem busca."""
     with get_connection() as conn:
         cursor = conn.cursor()
+        cursor.execute("UPDATE ads SET search_id = NULL WHERE search_id = ? AND watching = 1", (search_id,))
         cursor.execute("DELETE FROM searches WHERE id = ?", (search_id,))
         conn.commit()
+    _invalidate_states_cache()
 
 
 def toggle_search_active(search_id: int):
@@ -271,10 +498,10 @@ def _build_ads_filter(search_id=None, status="all", min_price=None, max_price=No
         conditions.append("search_id = ?")
         params.append(search_id)
 
-    if search_text:
-        conditions.append("(LOWER(title) LIKE ? OR LOWER(description) LIKE ?)")
-        search_pattern = f"%{search_text.lower()}%"
-        params.extend([search_pattern, search_pattern])
+    fts_query = _fts_query(search_text) if search_text else None
+    if fts_query:
+        conditions.append("id IN (SELECT rowid FROM ads_fts WHERE ads_fts MATCH ?)")
+        params.append(fts_query)
 
     status_map = {"new": "seen = 0", "seen": "seen = 1", "watching": "watching = 1"}
     if status in status_map:
@@ -284,14 +511,13 @@ def _build_ads_filter(search_id=None, status="all", min_price=None, max_price=No
         conditions.append("status = ?")
         params.append(ad_status)
 
-    price_cast = "CAST(REPLACE(REPLACE(price, '.', ''), ',', '.') AS REAL)"
     if min_price is not None:
-        conditions.append(f"{price_cast} >= ?")
-        params.append(min_price)
+        conditions.append("price_cents >= ?")
+        params.append(_cents(min_price))
 
     if max_price is not None:
-        conditions.append(f"{price_cast} <= ?")
-        params.append(max_price)
+        conditions.append("price_cents <= ?")
+        params.append(_cents(max_price))
 
     if state:
         conditions.append("state = ?")
@@ -316,8 +542,8 @@ def get_ads(search_id: Optional[int] = None, status: str = "all",
                                        state, days, ad_status, search_text)
 
     sort_map = {
-        'price_asc': "CAST(REPLACE(REPLACE(price, '.', ''), ',', '.') AS REAL) ASC",
-        'price_desc': "CAST(REPLACE(REPLACE(price, '.', ''), ',', '.') AS REAL) DESC",
+        'price_asc': "price_cents ASC",
+        'price_desc': "price_cents DESC",
     }
     order = sort_map.get(sort_by, "found_at DESC")
 
@@ -327,7 +553,13 @@ def get_ads(search_id: Optional[int] = None, status: str = "all",
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+        return _fetch_dicts(cursor)
+
+
+def get_ads_page(*args, limit: int = 100, offset: int = 0, **filters) -> tuple[list[dict], bool]:
+    """Uma página de get_ads e se existe a próxima (busca limit + 1 linhas em vez de contar tudo)"""
+    rows = get_ads(*args, limit=limit + 1, offset=offset, **filters)
+    return rows[:limit], len(rows) > limit
 
 
 def get_ad_by_id(ad_id: int):
@@ -353,35 +585,93 @@ def ad_exists(url: str) -> bool:
         return cursor.fetchone() is not None
 
 
-def get_existing_urls(urls: list[str]) -> set[str]:
+# Até aqui um IN (?, ...) só, abaixo do limite antigo de 999 parâmetros do SQLite;
+# acima disso a tabela temporária compensa as escritas extras
+_URL_PROBE_IN_LIMIT = 900
+
+
+def get_existing_urls(urls: Iterable[str]) -> frozenset[str]:
     """Batch check which URLs already exist in database"""
+    urls = set(urls)
     if not urls:
-        return set()
+        return frozenset()
     with get_connection() as conn:
         cursor = conn.cursor()
-        placeholders = ','.join('?' * len(urls))
-        cursor.execute(f"SELECT url FROM ads WHERE url IN ({placeholders})", urls)
-        return {row['url'] for row in cursor.fetchall()}
+        if len(urls) <= _URL_PROBE_IN_LIMIT:
+            placeholders = ','.join('?' * len(urls))
+            cursor.execute(f"SELECT url FROM ads WHERE url IN ({placeholders})", list(urls))
+            return frozenset(row['url'] for row in cursor.fetchall())
+        # Lote grande: tabela temporária em vez de IN (?, ?, ...), sem limite de parâmetros e join pelo índice de url
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS _url_probe (url TEXT PRIMARY KEY)")
+        cursor.execute("DELETE FROM _url_probe")
+        cursor.executemany("INSERT OR IGNORE INTO _url_probe VALUES (?)", [(url,) for url in urls])
+        cursor.execute("SELECT a.url FROM ads a JOIN _url_probe p USING (url)")
+        existing = frozenset(row['url'] for row in cursor.fetchall())
+        conn.commit()
+        return existing
 
 
 def create_ad(url: str, title: str, price: str, description: str, state: str,
               municipality: str, neighbourhood: str, zipcode: str, seller: str,
               condition: str, published_at: str, main_category: str, sub_category: str,
               hobbie_type: str, images: list, olx_pay: bool, olx_delivery: bool,
-              search_id: int, cheap_threshold: float = None):
+              search_id: int, cheap_threshold: float = None, watching: bool = False) -> Optional[int]:
+    """Insere o anúncio e retorna o id; None se a URL já estava cadastrada.
+    Com watching, já nasce acompanhado: o preço inicial entra no histórico na mesma transação."""
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             INSERT INTO ads (url, title, price, description, state, municipality,
                            neighbourhood, zipcode, seller, condition, published_at,
                            main_category, sub_category, hobbie_type, images,
-                           olx_pay, olx_delivery, search_id, cheap_threshold)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                           olx_pay, olx_delivery, search_id, cheap_threshold, watching)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO NOTHING
+            RETURNING id
         """, (url, title, price, description, state, municipality, neighbourhood,
               zipcode, seller, condition, published_at, main_category, sub_category,
-              hobbie_type, json.dumps(images), olx_pay, olx_delivery, search_id, cheap_threshold))
+              hobbie_type, _dumps(images), olx_pay, olx_delivery, search_id, cheap_threshold,
+              watching))
+        row = cursor.fetchone()
+        if row is not None and watching and price:
+            cursor.execute("INSERT INTO price_history (ad_id, price) VALUES (?, ?)", (row['id'], price))
         conn.commit()
-        return cursor.lastrowid
+    if row is None:
+        return None
+    _invalidate_states_cache(state)
+    if watching and images:
+        _image_executor.submit(_download_images, row['id'], images)
+    return row['id']
+
+
+_AD_INSERT_COLUMNS = (
+    'url', 'title', 'price', 'description', 'state', 'municipality', 'neighbourhood',
+    'zipcode', 'seller', 'condition', 'published_at', 'main_category', 'sub_category',
+    'hobbie_type', 'images', 'olx_pay', 'olx_delivery', 'search_id', 'cheap_threshold',
+)
+
+
+def create_ads_bulk(ads: list[dict]) -> dict[str, int]:
+    """Insere vários anúncios numa única transação; retorna {url: id}"""
+    if not ads:
+        return {}
+    rows = [{'cheap_threshold': None, **ad, 'images': _dumps(ad.get('images') or [])}
+            for ad in ads]
+    columns = ', '.join(_AD_INSERT_COLUMNS)
+    values = ', '.join(f':{col}' for col in _AD_INSERT_COLUMNS)
+    urls = [row['url'] for row in rows]
+
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(f"INSERT INTO ads ({columns}) VALUES ({values}) ON CONFLICT(url) DO NOTHING", rows)
+        conn.commit()
+        placeholders = ','.join('?' * len(urls))
+        cursor = conn.execute(f"SELECT id, url FROM ads WHERE url IN ({placeholders})", urls)
+        ids = {row['url']: row['id'] for row in cursor.fetchall()}
+
+    for state in {row['state'] for row in rows}:
+        _invalidate_states_cache(state)
+    return ids
 
 
 def mark_ad_seen(ad_id: int):
@@ -391,69 +681,124 @@ def mark_ad_seen(ad_id: int):
         conn.commit()
 
 
+# Uma thread enfileira os anúncios; cada um baixa suas imagens em paralelo (services.images)
+_image_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ad-images')
+
+
+def _download_images(ad_id: int, images: list, refresh: bool = False):
+    try:
+        # Import local: services.images puxa requests, que só o worker precisa
+        from services.images import download_ad_images
+        download_ad_images(ad_id, images, refresh=refresh)
+    except Exception as e:
+        logger.warning(f"Erro ao baixar imagens do anúncio {ad_id}: {e}", exc_info=True)
+
+
 def toggle_ad_watching(ad_id: int) -> bool:
     """
     Toggle watching status. Returns True if now watching, False if stopped.
-    Downloads images and saves initial price to history when starting to watch.
+    Saves initial price to history and queues the image download when starting to watch.
     """
-    from services.images import download_ad_images
-
     with get_connection() as conn:
         cursor = conn.cursor()
 
-        # Pegar estado atual, imagens e preço
-        cursor.execute("SELECT watching, images, price FROM ads WHERE id = ?", (ad_id,))
+        # Inverte e lê o novo estado, imagens e preço num único statement
+        cursor.execute("""
+            UPDATE ads SET watching = NOT COALESCE(watching, 0) WHERE id = ?
+            RETURNING watching, images, price
+        """, (ad_id,))
         row = cursor.fetchone()
         if not row:
+            conn.commit()
             return False
 
-        was_watching = bool(row['watching'])
-        now_watching = not was_watching
+        now_watching = bool(row['watching'])
 
-        # Atualizar no banco
-        cursor.execute("UPDATE ads SET watching = ? WHERE id = ?", (now_watching, ad_id))
+        # Preço inicial no histórico na mesma transação do toggle
+        if now_watching and row['price']:
+            cursor.execute("INSERT INTO price_history (ad_id, price) VALUES (?, ?)",
+                           (ad_id, row['price']))
         conn.commit()
 
-        # Se começou a acompanhar
-        if now_watching:
-            # Salvar preço inicial no histórico
-            if row['price']:
-                add_price_history(ad_id, row['price'])
-
-            # Baixar imagens
-            if row['images']:
-                try:
-                    images = json.loads(row['images']) if isinstance(row['images'], str) else row['images']
-                    if images:
-                        download_ad_images(ad_id, images)
-                except Exception as e:
-                    print(f"Erro ao baixar imagens do anúncio {ad_id}: {e}")
+    # Baixar imagens em segundo plano; o toggle retorna sem esperar a rede.
+    # Se o anúncio já foi acompanhado antes, as imagens salvas são só revalidadas
+    if now_watching and row['images']:
+        images = _loads(row['images']) if isinstance(row['images'], str) else row['images']
+        if images:
+            _image_executor.submit(_download_images, ad_id, images, True)
 
-        return now_watching
+    return now_watching
 
 
-def get_watching_ads(min_price=None, max_price=None, state=None):
+def get_watching_ads(min_price=None, max_price=None, state=None, with_history=False):
+    """Anúncios acompanhados. Com with_history, cada linha já traz recent_prices
+    (JSON com os últimos 5 preços, do mais antigo ao mais recente), first_price e
+    last_price (primeiro e último do histórico), variation (% entre os dois) e
+    distinct_price_count (quantos preços diferentes há entre os últimos 5)."""
     with get_connection() as conn:
         cursor = conn.cursor()
-        query = "SELECT * FROM ads WHERE watching = 1"
+        if with_history:
+            query = """
+                SELECT ads.*,
+                    (SELECT json_group_array(price) FROM (
+                        SELECT * FROM (
+                            SELECT price, checked_at, id FROM price_history
+                            WHERE ad_id = ads.id
+                            ORDER BY checked_at DESC, id DESC LIMIT 5
+                        ) ORDER BY checked_at ASC, id ASC
+                    )) AS recent_prices
+                FROM ads WHERE watching = 1"""
+        else:
+            query = "SELECT * FROM ads WHERE watching = 1"
         params = []
 
         if min_price is not None:
-            query += " AND CAST(REPLACE(REPLACE(price, '.', ''), ',', '.') AS REAL) >= ?"
-            params.append(min_price)
+            query += " AND price_cents >= ?"
+            params.append(_cents(min_price))
 
         if max_price is not None:
-            query += " AND CAST(REPLACE(REPLACE(price, '.', ''), ',', '.') AS REAL) <= ?"
-            params.append(max_price)
+            query += " AND price_cents <= ?"
+            params.append(_cents(max_price))
 
         if state:
             query += " AND state = ?"
             params.append(state)
 
+        if with_history:
+            # Primeiro e último preço de cada anúncio numa passada só pelo histórico
+            query = f"""
+                WITH bounds AS (
+                    SELECT ad_id,
+                        MAX(CASE WHEN rn = 1 THEN price END) AS first_price,
+                        MAX(CASE WHEN rn = total THEN price END) AS last_price
+                    FROM (
+                        SELECT ad_id, price,
+                            ROW_NUMBER() OVER (PARTITION BY ad_id ORDER BY checked_at, id) AS rn,
+                            COUNT(*) OVER (PARTITION BY ad_id) AS total
+                        FROM price_history
+                        WHERE ad_id IN (SELECT id FROM ads WHERE watching = 1)
+                    )
+                    GROUP BY ad_id
+                )
+                SELECT w.*, b.first_price, b.last_price,
+                    CASE WHEN price_num(b.first_price) != 0
+                        THEN (price_num(b.last_price) - price_num(b.first_price)) * 100.0
+                            / price_num(b.first_price)
+                        ELSE 0 END AS variation,
+                    (SELECT COUNT(DISTINCT value) FROM json_each(w.recent_prices)) AS distinct_price_count
+                FROM ({query}) w
+                LEFT JOIN bounds b ON b.ad_id = w.id"""
+
         query += " ORDER BY found_at DESC"
         cursor.execute(query, params)
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        return _fetch_dicts(cursor)
+
+
+def get_watching_ads_images() -> list[tuple[int, list[str]]]:
+    """(id, imagens) dos anúncios acompanhados; só as colunas necessárias, JSON já decodificado"""
+    with get_connection() as conn:
+        cursor = conn.execute("SELECT id, images FROM ads WHERE watching = 1 ORDER BY id")
+        return [(ad_id, _loads(images) if images else []) for ad_id, images in cursor.fetchall()]
 
 
 def update_ad_price(ad_id: int, new_price: str):
@@ -463,6 +808,15 @@ def update_ad_price(ad_id: int, new_price: str):
         conn.commit()
 
 
+def update_ad_prices_bulk(rows: list[tuple[int, str]]):
+    """Atualiza o preço de vários anúncios numa única transação; rows = [(ad_id, price)]"""
+    if not rows:
+        return
+    with get_connection() as conn:
+        conn.executemany("UPDATE ads SET price = ? WHERE id = ?", [(price, ad_id) for ad_id, price in rows])
+        conn.commit()
+
+
 def update_ad_status(ad_id: int, status: str):
     with get_connection() as conn:
         cursor = conn.cursor()
@@ -479,17 +833,39 @@ def update_ad_status(ad_id: int, status: str):
         conn.commit()
 
 
-def get_ads_to_check():
-    """Get active ads to check their status"""
+def update_ads_status_bulk(rows: list[tuple[int, str]]):
+    """Atualiza o status de vários anúncios numa única transação; rows = [(ad_id, status)]"""
+    if not rows:
+        return
+    with get_connection() as conn:
+        conn.executemany("""
+            UPDATE ads
+            SET status = ?,
+                deactivated_at = CASE WHEN ? = 'inactive' THEN CURRENT_TIMESTAMP ELSE NULL END
+            WHERE id = ?
+        """, [(status, status, ad_id) for ad_id, status in rows])
+        conn.commit()
+
+
+def get_ads_to_check(limit: Optional[int] = None, after: Optional[dict] = None):
+    """Get active ads to check their status, newest first.
+
+    Com limit, devolve uma página; a próxima começa depois da última linha (after).
+    Paginação por chave (found_at, id) em vez de OFFSET: anúncios desativados entre
+    uma página e outra não fazem o job pular linhas."""
+    query = "SELECT id, url, found_at FROM ads WHERE status = 'active'"
+    params: list = []
+    if after is not None:
+        query += " AND (found_at, id) < (?, ?)"
+        params += [after['found_at'], after['id']]
+    query += " ORDER BY found_at DESC, id DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
     with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, url FROM ads
-            WHERE status = 'active'
-            ORDER BY found_at DESC
-        """)
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        cursor.execute(query, params)
+        return _fetch_dicts(cursor)
 
 
 def get_inactive_ads(min_price=None, max_price=None, state=None, search_text=None):
@@ -499,18 +875,18 @@ def get_inactive_ads(min_price=None, max_price=None, state=None, search_text=Non
         query = "SELECT * FROM ads WHERE status = 'inactive'"
         params = []
 
-        if search_text:
-            query += " AND (LOWER(title) LIKE ? OR LOWER(description) LIKE ?)"
-            search_pattern = f"%{search_text.lower()}%"
-            params.extend([search_pattern, search_pattern])
+        fts_query = _fts_query(search_text) if search_text else None
+        if fts_query:
+            query += " AND id IN (SELECT rowid FROM ads_fts WHERE ads_fts MATCH ?)"
+            params.append(fts_query)
 
         if min_price is not None:
-            query += " AND CAST(REPLACE(REPLACE(price, '.', ''), ',', '.') AS REAL) >= ?"
-            params.append(min_price)
+            query += " AND price_cents >= ?"
+            params.append(_cents(min_price))
 
         if max_price is not None:
-            query += " AND CAST(REPLACE(REPLACE(price, '.', ''), ',', '.') AS REAL) <= ?"
-            params.append(max_price)
+            query += " AND price_cents <= ?"
+            params.append(_cents(max_price))
 
         if state:
             query += " AND state = ?"
@@ -518,8 +894,7 @@ def get_inactive_ads(min_price=None, max_price=None, state=None, search_text=Non
 
         query += " ORDER BY deactivated_at DESC"
         cursor.execute(query, params)
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        return _fetch_dicts(cursor)
 
 
 def get_ads_count_by_search():
@@ -549,11 +924,34 @@ def get_ads_count(search_id: Optional[int] = None, status: str = "all",
         return cursor.fetchone()['count']
 
 
+def _load_states_cache() -> tuple[float, list[str], dict]:
+    global _states_cache
+    if _states_cache is None or time.monotonic() - _states_cache[0] > STATES_CACHE_TTL:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT DISTINCT state FROM ads WHERE state IS NOT NULL AND state != '' ORDER BY state")
+            states = [row['state'] for row in cursor.fetchall()]
+        options = {None: 'Todos'}
+        options.update((s, s.replace('#', '')) for s in states)
+        _states_cache = (time.monotonic(), states, options)
+    return _states_cache
+
+
+def _invalidate_states_cache(state: Optional[str] = None):
+    """Descarta o cache, a não ser que o estado informado já esteja nele"""
+    global _states_cache
+    if _states_cache is not None and state and state in _states_cache[1]:
+        return
+    _states_cache = None
+
+
 def get_distinct_states():
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT state FROM ads WHERE state IS NOT NULL AND state != '' ORDER BY state")
-        return [row['state'] for row in cursor.fetchall()]
+    return list(_load_states_cache()[1])
+
+
+def get_state_options() -> dict:
+    """Opções do select de estado ({None: 'Todos', '#SP': 'SP', ...})"""
+    return dict(_load_states_cache()[2])
 
 
 # ==================== PRICE HISTORY ====================
@@ -568,16 +966,33 @@ def add_price_history(ad_id: int, price: str):
         conn.commit()
 
 
+def add_price_history_bulk(rows: list[tuple[int, str]]):
+    """Registra vários preços numa única transação; rows = [(ad_id, price)]"""
+    if not rows:
+        return
+    with get_connection() as conn:
+        conn.executemany("INSERT INTO price_history (ad_id, price) VALUES (?, ?)", rows)
+        conn.commit()
+
+
 def get_price_history(ad_id: int):
+    return get_price_histories([ad_id]).get(ad_id, [])
+
+
+def get_price_histories(ad_ids: list[int]) -> dict[int, list[dict]]:
+    """Histórico de vários anúncios numa consulta só: {ad_id: [linhas em ordem cronológica]}"""
+    if not ad_ids:
+        return {}
     with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
+        placeholders = ','.join('?' * len(ad_ids))
+        cursor.execute(f"""
             SELECT * FROM price_history
-            WHERE ad_id = ?
-            ORDER BY checked_at ASC
-        """, (ad_id,))
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+            WHERE ad_id IN ({placeholders})
+            ORDER BY ad_id, checked_at ASC, id ASC
+        """, list(ad_ids))
+        rows = _fetch_dicts(cursor)
+    return {ad_id: list(group) for ad_id, group in groupby(rows, key=lambda row: row['ad_id'])}
 
 
 def get_last_price_check(ad_id: int):
@@ -593,6 +1008,23 @@ def get_last_price_check(ad_id: int):
         return dict(row) if row else None
 
 
+def get_last_price_checks(ad_ids: list[int]) -> dict[int, str]:
+    """Último preço verificado de vários anúncios numa consulta só: {ad_id: price}"""
+    if not ad_ids:
+        return {}
+    with get_connection() as conn:
+        placeholders = ','.join('?' * len(ad_ids))
+        cursor = conn.execute(f"""
+            SELECT ad_id, price FROM (
+                SELECT ad_id, price, ROW_NUMBER() OVER (
+                    PARTITION BY ad_id ORDER BY checked_at DESC, id DESC
+                ) AS rn
+                FROM price_history WHERE ad_id IN ({placeholders})
+            ) WHERE rn = 1
+        """, list(ad_ids))
+        return {row['ad_id']: row['price'] for row in cursor.fetchall()}
+
+
 # ==================== PRICE ALERTS ====================
 
 def create_price_alert(ad_id: int, target_price: float, notify_below: bool = True) -> int:
@@ -633,8 +1065,29 @@ def get_active_price_alerts():
             JOIN ads a ON pa.ad_id = a.id
             WHERE pa.active = 1 AND a.status = 'active'
         """)
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        return _fetch_dicts(cursor)
+
+
+def get_triggerable_price_alerts():
+    """Alertas ativos, ainda não disparados, cujo anúncio já atingiu o alvo (com dados do anúncio)"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        # Compara em centavos pela coluna gerada, como os filtros de preço das listagens.
+        # O CAST da coluna vira 0 para texto inválido ("R$ 100", "abc"); só preços no formato
+        # "1.234,56" (dígitos, ponto e vírgula) entram, senão todo alerta "abaixo de" dispararia
+        cursor.execute("""
+            SELECT pa.*, a.title, a.price, a.url, a.images
+            FROM price_alerts pa
+            JOIN ads a ON pa.ad_id = a.id
+            WHERE pa.active = 1 AND a.status = 'active' AND pa.triggered_at IS NULL
+              AND a.price_cents IS NOT NULL
+              AND a.price GLOB '[0-9]*' AND a.price NOT GLOB '*[^0-9.,]*'
+              AND CASE WHEN pa.notify_below
+                    THEN a.price_cents <= ROUND(pa.target_price * 100)
+                    ELSE a.price_cents >= ROUND(pa.target_price * 100)
+                  END
+        """)
+        return _fetch_dicts(cursor)
 
 
 def update_price_alert(ad_id: int, active: bool = None, triggered_at: str = None):
@@ -703,8 +1156,7 @@ def get_all_push_subscriptions():
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT endpoint, p256dh, auth FROM push_subscriptions")
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        return _fetch_dicts(cursor)
 
 
 def delete_push_subscription(endpoint: str):
@@ -715,6 +1167,16 @@ def delete_push_subscription(endpoint: str):
         conn.commit()
 
 
+def delete_push_subscriptions_bulk(endpoints: list[str]):
+    """Delete several push subscriptions in a single transaction"""
+    if not endpoints:
+        return
+    with get_connection() as conn:
+        conn.executemany("DELETE FROM push_subscriptions WHERE endpoint = ?",
+                         [(endpoint,) for endpoint in endpoints])
+        conn.commit()
+
+
 # ==================== NOTIFICATION HISTORY ====================
 
 def save_notification(
@@ -749,7 +1211,7 @@ def get_notification_history(limit: int = 20, offset: int = 0):
             ORDER BY sent_at DESC
             LIMIT ? OFFSET ?
         """, (limit, offset))
-        return [dict(row) for row in cursor.fetchall()]
+        return _fetch_dicts(cursor)
 
 
 def get_unread_notification_count() -> int:
@@ -764,6 +1226,11 @@ def mark_notifications_read():
     """Mark all notifications as read"""
     with get_connection() as conn:
         cursor = conn.cursor()
+        # Evita o UPDATE (e o lock de escrita) quando não há nada a marcar
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM notification_history WHERE read_at IS NULL)")
+        if not cursor.fetchone()[0]:
+            return 0
+
         cursor.execute("""
             UPDATE notification_history
             SET read_at = CURRENT_TIMESTAMP
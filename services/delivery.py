@@ -1,5 +1,8 @@
 """Serviço para consultar frete do OLX"""
 
+import asyncio
+import threading
+import time
 import httpx
 from typing import Optional
 from dataclasses import dataclass
@@ -15,6 +18,70 @@ HEADERS = {
     "Referer": "https://www.olx.com.br/",
 }
 
+# Clientes de vida longa: reaproveitam DNS/TCP/TLS entre consultas e multiplexam via HTTP/2
+CLIENT_OPTIONS = {
+    "http2": True,
+    "timeout": 10,
+    "headers": HEADERS,
+    "limits": httpx.Limits(max_keepalive_connections=20),
+}
+
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.Client:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = httpx.Client(**CLIENT_OPTIONS)
+    return _client
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """Cliente assíncrono do event loop da UI (único lugar que consulta frete async)"""
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(**CLIENT_OPTIONS)
+    return _async_client
+
+
+# Frete muda pouco: guarda cotações por (list_id, CEP); erros não entram no cache
+QUOTE_CACHE_TTL = 3600
+QUOTE_CACHE_MAX = 10_000
+_quote_cache: dict[tuple, tuple[float, Optional["DeliveryQuote"]]] = {}
+_quote_locks: dict[tuple, asyncio.Lock] = {}
+_MISS = object()
+
+
+def _cached_quote(key: tuple):
+    entry = _quote_cache.get(key)
+    if entry is None or time.monotonic() - entry[0] > QUOTE_CACHE_TTL:
+        return _MISS
+    return entry[1]
+
+
+def _store_quote(key: tuple, quote: Optional["DeliveryQuote"]) -> Optional["DeliveryQuote"]:
+    if key not in _quote_cache and len(_quote_cache) >= QUOTE_CACHE_MAX:
+        _quote_cache.pop(next(iter(_quote_cache)))
+    _quote_cache[key] = (time.monotonic(), quote)
+    # Quem ainda espera o lock já o tem em mãos; novas chamadas caem no cache
+    _quote_locks.pop(key, None)
+    return quote
+
+
+async def close_clients():
+    """Fecha os clientes compartilhados (chamado no shutdown do app)"""
+    global _client, _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
 
 @dataclass
 class DeliveryOption:
@@ -41,21 +108,12 @@ class DeliveryQuote:
         return self.standard or self.express
 
 
-def get_delivery_quote(list_id: int, zipcode: Optional[str] = None) -> Optional[DeliveryQuote]:
-    """
-    Consulta o frete para um anúncio.
+# Transportadoras que viram opção na cotação ('Retirar' e outras ficam de fora)
+QUOTE_SLOTS = {'Padrão': 'standard', 'Expressa': 'express'}
 
-    Args:
-        list_id: ID do anúncio (listId extraído da URL)
-        zipcode: CEP de destino (se não informado, usa o da configuração)
 
-    Returns:
-        DeliveryQuote com as opções de frete ou None se não disponível
-    """
-    if zipcode is None:
-        zipcode = get_setting('delivery_zipcode', '72860175')
-
-    payload = {
+def _build_payload(list_id: int, zipcode: str) -> dict:
+    return {
         "zipCode": zipcode,
         "listId": list_id,
         "searchCategoryLevelZero": 16000,
@@ -64,40 +122,53 @@ def get_delivery_quote(list_id: int, zipcode: Optional[str] = None) -> Optional[
         "weight": 1.0
     }
 
-    try:
-        with httpx.Client(timeout=10) as client:
-            response = client.post(DELIVERY_API, json=payload, headers=HEADERS)
-            response.raise_for_status()
-            data = response.json()
 
-            quote = DeliveryQuote()
+def _parse_quote(data: dict) -> Optional[DeliveryQuote]:
+    """Monta a cotação a partir da resposta da API; None se não houver entrega"""
+    quote = DeliveryQuote()
+
+    for opt in data.get('deliveryOptions', ()):
+        company_name = opt.get('company', {}).get('name', '')
+        slot = QUOTE_SLOTS.get(company_name)
+        if slot is None:
+            continue
+
+        price_data = opt.get('price', {})
+        price_raw = price_data.get('raw', 0)
+        setattr(quote, slot, DeliveryOption(
+            name=company_name,
+            price=price_raw,
+            price_label=price_data.get('label', f'R$ {price_raw:.2f}'),
+            days=opt.get('dueDate', 0),
+            is_free=price_raw == 0
+        ))
 
-            for opt in data.get('deliveryOptions', []):
-                company_name = opt.get('company', {}).get('name', '')
-                price_data = opt.get('price', {})
-                price_raw = price_data.get('raw', 0)
-                price_label = price_data.get('label', f'R$ {price_raw:.2f}')
-                days = opt.get('dueDate', 0)
-                is_free = price_raw == 0 and company_name != 'Retirar'
+    return quote if quote.has_delivery else None
 
-                if company_name == 'Retirar':
-                    continue
 
-                option = DeliveryOption(
-                    name=company_name,
-                    price=price_raw,
-                    price_label=price_label,
-                    days=days,
-                    is_free=is_free
-                )
+def get_delivery_quote(list_id: int, zipcode: Optional[str] = None) -> Optional[DeliveryQuote]:
+    """
+    Consulta o frete para um anúncio.
+
+    Args:
+        list_id: ID do anúncio (listId extraído da URL)
+        zipcode: CEP de destino (se não informado, usa o da configuração)
 
-                if company_name == 'Padrão':
-                    quote.standard = option
-                elif company_name == 'Expressa':
-                    quote.express = option
+    Returns:
+        DeliveryQuote com as opções de frete ou None se não disponível
+    """
+    if zipcode is None:
+        zipcode = get_setting('delivery_zipcode', '72860175')
 
-            return quote if quote.has_delivery else None
+    key = (list_id, zipcode)
+    cached = _cached_quote(key)
+    if cached is not _MISS:
+        return cached
 
+    try:
+        response = _get_client().post(DELIVERY_API, json=_build_payload(list_id, zipcode))
+        response.raise_for_status()
+        return _store_quote(key, _parse_quote(response.json()))
     except Exception:
         return None
 
@@ -109,48 +180,22 @@ async def get_delivery_quote_async(list_id: int, zipcode: Optional[str] = None)
     if zipcode is None:
         zipcode = get_setting('delivery_zipcode', '72860175')
 
-    payload = {
-        "zipCode": zipcode,
-        "listId": list_id,
-        "searchCategoryLevelZero": 16000,
-        "searchCategoryLevelOne": 16040,
-        "searchCategoryLevelTwo": None,
-        "weight": 1.0
-    }
-
-    try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.post(DELIVERY_API, json=payload, headers=HEADERS)
-            response.raise_for_status()
-            data = response.json()
-
-            quote = DeliveryQuote()
+    key = (list_id, zipcode)
+    cached = _cached_quote(key)
+    if cached is not _MISS:
+        return cached
 
-            for opt in data.get('deliveryOptions', []):
-                company_name = opt.get('company', {}).get('name', '')
-                price_data = opt.get('price', {})
-                price_raw = price_data.get('raw', 0)
-                price_label = price_data.get('label', f'R$ {price_raw:.2f}')
-                days = opt.get('dueDate', 0)
-                is_free = price_raw == 0 and company_name != 'Retirar'
+    # Consultas simultâneas do mesmo anúncio esperam a primeira em vez de repetir a requisição
+    lock = _quote_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        cached = _cached_quote(key)
+        if cached is not _MISS:
+            return cached
 
-                if company_name == 'Retirar':
-                    continue
-
-                option = DeliveryOption(
-                    name=company_name,
-                    price=price_raw,
-                    price_label=price_label,
-                    days=days,
-                    is_free=is_free
-                )
-
-                if company_name == 'Padrão':
-                    quote.standard = option
-                elif company_name == 'Expressa':
-                    quote.express = option
-
-            return quote if quote.has_delivery else None
-
-    except Exception:
-        return None
+        try:
+            response = await _get_async_client().post(DELIVERY_API, json=_build_payload(list_id, zipcode))
+            response.raise_for_status()
+            return _store_quote(key, _parse_quote(response.json()))
+        except Exception:
+            _quote_locks.pop(key, None)
+            return None
@@ -1,9 +1,51 @@
+import os
+import shutil
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import formatdate
 from pathlib import Path
+from typing import Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from services.logger import get_logger
+
+logger = get_logger("olx_monitor.images")
 
 # Pasta para armazenar imagens locais
 IMAGES_DIR = Path(__file__).parent.parent / "data" / "images"
 
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
+}
+
+# Downloads simultâneos por anúncio e no lote de todos os acompanhados;
+# o pool do adapter acompanha o maior para não descartar conexões
+IMAGE_WORKERS = 8
+BATCH_WORKERS = 16
+# Bloco de cópia resposta -> disco; poucas chamadas de write sem segurar a imagem inteira na memória
+CHUNK_SIZE = 1024 * 1024
+# Erros transitórios do CDN: tenta de novo com backoff curto em vez de perder a imagem
+RETRIES = Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+
+# Sessão compartilhada: reaproveita conexões TCP/TLS com o CDN entre imagens e anúncios
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update(HEADERS)
+            adapter = HTTPAdapter(
+                pool_connections=IMAGE_WORKERS, pool_maxsize=BATCH_WORKERS, max_retries=RETRIES
+            )
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+    return _session
+
 
 def ensure_images_dir():
     """Cria a pasta de imagens se não existir"""
@@ -15,100 +57,230 @@ def get_local_image_path(ad_id: int, index: int) -> Path:
     return IMAGES_DIR / f"{ad_id}_{index}.jpg"
 
 
-def download_ad_images(ad_id: int, image_urls: list[str]) -> list[str]:
+def _preallocate(f, response: requests.Response):
+    """Reserva o tamanho do arquivo de uma vez quando o servidor informa (e não comprime) o corpo"""
+    size = response.headers.get('Content-Length')
+    if not size or response.headers.get('Content-Encoding') or not hasattr(os, 'posix_fallocate'):
+        return
+    try:
+        os.posix_fallocate(f.fileno(), 0, int(size))
+    except (OSError, ValueError):
+        pass
+
+
+def _etag_path(local_path: Path) -> Path:
+    """Arquivo ao lado da imagem com o ETag recebido do CDN"""
+    return local_path.with_name(local_path.name + '.etag')
+
+
+def _download_image(session: requests.Session, url: str, local_path: Path,
+                    refresh: bool = False) -> Optional[str]:
+    """Baixa uma imagem em streaming; grava em .part e renomeia para não deixar arquivo pela metade.
+    Com refresh, uma imagem existente é revalidada (If-None-Match/If-Modified-Since) em vez de pulada."""
+    try:
+        headers = {}
+        if local_path.exists():
+            # Pula se já existe
+            if not refresh:
+                return str(local_path)
+            etag_path = _etag_path(local_path)
+            if etag_path.exists():
+                headers['If-None-Match'] = etag_path.read_text()
+            headers['If-Modified-Since'] = formatdate(local_path.stat().st_mtime, usegmt=True)
+
+        response = session.get(url, timeout=30, stream=True, headers=headers)
+        try:
+            # Não mudou: só renova o mtime, nenhum byte baixado ou gravado
+            if response.status_code == 304:
+                local_path.touch()
+                return str(local_path)
+
+            if response.status_code != 200:
+                logger.warning(f"Erro ao baixar imagem {url}: {response.status_code}")
+                return None
+
+            tmp_path = local_path.with_suffix('.part')
+            response.raw.decode_content = True
+            with open(tmp_path, 'wb', buffering=CHUNK_SIZE) as f:
+                _preallocate(f, response)
+                shutil.copyfileobj(response.raw, f, length=CHUNK_SIZE)
+                f.truncate()
+            tmp_path.replace(local_path)
+
+            etag = response.headers.get('ETag')
+            if etag:
+                _etag_path(local_path).write_text(etag)
+        finally:
+            response.close()
+
+        _update_index(local_path, present=True)
+        logger.debug(f"Imagem salva: {local_path.name}")
+        return str(local_path)
+
+    except Exception as e:
+        logger.warning(f"Erro ao baixar imagem {url}: {e}")
+        return None
+
+
+def download_ad_images(ad_id: int, image_urls: list[str], refresh: bool = False) -> list[str]:
     """
-    Baixa as imagens de um anúncio para armazenamento local.
-    Retorna lista de paths locais das imagens baixadas.
+    Baixa as imagens de um anúncio para armazenamento local, em paralelo.
+    Com refresh, revalida as que já existem (304 não baixa nada).
+    Retorna lista de paths locais das imagens baixadas, na ordem das URLs.
     """
     ensure_images_dir()
-    local_paths = []
+    if not image_urls:
+        return []
 
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
-    }
+    session = _get_session()
+    results: list[Optional[str]] = [None] * len(image_urls)
 
-    for i, url in enumerate(image_urls):
-        try:
-            local_path = get_local_image_path(ad_id, i)
+    with ThreadPoolExecutor(max_workers=min(IMAGE_WORKERS, len(image_urls))) as executor:
+        futures = {
+            executor.submit(_download_image, session, url, get_local_image_path(ad_id, i), refresh): i
+            for i, url in enumerate(image_urls)
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
 
-            # Pula se já existe
-            if local_path.exists():
-                local_paths.append(str(local_path))
-                continue
+    return [path for path in results if path is not None]
 
-            response = requests.get(url, headers=headers, timeout=30)
-            if response.status_code == 200:
-                with open(local_path, 'wb') as f:
-                    f.write(response.content)
-                local_paths.append(str(local_path))
-                print(f"Imagem salva: {local_path.name}")
-            else:
-                print(f"Erro ao baixar imagem {url}: {response.status_code}")
 
-        except Exception as e:
-            print(f"Erro ao baixar imagem {url}: {e}")
+# Índice em memória das imagens salvas: (diretório, mtime_ns, ad_id -> bitmask dos índices).
+# Escritas deste processo atualizam os bits na hora; só mudança externa no diretório
+# (mtime diferente do registrado) força reler a listagem inteira.
+_index: Optional[tuple[str, int, dict[int, int]]] = None
+_index_lock = threading.Lock()
 
-    return local_paths
 
+def _parse_image_name(name: str) -> Optional[tuple[int, int]]:
+    """"12_3.jpg" -> (12, 3); None para .part, .etag e outros arquivos"""
+    stem, _, ext = name.partition('.')
+    ad_id, _, index = stem.partition('_')
+    if ext == 'jpg' and ad_id.isdigit() and index.isdigit():
+        return int(ad_id), int(index)
+    return None
 
-def get_local_images(ad_id: int) -> list[str]:
-    """Retorna lista de URLs das imagens locais de um anúncio"""
-    ensure_images_dir()
-    local_images = []
 
-    i = 0
-    while True:
-        path = get_local_image_path(ad_id, i)
-        if path.exists():
-            # Retorna URL para o servidor servir
-            local_images.append(f"/images/{ad_id}_{i}.jpg")
-            i += 1
+def _scan_images_dir(images_dir: str) -> dict[int, int]:
+    """Bitmask das imagens de cada anúncio, numa leitura só do diretório"""
+    masks: dict[int, int] = {}
+    with os.scandir(images_dir) as entries:
+        for entry in entries:
+            parsed = _parse_image_name(entry.name)
+            if parsed:
+                ad_id, index = parsed
+                masks[ad_id] = masks.get(ad_id, 0) | (1 << index)
+    return masks
+
+
+def _local_mask(ad_id: int) -> int:
+    global _index
+    try:
+        mtime_ns = IMAGES_DIR.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+    images_dir = str(IMAGES_DIR)
+    with _index_lock:
+        if _index is None or _index[0] != images_dir or _index[1] != mtime_ns:
+            _index = (images_dir, mtime_ns, _scan_images_dir(images_dir))
+        return _index[2].get(ad_id, 0)
+
+
+def _update_index(path: Path, present: bool):
+    """Registra uma imagem gravada/removida por este processo sem reler o diretório"""
+    global _index
+    parsed = _parse_image_name(path.name)
+    if parsed is None:
+        return
+    ad_id, index = parsed
+    with _index_lock:
+        if _index is None or _index[0] != str(path.parent):
+            return
+        masks = _index[2]
+        mask = masks.get(ad_id, 0)
+        mask = mask | (1 << index) if present else mask & ~(1 << index)
+        if mask:
+            masks[ad_id] = mask
         else:
-            break
+            masks.pop(ad_id, None)
+        _index = (_index[0], path.parent.stat().st_mtime_ns, masks)
 
-    return local_images
+
+def _local_indexes(ad_id: int) -> list[int]:
+    """Índices das imagens salvas do anúncio, em ordem; lacunas (download que falhou) não cortam a lista"""
+    mask = _local_mask(ad_id)
+    indexes = []
+    while mask:
+        lowest = mask & -mask
+        indexes.append(lowest.bit_length() - 1)
+        mask ^= lowest
+    return indexes
+
+
+def get_local_images(ad_id: int) -> list[str]:
+    """Retorna lista de URLs das imagens locais de um anúncio"""
+    ensure_images_dir()
+    # Retorna URL para o servidor servir
+    return [f"/images/{ad_id}_{i}.jpg" for i in _local_indexes(ad_id)]
 
 
 def delete_ad_images(ad_id: int):
     """Remove todas as imagens locais de um anúncio"""
-    i = 0
-    while True:
+    for i in _local_indexes(ad_id):
         path = get_local_image_path(ad_id, i)
-        if path.exists():
-            path.unlink()
-            i += 1
-        else:
-            break
+        path.unlink(missing_ok=True)
+        _etag_path(path).unlink(missing_ok=True)
+        _update_index(path, present=False)
 
 
 def has_local_images(ad_id: int) -> bool:
     """Verifica se o anúncio tem imagens salvas localmente"""
-    return get_local_image_path(ad_id, 0).exists()
+    return bool(_local_mask(ad_id))
 
 
-def download_watching_ads_images():
-    """Baixa imagens de todos os anúncios acompanhados que ainda não têm imagens locais"""
-    from services.database import get_watching_ads
-    import json
+def _link_image(source: Path, target: Path):
+    """Mesma imagem em outro anúncio: hardlink (0 bytes extras), cópia se o FS não suportar"""
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        pass
+    except OSError:
+        shutil.copy2(source, target)
+    _update_index(target, present=True)
 
-    ads = get_watching_ads()
-    downloaded = 0
 
-    for ad_data in ads:
-        ad_id = ad_data['id']
+def download_watching_ads_images():
+    """Baixa as imagens que faltam localmente dos anúncios acompanhados.
+    Todas as imagens de todos os anúncios entram no mesmo pool, não um anúncio por vez."""
+    from services.database import get_watching_ads_images
 
-        # Pula se já tem imagens
-        if has_local_images(ad_id):
-            continue
+    ensure_images_dir()
+    # URL -> destinos; anúncios que repetem a mesma foto baixam uma vez só
+    targets: dict[str, list[Path]] = {}
+    ad_ids = set()
 
-        images_raw = ad_data.get('images', '[]')
-        if isinstance(images_raw, str):
-            images = json.loads(images_raw) if images_raw else []
-        else:
-            images = images_raw or []
+    for ad_id, images in get_watching_ads_images():
+        # Só as imagens que faltam, inclusive lacunas de downloads que falharam antes
+        saved = set(_local_indexes(ad_id))
+        for i, url in enumerate(images):
+            if i not in saved:
+                targets.setdefault(url, []).append(get_local_image_path(ad_id, i))
+                ad_ids.add(ad_id)
+
+    if not targets:
+        return 0
 
-        if images:
-            download_ad_images(ad_id, images)
-            downloaded += 1
+    session = _get_session()
+    with ThreadPoolExecutor(max_workers=min(BATCH_WORKERS, len(targets))) as executor:
+        futures = {
+            url: executor.submit(_download_image, session, url, paths[0])
+            for url, paths in targets.items()
+        }
+        for url, future in futures.items():
+            first = future.result()
+            if first:
+                for path in targets[url][1:]:
+                    _link_image(Path(first), path)
 
-    return downloaded
+    return len(ad_ids)
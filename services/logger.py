@@ -2,35 +2,68 @@
 
 import logging
 import sys
+from array import array
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
-from collections import deque
 
 
 class MemoryHandler(logging.Handler):
-    """Handler that stores log records in memory for UI display"""
+    """Handler that stores log records in memory for UI display.
+
+    Records go into fixed-size parallel arrays used as a ring buffer; emit only
+    overwrites slots, and the dicts (with formatted timestamps) are built in get_logs.
+    """
 
     def __init__(self, max_records: int = 100):
         super().__init__()
-        self.records: deque = deque(maxlen=max_records)
+        self.max_records = max_records
+        self._reset()
+
+    def _reset(self):
+        self.created = array('d', [0.0]) * self.max_records
+        self.levels: list[Optional[str]] = [None] * self.max_records
+        self.messages: list[Optional[str]] = [None] * self.max_records
+        self.loggers: list[Optional[str]] = [None] * self.max_records
+        self.head = 0
+        self.count = 0
 
     def emit(self, record: logging.LogRecord):
-        log_entry = {
-            "timestamp": datetime.fromtimestamp(record.created).strftime("%Y-%m-%d %H:%M:%S"),
-            "level": record.levelname.lower(),
-            "message": self.format(record),
-            "logger": record.name,
-        }
-        self.records.appendleft(log_entry)
-
-    def get_logs(self) -> list[dict]:
-        """Get all stored log entries"""
-        return list(self.records)
+        # Like deque(maxlen=0): no capacity, nothing is kept
+        if not self.max_records:
+            return
+        i = self.head
+        self.created[i] = record.created
+        self.levels[i] = record.levelname
+        # The UI shows time/level/logger in their own columns, so only the message text is
+        # needed; the formatter runs just for records carrying a traceback
+        if record.exc_info or record.stack_info:
+            self.messages[i] = self.format(record)
+        else:
+            self.messages[i] = record.getMessage()
+        self.loggers[i] = record.name
+        self.head = (i + 1) % self.max_records
+        self.count = min(self.count + 1, self.max_records)
+
+    def get_logs(self, limit: Optional[int] = None) -> list[dict]:
+        """Get stored log entries, newest first; with limit, only the latest `limit`"""
+        with self.lock:
+            count = self.count if limit is None else max(0, min(limit, self.count))
+            slots = [(self.head - 1 - k) % self.max_records for k in range(count)]
+            return [
+                {
+                    "timestamp": datetime.fromtimestamp(self.created[i]).strftime("%Y-%m-%d %H:%M:%S"),
+                    "level": self.levels[i].lower(),
+                    "message": self.messages[i],
+                    "logger": self.loggers[i],
+                }
+                for i in slots
+            ]
 
     def clear(self):
         """Clear all stored log entries"""
-        self.records.clear()
+        with self.lock:
+            self._reset()
 
 
 # Global memory handler for UI access
@@ -104,10 +137,10 @@ def get_logger(name: str = "olx_monitor") -> logging.Logger:
     return logger
 
 
-def get_memory_logs() -> list[dict]:
-    """Get logs stored in memory for UI display"""
+def get_memory_logs(limit: Optional[int] = None) -> list[dict]:
+    """Get logs stored in memory for UI display (newest first, optionally only the latest `limit`)"""
     if _memory_handler:
-        return _memory_handler.get_logs()
+        return _memory_handler.get_logs(limit)
     return []
 
 
@@ -2,14 +2,13 @@
 
 import json
 import base64
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
-from pywebpush import webpush, WebPushException
-from cryptography.hazmat.primitives.asymmetric import ec
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import serialization
 
 from services.database import (
-    get_all_push_subscriptions, delete_push_subscription,
+    get_all_push_subscriptions, delete_push_subscriptions_bulk,
     get_setting, set_setting, save_notification
 )
 from services.logger import get_logger
@@ -19,6 +18,13 @@ logger = get_logger("olx_monitor.notifications")
 # Price threshold for automatic notifications on new ads
 NEW_AD_PRICE_THRESHOLD = 150.0
 
+# Max concurrent requests to push services when fanning out one notification
+PUSH_WORKERS = 16
+
+# VAPID keys never change once generated; keep them for the process lifetime
+_vapid_cache: Optional[tuple[str, str]] = None
+_vapid_lock = threading.Lock()
+
 
 def get_or_create_vapid_keys() -> tuple[str, str]:
     """
@@ -27,13 +33,35 @@ def get_or_create_vapid_keys() -> tuple[str, str]:
     Returns:
         Tuple of (public_key_b64, private_key_b64) for pywebpush
     """
+    global _vapid_cache
+    if _vapid_cache:
+        return _vapid_cache
+
+    with _vapid_lock:
+        if _vapid_cache is None:
+            _vapid_cache = _load_or_create_vapid_keys()
+    return _vapid_cache
+
+
+def reset_vapid_cache():
+    """Forget cached VAPID keys (e.g. after rotating them in the settings table)"""
+    global _vapid_cache
+    with _vapid_lock:
+        _vapid_cache = None
+
+
+def _load_or_create_vapid_keys() -> tuple[str, str]:
     public_key = get_setting('vapid_public_key')
     private_key = get_setting('vapid_private_key')
 
     if public_key and private_key:
         return public_key, private_key
 
-    # Generate new EC key pair
+    # Generate new EC key pair (cryptography is only needed on this first run)
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import serialization
+
     logger.info("Generating new VAPID keys...")
     private_key_obj = ec.generate_private_key(ec.SECP256R1(), default_backend())
     public_key_obj = private_key_obj.public_key()
@@ -63,6 +91,36 @@ def get_vapid_public_key() -> str:
     return public_key
 
 
+def _tag(prefix: str, url: str) -> str:
+    """Notification tag stable across restarts (builtin hash() is salted per process)"""
+    return f"{prefix}-{hashlib.blake2b(url.encode(), digest_size=6).hexdigest()}"
+
+
+def build_push_payload(
+    title: str,
+    body: str,
+    url: Optional[str] = None,
+    tag: Optional[str] = None,
+    image: Optional[str] = None
+) -> bytes:
+    """
+    Encode the notification once, as compact UTF-8 JSON, for every subscriber.
+
+    Each push is encrypted separately (aes128gcm), so a smaller plaintext means less
+    work and fewer bytes per subscriber. Icon and badge are left out: the service
+    worker already falls back to the app icon.
+    """
+    data = {
+        'title': title,
+        'body': body,
+        'url': url or '/',
+        'tag': tag or 'olx-monitor',
+    }
+    if image:
+        data['image'] = image
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
 def send_push_notification(
     title: str,
     body: str,
@@ -89,20 +147,15 @@ def send_push_notification(
         logger.debug("No push subscriptions found")
         return 0
 
+    # Imported here: pywebpush pulls in cryptography, which the UI doesn't need at startup
+    from pywebpush import webpush, WebPushException
+
     public_key, private_key = get_or_create_vapid_keys()
 
-    payload = json.dumps({
-        'title': title,
-        'body': body,
-        'url': url or '/',
-        'tag': tag or 'olx-monitor',
-        'image': image,
-        'icon': '/static/icon-192.png',
-        'badge': '/static/icon-192.png'
-    })
+    payload = build_push_payload(title, body, url, tag, image)
 
-    sent = 0
-    for sub in subscriptions:
+    def send_one(sub: dict) -> tuple[bool, bool]:
+        """Returns (sent, subscription_gone)"""
         try:
             webpush(
                 subscription_info={
@@ -118,16 +171,26 @@ def send_push_notification(
                     'sub': 'mailto:noreply@olx-monitor.local'
                 }
             )
-            sent += 1
+            return True, False
         except WebPushException as e:
             logger.warning(f"Push failed for {sub['endpoint'][:50]}...: {e}")
-            # Remove invalid subscriptions (410 Gone, 404 Not Found)
-            if e.response and e.response.status_code in (404, 410):
-                delete_push_subscription(sub['endpoint'])
-                logger.info("Removed invalid subscription")
+            # Invalid subscriptions (410 Gone, 404 Not Found) are removed below
+            return False, bool(e.response and e.response.status_code in (404, 410))
         except Exception as e:
             logger.error(f"Unexpected error sending push: {e}")
+            return False, False
 
+    # Each push is an HTTPS round-trip to a different service; send them all at once
+    with ThreadPoolExecutor(max_workers=min(PUSH_WORKERS, len(subscriptions))) as executor:
+        results = list(executor.map(send_one, subscriptions))
+
+    # DB writes stay on the calling thread, after the fan-out, in one transaction
+    stale = [sub['endpoint'] for sub, (_, gone) in zip(subscriptions, results) if gone]
+    if stale:
+        delete_push_subscriptions_bulk(stale)
+        logger.info(f"Removed {len(stale)} invalid subscription(s)")
+
+    sent = sum(ok for ok, _ in results)
     logger.info(f"Sent {sent}/{len(subscriptions)} push notifications")
     return sent
 
@@ -152,7 +215,7 @@ def notify_price_drop(
         title=title,
         body=body,
         url=ad_url,
-        tag=f"price-drop-{hash(ad_url) % 10000}",
+        tag=_tag("price-drop", ad_url),
         image=image_url
     )
 
@@ -190,7 +253,7 @@ def notify_cheap_ad(
         title=title,
         body=body,
         url=ad_url,
-        tag=f"cheap-ad-{hash(ad_url) % 10000}",
+        tag=_tag("cheap-ad", ad_url),
         image=image_url
     )
 
@@ -228,7 +291,7 @@ def notify_price_alert(
         title=title,
         body=body,
         url=ad_url,
-        tag=f"price-alert-{hash(ad_url) % 10000}",
+        tag=_tag("price-alert", ad_url),
         image=image_url
     )
 
@@ -291,9 +354,13 @@ def is_cheap_ad(price_str: str, threshold: float = NEW_AD_PRICE_THRESHOLD) -> bo
         return False
 
 
+# "1.234,56" -> "1234.56" in a single pass
+_PRICE_TRANS = str.maketrans({'.': '', ',': '.'})
+
+
 def parse_price(price_str: str) -> float:
     """Parse Brazilian price format to float"""
     if not price_str:
         return 0.0
     # "1.234,56" -> 1234.56
-    return float(price_str.replace('.', '').replace(',', '.'))
+    return float(price_str.translate(_PRICE_TRANS))
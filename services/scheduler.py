@@ -1,33 +1,65 @@
 import asyncio
+import queue
 import threading
-from datetime import datetime
+import time
+import weakref
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from typing import Awaitable, Callable, Optional
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
 
 from services.database import (
-    get_active_searches, create_ad, get_watching_ads,
-    add_price_history, update_ad_price, get_last_price_check,
-    get_ads_to_check, update_ad_status, get_setting, get_existing_urls
+    get_active_searches, create_ads_bulk, get_watching_ads,
+    add_price_history_bulk, update_ad_prices_bulk, get_last_price_checks,
+    get_ads_to_check, update_ads_status_bulk, get_setting, get_existing_urls,
+    get_triggerable_price_alerts, mark_alert_triggered
 )
 from services.scraper import OlxScraper, filter_urls_by_keywords
 from services.logger import get_logger
-from services.exceptions import ScraperError
+from services.exceptions import ScraperError, RateLimitError
 from services.notifications import (
-    notify_price_drop, notify_cheap_ad, is_price_drop, is_cheap_ad
+    notify_price_drop, notify_cheap_ad, notify_price_alert, is_price_drop, is_cheap_ad
 )
 from models import Search, Ad
 
 
 sched_logger = get_logger("olx_monitor.scheduler")
 scheduler = BackgroundScheduler()
+
+# Event loop único dos jobs, numa thread própria: a sessão aiohttp do scraper (presa ao
+# loop que a criou) sobrevive entre execuções e é compartilhada por jobs simultâneos
+_jobs_loop: Optional[asyncio.AbstractEventLoop] = None
+_jobs_thread: Optional[threading.Thread] = None
+_jobs_loop_lock = threading.Lock()
+
+# Push é HTTP síncrono (pywebpush): uma thread própria envia na ordem em que os jobs pedem,
+# sem travar o loop dos jobs enquanto um serviço de push demora a responder
+_notify_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='notifications')
+
+# Com o scheduler no ar, add_log só enfileira: formatação e escrita em stdout/arquivo
+# ficam numa thread própria, fora do event loop dos jobs
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_listener: Optional[QueueListener] = None
 scraper = OlxScraper()
 
-logs = []
 MAX_LOGS = 100
+# Mais recente primeiro; appendleft descarta o mais antigo sozinho ao passar de MAX_LOGS
+logs: deque = deque(maxlen=MAX_LOGS)
 
-# Semaphore to limit concurrent requests
+# Upper bound of concurrent requests per job
 MAX_CONCURRENT_REQUESTS = 5
+# Successful requests in a row before admitting one more concurrent task
+GROW_AFTER_SUCCESSES = 20
+# Request rate towards OLX, shared by all concurrent tasks of a job
+REQUESTS_PER_SECOND = 5
+# New ads are saved in batches of this size while the remaining fetches are in flight
+SAVE_BATCH_SIZE = 50
+# Active ads loaded (and checked) per round of the status job
+STATUS_CHECK_PAGE_SIZE = 200
 
 # Estado das tarefas em execução
 running_tasks = {
@@ -41,79 +73,275 @@ task_results = {
     'status_check': None
 }
 
+# Coroutines aguardando o fim de cada tarefa (com o event loop onde devem rodar)
+_task_subscribers: dict[str, list] = {name: [] for name in running_tasks}
+_subscribers_lock = threading.Lock()
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` requests per `period` seconds.
+
+    The _*_limited helpers take the token inside the admission slot, so a
+    task may sleep while holding a slot; taking it first would let queued
+    tasks bank tokens and then fire together once slots free up.
+    """
+
+    def __init__(self, rate: float, period: float = 1.0):
+        self.rate = rate
+        self.period = period
+        self._tokens = float(rate)
+        self._updated: float | None = None
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    refill = (now - self._updated) * self.rate / self.period
+                    self._tokens = min(float(self.rate), self._tokens + refill)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return self
+                await asyncio.sleep((1 - self._tokens) * self.period / self.rate)
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class AdmissionController:
+    """Concurrency limit that can be resized while tasks are waiting.
+
+    A rate-limit error from OLX lowers the limit by one; a streak of
+    successes raises it back, up to the initial value.
+    """
+
+    def __init__(self, cmax: int, grow_after: int = GROW_AFTER_SUCCESSES):
+        self._cond = asyncio.Condition()
+        self._active = 0
+        self._cmax = cmax
+        self._ceiling = cmax
+        self._grow_after = grow_after
+        self._streak = 0
+
+    @property
+    def cmax(self) -> int:
+        return self._cmax
+
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._active < self._cmax)
+            self._active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._cond:
+            self._active -= 1
+            if exc_type is not None and issubclass(exc_type, RateLimitError):
+                self._streak = 0
+                self._set_cmax(self._cmax - 1)
+            elif exc_type is None:
+                self._streak += 1
+                if self._streak >= self._grow_after:
+                    self._streak = 0
+                    self._set_cmax(self._cmax + 1)
+            self._cond.notify(1)
+        return False
+
+    async def set_cmax(self, n: int):
+        async with self._cond:
+            self._set_cmax(n)
+
+    def _set_cmax(self, n: int):
+        n = max(1, min(n, self._ceiling))
+        if n > self._cmax:
+            self._cond.notify_all()
+        self._cmax = n
+
+
+# (segundo, texto) do último timestamp formatado; uma tupla só para trocar os dois juntos entre threads
+_last_timestamp: tuple[int, str] = (0, "")
+
+
+def _timestamp_now() -> str:
+    """Timestamp dos logs, formatado no máximo uma vez por segundo"""
+    global _last_timestamp
+    second = int(time.time())
+    cached_second, text = _last_timestamp
+    if second != cached_second:
+        text = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+        _last_timestamp = (second, text)
+    return text
+
+
+# Vagas e taxa compartilhadas por todos os jobs de um mesmo event loop (na prática, o loop
+# dos jobs): busca e preços rodando juntos dividem o mesmo orçamento de requisições à OLX
+_job_limits: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _get_job_limits() -> tuple[AdmissionController, RateLimiter]:
+    """Admission controller and rate limiter shared by the jobs of the running loop"""
+    loop = asyncio.get_running_loop()
+    limits = _job_limits.get(loop)
+    if limits is None:
+        limits = (AdmissionController(MAX_CONCURRENT_REQUESTS), RateLimiter(REQUESTS_PER_SECOND))
+        _job_limits[loop] = limits
+    return limits
+
 
 def add_log(message: str, level: str = "info"):
     """Add log entry to memory and logging system"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    timestamp = _timestamp_now()
     log_entry = {"timestamp": timestamp, "level": level, "message": message}
-    logs.insert(0, log_entry)
-    if len(logs) > MAX_LOGS:
-        logs.pop()
+    logs.appendleft(log_entry)
 
     # Also log via structured logger
     log_method = getattr(sched_logger, level, sched_logger.info)
     log_method(message)
 
 
-def get_logs():
-    return logs
+def _start_log_drain():
+    """Move os handlers do sched_logger para a thread que esvazia a fila"""
+    global _log_listener
+    if _log_listener is not None:
+        return
+    _log_listener = QueueListener(_log_queue, *sched_logger.handlers, respect_handler_level=True)
+    sched_logger.handlers = [QueueHandler(_log_queue)]
+    _log_listener.start()
+
+
+def _stop_log_drain():
+    """Escreve o que restou na fila e devolve os handlers ao sched_logger"""
+    global _log_listener
+    if _log_listener is None:
+        return
+    _log_listener.stop()
+    sched_logger.handlers = list(_log_listener.handlers)
+    _log_listener = None
+
+
+def get_logs(limit: Optional[int] = None):
+    """Log entries, newest first; with limit, only the latest `limit` are copied"""
+    return list(islice(logs, limit))
 
 
 def clear_logs():
     logs.clear()
 
 
-async def _fetch_ad_info_with_semaphore(semaphore: asyncio.Semaphore, url: str) -> tuple[str, Ad | None]:
-    """Fetch ad info with semaphore to limit concurrency"""
-    async with semaphore:
-        ad = await scraper.get_ad_info_async(url)
-        await asyncio.sleep(1)  # Rate limiting
-        return url, ad
+async def _fetch_ad_info_limited(
+    admission: AdmissionController, limiter: RateLimiter, url: str
+) -> tuple[str, Ad | None]:
+    """Fetch ad info under the job's admission limit"""
+    async with admission:
+        async with limiter:
+            return url, await scraper.get_ad_info_async(url)
+
+
+async def _fetch_query_urls_limited(
+    admission: AdmissionController, limiter: RateLimiter, search: Search, query: str
+) -> list[str]:
+    """Collect the ad URLs of one search query, already filtered by keywords"""
+    async with admission:
+        async with limiter:
+            search_url = scraper.build_search_url(search.base_url, query)
+            found_urls = await scraper.get_ad_urls_async(search_url, search.categories)
+    return filter_urls_by_keywords(found_urls, search.exclude_keywords)
+
+
+async def _check_price_limited(
+    admission: AdmissionController, limiter: RateLimiter, ad: Ad
+) -> tuple[Ad, str | None]:
+    """Check price under the job's admission limit"""
+    async with admission:
+        async with limiter:
+            return ad, await scraper.get_current_price_async(ad.url)
+
+
+async def _check_status_limited(
+    admission: AdmissionController, limiter: RateLimiter, ad_id: int, url: str
+) -> tuple[int, str, str | None]:
+    """Check status under the job's admission limit"""
+    async with admission:
+        async with limiter:
+            return ad_id, url, await scraper.check_ad_status_async(url)
+
+
+def _handle_async_error(result, context: str = "Erro") -> bool:
+    """Handle errors from async gather results, returns True if error.
+
+    Only Exception counts as a per-task failure; cancellation and other
+    BaseExceptions are re-raised so the job stops instead of going on.
+    """
+    if isinstance(result, BaseException) and not isinstance(result, Exception):
+        raise result
+    if isinstance(result, Exception):
+        if isinstance(result, ScraperError):
+            add_log(f"  {context}: {result}", "warning")
+        else:
+            add_log(f"  Erro inesperado: {result}", "error")
+        return True
+    return False
+
+
+def _notify(send: Callable, *args, **kwargs):
+    """Queue a notification on the notifier thread; failures only go to the log"""
+    def run():
+        try:
+            send(*args, **kwargs)
+        except Exception as e:
+            add_log(f"  Erro ao enviar notificação: {e}", "error")
+
+    return _notify_executor.submit(run)
 
 
-async def _check_price_with_semaphore(semaphore: asyncio.Semaphore, ad: Ad) -> tuple[Ad, str | None]:
-    """Check price with semaphore to limit concurrency"""
-    async with semaphore:
-        price = await scraper.get_current_price_async(ad.url)
-        await asyncio.sleep(1)  # Rate limiting
-        return ad, price
+def _partition_results(results: list, context: str = "Erro") -> list:
+    """Log every failure of a gather (once each) and return only the successful results"""
+    return [result for result in results if not _handle_async_error(result, context)]
 
 
-async def _check_status_with_semaphore(semaphore: asyncio.Semaphore, ad_id: int, url: str) -> tuple[int, str, str | None]:
-    """Check status with semaphore to limit concurrency"""
-    async with semaphore:
-        status = await scraper.check_ad_status_async(url)
-        await asyncio.sleep(0.5)  # Rate limiting
-        return ad_id, url, status
+def _save_new_ads(ads: list, search_id, cheap_threshold: float = None, search_name: str = None) -> int:
+    """Save new ads in one transaction and notify the cheap ones based on search threshold"""
+    ad_ids = create_ads_bulk([
+        dict(
+            url=ad.url, title=ad.title, price=ad.price, description=ad.description,
+            state=ad.state, municipality=ad.municipality, neighbourhood=ad.neighbourhood,
+            zipcode=ad.zipcode, seller=ad.seller, condition=ad.condition,
+            published_at=ad.published_at, main_category=ad.main_category,
+            sub_category=ad.sub_category, hobbie_type=ad.hobbie_type,
+            images=ad.images, olx_pay=ad.olx_pay, olx_delivery=ad.olx_delivery,
+            search_id=search_id, cheap_threshold=cheap_threshold
+        )
+        for ad in ads
+    ])
 
+    for ad in ads:
+        add_log(f"  + Novo anúncio: {ad.title[:50]}...")
 
-def _handle_async_error(result) -> bool:
-    """Handle errors from async gather results, returns True if error"""
-    if isinstance(result, BaseException):
-        level = "warning" if isinstance(result, ScraperError) else "error"
-        add_log(f"  Erro: {result}", level)
-        return True
-    return False
+        # Só notifica se tiver threshold configurado para essa busca
+        if cheap_threshold and is_cheap_ad(ad.price, threshold=cheap_threshold):
+            first_image = ad.images[0] if ad.images else None
+            _notify(notify_cheap_ad, ad.title, ad.price, ad.url, first_image,
+                    ad_id=ad_ids.get(ad.url), search_name=search_name)
+            add_log(f"  Notificação enfileirada: preço baixo R$ {ad.price} (< R$ {cheap_threshold:.0f})", "info")
 
+    return len(ads)
 
-def _save_new_ad(ad, search_id, cheap_threshold: float = None, search_name: str = None) -> None:
-    """Save new ad and notify if cheap based on search threshold"""
-    ad_id = create_ad(
-        url=ad.url, title=ad.title, price=ad.price, description=ad.description,
-        state=ad.state, municipality=ad.municipality, neighbourhood=ad.neighbourhood,
-        zipcode=ad.zipcode, seller=ad.seller, condition=ad.condition,
-        published_at=ad.published_at, main_category=ad.main_category,
-        sub_category=ad.sub_category, hobbie_type=ad.hobbie_type,
-        images=ad.images, olx_pay=ad.olx_pay, olx_delivery=ad.olx_delivery,
-        search_id=search_id, cheap_threshold=cheap_threshold
-    )
-    add_log(f"  + Novo anúncio: {ad.title[:50]}...")
 
-    # Só notifica se tiver threshold configurado para essa busca
-    if cheap_threshold and is_cheap_ad(ad.price, threshold=cheap_threshold):
-        first_image = ad.images[0] if ad.images else None
-        notify_cheap_ad(ad.title, ad.price, ad.url, first_image, ad_id=ad_id, search_name=search_name)
-        add_log(f"  Notificação enviada: preço baixo R$ {ad.price} (< R$ {cheap_threshold:.0f})", "info")
+def _check_price_alerts() -> int:
+    """Fire active price alerts whose target was reached; returns how many fired"""
+    triggered = 0
+    # O banco já devolve só os que atingiram o alvo e ainda não dispararam
+    for alert in get_triggerable_price_alerts():
+        images = Ad.from_dict(alert).images
+        _notify(notify_price_alert, alert['title'], alert['price'], alert['target_price'], alert['url'],
+                images[0] if images else None, ad_id=alert['ad_id'])
+        mark_alert_triggered(alert['ad_id'])
+        add_log(f"  Alerta de preço atingido: {alert['title'][:30]}... (R$ {alert['price']})", "info")
+        triggered += 1
+    return triggered
 
 
 async def job_search_new_ads_async():
@@ -125,54 +353,65 @@ async def job_search_new_ads_async():
     try:
         searches = get_active_searches()
         total_new = 0
-        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        admission, limiter = _get_job_limits()
 
         for search_data in searches:
             search = Search.from_dict(search_data)
             add_log(f"Processando busca: {search.name}")
 
-            all_found_urls = []
             queries = search.queries if search.queries else ['']
 
-            # Collect URLs from all queries (can be parallelized)
-            for query in queries:
-                search_url = scraper.build_search_url(search.base_url, query)
-                found_urls = await scraper.get_ad_urls_async(search_url, search.categories)
-                filtered_urls = filter_urls_by_keywords(found_urls, search.exclude_keywords)
-                all_found_urls.extend(filtered_urls)
+            # Collect URLs from all queries in parallel under the admission limit
+            per_query = await asyncio.gather(
+                *(_fetch_query_urls_limited(admission, limiter, search, query) for query in queries),
+                return_exceptions=True
+            )
+            all_found_urls = {
+                url for urls in _partition_results(per_query) for url in urls
+            }
 
             # Batch check which URLs already exist
-            all_found_urls = list(set(all_found_urls))
-            existing_urls = get_existing_urls(all_found_urls)
-            new_urls = [url for url in all_found_urls if url not in existing_urls]
+            new_urls = all_found_urls - get_existing_urls(all_found_urls)
 
             add_log(f"  {len(new_urls)} URLs novos encontrados para {search.name}")
 
             if not new_urls:
                 continue
 
-            # Fetch ad info in parallel with semaphore
-            tasks = [_fetch_ad_info_with_semaphore(semaphore, url) for url in new_urls]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-
-            for result in results:
-                if _handle_async_error(result):
-                    continue
-                _, ad = result
-                if ad:
-                    _save_new_ad(ad, search.id, search.cheap_threshold, search.name)
-                    total_new += 1
+            # Fetch ad info in parallel under the admission limit, saving as results arrive
+            tasks = [
+                asyncio.ensure_future(_fetch_ad_info_limited(admission, limiter, url))
+                for url in new_urls
+            ]
+            new_ads = []
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    try:
+                        _, ad = await next_done
+                    except Exception as e:
+                        _handle_async_error(e)
+                        continue
+                    if ad:
+                        new_ads.append(ad)
+                    if len(new_ads) >= SAVE_BATCH_SIZE:
+                        total_new += _save_new_ads(new_ads, search.id, search.cheap_threshold, search.name)
+                        new_ads = []
+            finally:
+                # Cancelamento no meio do lote: não deixa fetches órfãos no loop dos jobs
+                for task in tasks:
+                    task.cancel()
+
+            if new_ads:
+                total_new += _save_new_ads(new_ads, search.id, search.cheap_threshold, search.name)
 
         add_log(f"Busca finalizada. {total_new} novos anúncios salvos.", "success")
         task_results['search'] = {'success': True, 'total_new': total_new}
     except Exception as e:
         add_log(f"Erro na busca: {e}", "error")
         task_results['search'] = {'success': False, 'error': str(e)}
-    finally:
-        await scraper.close()
 
 
-async def job_check_prices_async():
+async def job_check_prices_async(concurrency: int = MAX_CONCURRENT_REQUESTS):
     """Async version of job_check_prices"""
     global running_tasks, task_results
 
@@ -181,45 +420,52 @@ async def job_check_prices_async():
     try:
         watching_ads = get_watching_ads()
         price_changes = 0
-        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        admission, limiter = _get_job_limits()
+        if concurrency != MAX_CONCURRENT_REQUESTS:
+            # Concorrência pedida explicitamente: vagas próprias, mas o mesmo limite de taxa
+            admission = AdmissionController(concurrency)
 
         # Convert to Ad objects
         ads = [Ad.from_dict(ad_data) for ad_data in watching_ads]
+        # Último preço registrado de todos numa consulta, em vez de uma por anúncio
+        last_checks = get_last_price_checks([ad.id for ad in ads if ad.id is not None])
 
         # Check prices in parallel
-        tasks = [_check_price_with_semaphore(semaphore, ad) for ad in ads]
+        tasks = [_check_price_limited(admission, limiter, ad) for ad in ads]
         results = await asyncio.gather(*tasks, return_exceptions=True)
+        checked_prices = []
+        changed_prices = []
 
-        for result in results:
-            if _handle_async_error(result):
-                continue
-
-            ad, current_price = result
+        for ad, current_price in _partition_results(results):
             if current_price is None or ad.id is None:
                 continue
 
-            last_check = get_last_price_check(ad.id)
-            last_price = last_check.get("price") if last_check else ad.price
+            last_price = last_checks.get(ad.id, ad.price)
 
-            add_price_history(ad.id, current_price)
+            checked_prices.append((ad.id, current_price))
 
             if current_price != last_price:
-                update_ad_price(ad.id, current_price)
+                changed_prices.append((ad.id, current_price))
                 add_log(f"  Preço alterado: {ad.title[:30]}... ({last_price} -> {current_price})", "info")
                 price_changes += 1
 
                 if is_price_drop(last_price, current_price):
                     first_image = ad.images[0] if ad.images else None
-                    notify_price_drop(ad.title, last_price, current_price, ad.url, first_image, ad_id=ad.id)
-                    add_log("  Notificação enviada: preço baixou!", "info")
+                    _notify(notify_price_drop, ad.title, last_price, current_price, ad.url, first_image, ad_id=ad.id)
+                    add_log("  Notificação enfileirada: preço baixou!", "info")
+
+        # Preços novos e histórico do ciclo inteiro, uma transação para cada
+        update_ad_prices_bulk(changed_prices)
+        add_price_history_bulk(checked_prices)
+
+        # Alertas avaliados todos de uma vez, já com os preços novos
+        _check_price_alerts()
 
         add_log(f"Verificação finalizada. {price_changes} alterações de preço.", "success")
         task_results['price_check'] = {'success': True, 'price_changes': price_changes}
     except Exception as e:
         add_log(f"Erro na verificação de preços: {e}", "error")
         task_results['price_check'] = {'success': False, 'error': str(e)}
-    finally:
-        await scraper.close()
 
 
 async def job_check_ad_status_async():
@@ -229,41 +475,73 @@ async def job_check_ad_status_async():
     add_log("Verificando status dos anúncios...")
 
     try:
-        ads_to_check = get_ads_to_check()
+        checked = 0
         deactivated = 0
-        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
-
-        add_log(f"  {len(ads_to_check)} anúncios para verificar")
-
-        # Check status in parallel
-        tasks = [
-            _check_status_with_semaphore(semaphore, ad_data['id'], ad_data['url'])
-            for ad_data in ads_to_check
-        ]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        admission, limiter = _get_job_limits()
+        page = get_ads_to_check(limit=STATUS_CHECK_PAGE_SIZE)
+
+        # Uma página por vez: no máximo STATUS_CHECK_PAGE_SIZE tasks vivas, e o que já
+        # foi desativado fica salvo mesmo se o job parar no meio
+        while page:
+            tasks = [
+                _check_status_limited(admission, limiter, ad_data['id'], ad_data['url'])
+                for ad_data in page
+            ]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            deactivated_ids = []
 
-        for result in results:
-            if isinstance(result, BaseException):
-                if isinstance(result, ScraperError):
-                    add_log(f"  Erro ao verificar status: {result}", "warning")
-                else:
-                    add_log(f"  Erro inesperado: {result}", "error")
-                continue
+            for ad_id, url, status in _partition_results(results, "Erro ao verificar status"):
+                if status == 'inactive':
+                    deactivated_ids.append(ad_id)
+                    add_log(f"  Anúncio desativado: {url[:50]}...", "warning")
 
-            ad_id, url, status = result
+            update_ads_status_bulk([(ad_id, 'inactive') for ad_id in deactivated_ids])
+            checked += len(page)
+            deactivated += len(deactivated_ids)
 
-            if status == 'inactive':
-                update_ad_status(ad_id, 'inactive')
-                deactivated += 1
-                add_log(f"  Anúncio desativado: {url[:50]}...", "warning")
+            if len(page) < STATUS_CHECK_PAGE_SIZE:
+                break
+            page = get_ads_to_check(limit=STATUS_CHECK_PAGE_SIZE, after=page[-1])
 
+        add_log(f"  {checked} anúncios verificados")
         add_log(f"Verificação de status finalizada. {deactivated} anúncios desativados.", "success")
         task_results['status_check'] = {'success': True, 'deactivated': deactivated}
     except Exception as e:
         add_log(f"Erro na verificação de status: {e}", "error")
         task_results['status_check'] = {'success': False, 'error': str(e)}
+
+
+def _get_jobs_loop() -> asyncio.AbstractEventLoop:
+    global _jobs_loop, _jobs_thread
+    with _jobs_loop_lock:
+        if _jobs_loop is None:
+            _jobs_loop = asyncio.new_event_loop()
+            _jobs_thread = threading.Thread(
+                target=_jobs_loop.run_forever, name='scheduler-jobs', daemon=True
+            )
+            _jobs_thread.start()
+        return _jobs_loop
+
+
+def _run_job(coro):
+    """Roda a coroutine no loop dos jobs e espera o resultado na thread chamadora"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_jobs_loop()).result()
+
+
+def _close_jobs_loop():
+    """Fecha a sessão do scraper e encerra o loop dos jobs"""
+    global _jobs_loop, _jobs_thread
+    with _jobs_loop_lock:
+        loop, thread = _jobs_loop, _jobs_thread
+        _jobs_loop = _jobs_thread = None
+    if loop is None:
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(scraper.close(), loop).result(timeout=10)
     finally:
-        await scraper.close()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=10)
+        loop.close()
 
 
 def job_search_new_ads():
@@ -274,12 +552,12 @@ def job_search_new_ads():
         running_tasks['search'] = True
         task_results['search'] = None
     try:
-        asyncio.run(job_search_new_ads_async())
+        _run_job(job_search_new_ads_async())
     finally:
-        running_tasks['search'] = False
+        _finish_task('search')
 
 
-def job_check_prices():
+def job_check_prices(concurrency: int = MAX_CONCURRENT_REQUESTS):
     """Wrapper to run async job in sync context"""
     global running_tasks, task_results
     # Se chamado pelo scheduler (não via run_*_now), seta a flag
@@ -287,9 +565,9 @@ def job_check_prices():
         running_tasks['price_check'] = True
         task_results['price_check'] = None
     try:
-        asyncio.run(job_check_prices_async())
+        _run_job(job_check_prices_async(concurrency))
     finally:
-        running_tasks['price_check'] = False
+        _finish_task('price_check')
 
 
 def job_check_ad_status():
@@ -300,9 +578,9 @@ def job_check_ad_status():
         running_tasks['status_check'] = True
         task_results['status_check'] = None
     try:
-        asyncio.run(job_check_ad_status_async())
+        _run_job(job_check_ad_status_async())
     finally:
-        running_tasks['status_check'] = False
+        _finish_task('status_check')
 
 
 def start_scheduler():
@@ -340,6 +618,7 @@ def start_scheduler():
             replace_existing=True
         )
 
+        _start_log_drain()
         scheduler.start()
         add_log(f"Scheduler iniciado (busca: {search_interval}min, preços: {price_interval}min, status: {status_hour_str})", "success")
 
@@ -348,6 +627,8 @@ def stop_scheduler():
     if scheduler.running:
         scheduler.shutdown()
         add_log("Scheduler parado", "info")
+        _stop_log_drain()
+    _close_jobs_loop()
 
 
 def run_search_now():
@@ -361,13 +642,13 @@ def run_search_now():
     return True
 
 
-def run_price_check_now():
-    """Executa verificação de preços em thread separada"""
+def run_price_check_now(concurrency: int = MAX_CONCURRENT_REQUESTS):
+    """Executa verificação de preços em thread separada (até `concurrency` anúncios em paralelo)"""
     if running_tasks['price_check']:
         return False
     running_tasks['price_check'] = True
     task_results['price_check'] = None
-    thread = threading.Thread(target=job_check_prices, daemon=True)
+    thread = threading.Thread(target=job_check_prices, args=(concurrency,), daemon=True)
     thread.start()
     return True
 
@@ -391,6 +672,49 @@ def get_task_status(task_name: str):
     }
 
 
+def subscribe(task_name: str, callback: Callable[[dict], Awaitable]):
+    """
+    Registra uma coroutine chamada uma única vez, com o status final, quando a
+    tarefa terminar. Deve ser chamada de dentro do event loop onde o callback
+    vai rodar (ex: handler da UI), substituindo o polling de get_task_status.
+    """
+    loop = asyncio.get_running_loop()
+    with _subscribers_lock:
+        if running_tasks.get(task_name, False):
+            _task_subscribers.setdefault(task_name, []).append((callback, loop))
+            return
+    # Tarefa já terminou antes da inscrição
+    loop.create_task(callback(get_task_status(task_name)))
+
+
+async def wait_for_task(task_name: str) -> dict:
+    """Aguarda o fim da tarefa e retorna o status final, sem polling"""
+    done = asyncio.get_running_loop().create_future()
+
+    async def _resolve(status: dict):
+        if not done.done():
+            done.set_result(status)
+
+    subscribe(task_name, _resolve)
+    return await done
+
+
+def _finish_task(task_name: str):
+    """Marca a tarefa como finalizada e avisa os inscritos"""
+    with _subscribers_lock:
+        running_tasks[task_name] = False
+        subscribers = _task_subscribers.get(task_name, [])
+        _task_subscribers[task_name] = []
+
+    status = get_task_status(task_name)
+    for callback, loop in subscribers:
+        try:
+            asyncio.run_coroutine_threadsafe(callback(status), loop)
+        except RuntimeError:
+            # Event loop do inscrito já foi encerrado
+            sched_logger.debug(f"Subscriber loop closed for task {task_name}")
+
+
 def reschedule_jobs():
     """Reconfigura os jobs com os novos intervalos sem reiniciar o scheduler"""
     if not scheduler.running:
@@ -5,7 +5,7 @@ import re
 import json
 import functools
 import random
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from typing import Optional, Callable, TypeVar
 from models import Ad
 from services.logger import get_logger
@@ -32,6 +32,15 @@ USER_AGENTS = [
 
 T = TypeVar('T')
 
+# Página de busca: só os <a href> interessam; o parser nem monta o resto da árvore
+_AD_LINKS_ONLY = SoupStrainer('a', href=True)
+_AD_URL_RE = re.compile(r"https:\/\/(?:[a-z]{2}\.)?olx\.com\.br\/[\w\-\/]+-\d+")
+
+# Pool padrão, usado pelos jobs do scheduler (sessão viva entre execuções, no loop dos jobs)
+DEFAULT_CONNECTOR_OPTIONS = {'limit': 10, 'limit_per_host': 5, 'keepalive_timeout': 30, 'ttl_dns_cache': 300}
+# Pool do scraper compartilhado da UI, que vive enquanto o app estiver no ar
+SHARED_CONNECTOR_OPTIONS = {'limit': 100, 'keepalive_timeout': 30, 'ttl_dns_cache': 300}
+
 
 def retry_with_backoff(
     max_retries: int = 3,
@@ -90,8 +99,9 @@ def retry_with_backoff(
 
 
 class OlxScraper:
-    def __init__(self):
+    def __init__(self, connector_options: Optional[dict] = None):
         self._session: Optional[aiohttp.ClientSession] = None
+        self._connector_options = connector_options or DEFAULT_CONNECTOR_OPTIONS
         self._rotate_headers()
 
     def _rotate_headers(self):
@@ -120,7 +130,7 @@ class OlxScraper:
         if self._session is None or self._session.closed:
             # Rotacionar headers a cada nova sessão
             self._rotate_headers()
-            connector = aiohttp.TCPConnector(limit=10, limit_per_host=5)
+            connector = aiohttp.TCPConnector(**self._connector_options)
             timeout = aiohttp.ClientTimeout(total=30)
             self._session = aiohttp.ClientSession(
                 headers=self.headers,
@@ -328,14 +338,13 @@ class OlxScraper:
     def _parse_ad_urls(self, content: bytes, category_patterns: list[str]) -> list[str]:
         """Parse ad URLs from search page content"""
         try:
-            soup = BeautifulSoup(content, 'html.parser')
-            links = soup.find_all('a', href=True)
+            soup = BeautifulSoup(content, 'html.parser', parse_only=_AD_LINKS_ONLY)
             urls = []
 
-            for link in links:
+            for link in soup.find_all('a'):
                 url = link['href']
 
-                if not re.search(r"https:\/\/(?:[a-z]{2}\.)?olx\.com\.br\/[\w\-\/]+-\d+", url):
+                if not _AD_URL_RE.search(url):
                     continue
 
                 if not category_patterns:
@@ -449,6 +458,28 @@ class OlxScraper:
             return None
 
 
+_shared_scraper: Optional[OlxScraper] = None
+
+
+def get_shared_scraper() -> OlxScraper:
+    """
+    Scraper de vida longa para o event loop da UI.
+
+    A sessão aiohttp fica presa ao loop que a criou, então os jobs do
+    scheduler (que rodam em outro loop) continuam com o próprio scraper.
+    """
+    global _shared_scraper
+    if _shared_scraper is None:
+        _shared_scraper = OlxScraper(connector_options=SHARED_CONNECTOR_OPTIONS)
+    return _shared_scraper
+
+
+async def close_shared_scraper():
+    """Fecha a sessão do scraper compartilhado (chamado no shutdown do app)"""
+    if _shared_scraper is not None:
+        await _shared_scraper.close()
+
+
 def filter_urls_by_keywords(urls: list[str], exclude_keywords: list[str]) -> list[str]:
     return [
         url for url in urls
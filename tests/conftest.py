@@ -116,7 +116,10 @@ def in_memory_db():
             status TEXT DEFAULT 'active',
             deactivated_at DATETIME,
             cheap_threshold REAL,
-            FOREIGN KEY (search_id) REFERENCES searches(id)
+            price_cents INTEGER GENERATED ALWAYS AS (
+                CAST(ROUND(CAST(REPLACE(REPLACE(price, '.', ''), ',', '.') AS REAL) * 100) AS INTEGER)
+            ) VIRTUAL,
+            FOREIGN KEY (search_id) REFERENCES searches(id) ON DELETE CASCADE
         )
     """)
 
@@ -126,7 +129,7 @@ def in_memory_db():
             ad_id INTEGER,
             price TEXT,
             checked_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (ad_id) REFERENCES ads(id)
+            FOREIGN KEY (ad_id) REFERENCES ads(id) ON DELETE CASCADE
         )
     """)
 
@@ -175,11 +178,22 @@ def in_memory_db():
             sent_at DATETIME DEFAULT CURRENT_TIMESTAMP,
             success INTEGER DEFAULT 1,
             read_at DATETIME,
-            FOREIGN KEY (ad_id) REFERENCES ads(id)
+            FOREIGN KEY (ad_id) REFERENCES ads(id) ON DELETE SET NULL
         )
     """)
 
+    # SQL functions, full-text index and its sync triggers, taken from the app schema
+    from services.database import ADS_FTS_SCHEMA, register_functions
+    register_functions(conn)
+    for statement in ADS_FTS_SCHEMA:
+        cursor.execute(statement)
+
     conn.commit()
+
+    # A fresh database must not see settings cached from a previous test
+    import services.database
+    services.database._settings_cache.clear()
+
     yield conn
     conn.close()
 
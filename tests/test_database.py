@@ -9,6 +9,182 @@ from contextlib import contextmanager
 from unittest.mock import patch
 
 
+class TestConnectionReuse:
+    """Tests for the per-thread long-lived connection"""
+
+    @pytest.fixture(autouse=True)
+    def _temp_db(self, tmp_path, monkeypatch):
+        import services.database as db
+        db.close_connection()
+        monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'test.db')
+        yield
+        db.close_connection()
+
+    def test_same_thread_reuses_connection(self):
+        """Should hand out the same connection on every call in one thread"""
+        from services.database import get_connection
+
+        with get_connection() as first:
+            pass
+        with get_connection() as second:
+            second.execute("SELECT 1")
+
+        assert first is second
+
+    def test_other_thread_gets_own_connection(self):
+        """Should open a separate connection per thread"""
+        import threading
+        from services.database import get_connection, close_connection
+
+        seen = []
+
+        def worker():
+            with get_connection() as conn:
+                seen.append(conn)
+            close_connection()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+        with get_connection() as main_conn:
+            assert seen and seen[0] is not main_conn
+
+    def test_file_database_uses_wal(self):
+        """Should switch file databases to WAL with relaxed sync"""
+        from services.database import get_connection
+
+        with get_connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+
+    def test_price_num_function_is_registered(self):
+        """Should expose price_num() parsing Brazilian prices like the old CAST"""
+        from services.database import get_connection
+
+        with get_connection() as conn:
+            row = conn.execute("SELECT price_num('1.234,56'), price_num('abc'), price_num(NULL)").fetchone()
+            assert tuple(row) == (1234.56, 0.0, None)
+
+    def test_failed_block_rolls_back(self):
+        """Should roll back uncommitted changes when the block raises"""
+        from services.database import get_connection
+
+        with get_connection() as conn:
+            conn.execute("CREATE TABLE t (x INTEGER)")
+            conn.commit()
+
+        with pytest.raises(RuntimeError):
+            with get_connection() as conn:
+                conn.execute("INSERT INTO t VALUES (1)")
+                raise RuntimeError("boom")
+
+        with get_connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+class TestSchemaMigrations:
+    """Tests for init_db's user_version-driven migrations"""
+
+    @pytest.fixture(autouse=True)
+    def _temp_db(self, tmp_path, monkeypatch):
+        import services.database as db
+        db.close_connection()
+        monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'test.db')
+        yield
+        db.close_connection()
+
+    def test_legacy_database_gets_missing_columns(self):
+        """Should add columns missing from a pre-versioning database and stamp the version"""
+        from services.database import init_db, get_connection, SCHEMA_VERSION
+
+        with get_connection() as conn:
+            conn.execute("CREATE TABLE ads (id INTEGER PRIMARY KEY, url TEXT UNIQUE, title TEXT, price TEXT, "
+                         "description TEXT, state TEXT, found_at DATETIME, seen BOOLEAN, watching BOOLEAN, "
+                         "search_id INTEGER)")
+            conn.execute("INSERT INTO ads (url, title, price) VALUES ('https://olx.com.br/old', 'Old', '1.000,00')")
+            conn.commit()
+
+        init_db()
+
+        with get_connection() as conn:
+            columns = {col[1] for col in conn.execute("PRAGMA table_xinfo(ads)")}
+            assert {'status', 'deactivated_at', 'cheap_threshold', 'price_cents'} <= columns
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+            assert conn.execute("SELECT price_cents FROM ads").fetchone()[0] == 100000
+
+    def test_init_db_is_idempotent(self):
+        """Should run cleanly on an already migrated database"""
+        from services.database import init_db, get_connection, SCHEMA_VERSION
+
+        init_db()
+        init_db()
+
+        with get_connection() as conn:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+
+    def test_legacy_foreign_keys_are_rebuilt_with_cascades(self):
+        """Should rebuild old tables with ON DELETE rules, keeping ids and clearing orphans"""
+        from services.database import init_db, get_connection
+
+        with get_connection() as conn:
+            # Bancos antigos não tinham foreign_keys ligado e podem conter órfãos
+            conn.execute("PRAGMA foreign_keys=OFF")
+            conn.execute("CREATE TABLE searches (id INTEGER PRIMARY KEY, name TEXT UNIQUE, base_url TEXT, "
+                         "queries TEXT, categories TEXT, exclude_keywords TEXT, active BOOLEAN DEFAULT 1, "
+                         "created_at DATETIME)")
+            conn.execute("CREATE TABLE ads (id INTEGER PRIMARY KEY, url TEXT UNIQUE, title TEXT, price TEXT, "
+                         "description TEXT, state TEXT, found_at DATETIME, seen BOOLEAN, watching BOOLEAN, "
+                         "search_id INTEGER, FOREIGN KEY (search_id) REFERENCES searches(id))")
+            conn.execute("CREATE TABLE price_history (id INTEGER PRIMARY KEY, ad_id INTEGER, price TEXT, "
+                         "checked_at DATETIME, FOREIGN KEY (ad_id) REFERENCES ads(id))")
+            conn.execute("INSERT INTO searches (id, name) VALUES (1, 'Busca')")
+            conn.execute("INSERT INTO ads (id, url, title, price, search_id) VALUES (7, 'https://olx.com.br/a', 'A', '10', 1)")
+            conn.execute("INSERT INTO ads (id, url, title, price, search_id) VALUES (8, 'https://olx.com.br/b', 'B', '20', 0)")
+            conn.execute("INSERT INTO price_history (ad_id, price) VALUES (7, '10'), (99, '5')")
+            conn.commit()
+            conn.execute("PRAGMA foreign_keys=ON")
+
+        init_db()
+
+        with get_connection() as conn:
+            ads = {row['id']: row['search_id'] for row in conn.execute("SELECT id, search_id FROM ads")}
+            assert ads == {7: 1, 8: None}
+            assert [row['ad_id'] for row in conn.execute("SELECT ad_id FROM price_history")] == [7]
+            ads_fk = conn.execute("PRAGMA foreign_key_list(ads)").fetchone()
+            assert ads_fk['on_delete'] == 'CASCADE'
+
+    def test_delete_search_cascades_but_keeps_watched_ads(self):
+        """Should delete a search's ads with their history, except the watched ones"""
+        from services.database import init_db, get_connection, delete_search
+
+        init_db()
+        with get_connection() as conn:
+            conn.execute("INSERT INTO searches (id, name) VALUES (1, 'Busca')")
+            conn.execute("INSERT INTO ads (id, url, search_id, watching) VALUES (1, 'https://olx.com.br/a', 1, 0)")
+            conn.execute("INSERT INTO ads (id, url, search_id, watching) VALUES (2, 'https://olx.com.br/b', 1, 1)")
+            conn.execute("INSERT INTO price_history (ad_id, price) VALUES (1, '10'), (2, '20')")
+            conn.commit()
+
+        delete_search(1)
+
+        with get_connection() as conn:
+            assert [tuple(row) for row in conn.execute("SELECT id, search_id FROM ads")] == [(2, None)]
+            assert [row['ad_id'] for row in conn.execute("SELECT ad_id FROM price_history")] == [2]
+
+    def test_fresh_database_skips_column_migrations(self):
+        """Should create the final schema directly on a new database"""
+        import services.database as db
+
+        with patch.object(db, '_add_missing_columns') as mock_migrate:
+            db.init_db()
+
+        mock_migrate.assert_not_called()
+        with db.get_connection() as conn:
+            columns = {col[1] for col in conn.execute("PRAGMA table_xinfo(searches)")}
+            assert {'state', 'region', 'category', 'subcategory', 'cheap_threshold'} <= columns
+
+
 class TestDatabaseOperations:
     """Tests for database CRUD operations using in-memory DB"""
 
@@ -146,6 +322,77 @@ class TestDatabaseOperations:
 
             assert ad_exists(url) is True
 
+    def test_create_ad_duplicate_returns_none(self, in_memory_db):
+        """Should skip an already stored URL and return None instead of raising"""
+        with self._patch_db(in_memory_db):
+            from services.database import create_ad, get_ad_by_url
+
+            fields = dict(
+                url='https://olx.com.br/dup', title='First', price='100', description='',
+                state='', municipality='', neighbourhood='', zipcode='', seller='',
+                condition='', published_at='', main_category='', sub_category='',
+                hobbie_type='', images=[], olx_pay=False, olx_delivery=False, search_id=1
+            )
+            ad_id = create_ad(**fields)
+
+            assert isinstance(ad_id, int)
+            assert create_ad(**{**fields, 'title': 'Second'}) is None
+            assert get_ad_by_url('https://olx.com.br/dup')['title'] == 'First'
+
+    def test_create_watched_ad_records_first_price(self, in_memory_db):
+        """Should store a watched ad and its initial price together, and toggle off/on cleanly"""
+        with self._patch_db(in_memory_db):
+            from services.database import create_ad, get_ad_by_id, get_price_history, toggle_ad_watching
+
+            ad_id = create_ad(
+                url='https://olx.com.br/watched', title='Watched', price='150,00', description='',
+                state='', municipality='', neighbourhood='', zipcode='', seller='',
+                condition='', published_at='', main_category='', sub_category='',
+                hobbie_type='', images=[], olx_pay=False, olx_delivery=False, search_id=None,
+                watching=True
+            )
+
+            assert get_ad_by_id(ad_id)['watching'] == 1
+            assert [h['price'] for h in get_price_history(ad_id)] == ['150,00']
+
+            assert toggle_ad_watching(ad_id) is False
+            assert toggle_ad_watching(ad_id) is True
+            assert len(get_price_history(ad_id)) == 2
+            assert toggle_ad_watching(9999) is False
+
+    def test_toggle_watching_queues_image_download(self, in_memory_db):
+        """Should hand the image refresh to the background executor instead of downloading inline"""
+        with self._patch_db(in_memory_db):
+            from services.database import create_ad, toggle_ad_watching, _download_images
+
+            ad_id = create_ad(
+                url='https://olx.com.br/with-images', title='Images', price='150,00', description='',
+                state='', municipality='', neighbourhood='', zipcode='', seller='',
+                condition='', published_at='', main_category='', sub_category='',
+                hobbie_type='', images=['https://img/1.jpg'], olx_pay=False, olx_delivery=False,
+                search_id=1
+            )
+
+            with patch('services.database._image_executor.submit') as mock_submit, \
+                    patch('services.images.download_ad_images') as mock_download:
+                assert toggle_ad_watching(ad_id) is True
+                assert toggle_ad_watching(ad_id) is False
+
+            mock_submit.assert_called_once_with(_download_images, ad_id, ['https://img/1.jpg'], True)
+            mock_download.assert_not_called()
+
+    def test_image_download_failure_is_logged(self):
+        """Should log background download errors through the repo logger"""
+        from services.database import _download_images
+
+        with patch('services.images.download_ad_images', side_effect=OSError("disk full")), \
+                patch('services.database.logger') as mock_logger:
+            _download_images(1, ['https://img/1.jpg'])
+
+        message = mock_logger.warning.call_args.args[0]
+        assert 'disk full' in message
+        assert mock_logger.warning.call_args.kwargs == {'exc_info': True}
+
     def test_get_existing_urls(self, in_memory_db):
         """Should batch check existing URLs"""
         with self._patch_db(in_memory_db):
@@ -179,6 +426,60 @@ class TestDatabaseOperations:
             assert 'https://olx.com.br/item-2' in existing
             assert 'https://olx.com.br/item-3' not in existing
 
+    def test_get_existing_urls_small_batch_skips_temp_table(self, in_memory_db):
+        """Should answer small batches with a plain IN query"""
+        with self._patch_db(in_memory_db):
+            from services.database import get_existing_urls
+
+            assert get_existing_urls(['https://olx.com.br/item-1']) == set()
+
+            temp = in_memory_db.execute(
+                "SELECT name FROM sqlite_temp_master WHERE name = '_url_probe'"
+            ).fetchall()
+            assert temp == []
+
+    def test_get_existing_urls_large_batch(self, in_memory_db):
+        """Should handle batches above SQLite's bound-parameter limit"""
+        with self._patch_db(in_memory_db):
+            from services.database import create_ad, get_existing_urls
+
+            create_ad(
+                url='https://olx.com.br/item-7',
+                title='Item 7', price='100', description='', state='',
+                municipality='', neighbourhood='', zipcode='', seller='',
+                condition='', published_at='', main_category='', sub_category='',
+                hobbie_type='', images=[], olx_pay=False, olx_delivery=False, search_id=1
+            )
+
+            urls = [f'https://olx.com.br/item-{i}' for i in range(40000)]
+
+            assert get_existing_urls(urls) == {'https://olx.com.br/item-7'}
+            assert get_existing_urls(urls[:5]) == set()
+            # Any iterable works, e.g. the set the search job collects
+            assert get_existing_urls(url for url in urls[:8]) == {'https://olx.com.br/item-7'}
+
+    def test_create_ads_bulk(self, in_memory_db):
+        """Should insert a batch of ads and return their ids by URL"""
+        with self._patch_db(in_memory_db):
+            from services.database import create_ads_bulk, get_ad_by_id
+
+            base = dict(
+                description='', state='#SP', municipality='', neighbourhood='', zipcode='',
+                seller='', condition='', published_at='', main_category='', sub_category='',
+                hobbie_type='', images=['https://img.olx.com.br/a.jpg'],
+                olx_pay=False, olx_delivery=False, search_id=1
+            )
+            ids = create_ads_bulk([
+                {**base, 'url': 'https://olx.com.br/bulk-1', 'title': 'Bulk 1', 'price': '100'},
+                {**base, 'url': 'https://olx.com.br/bulk-2', 'title': 'Bulk 2', 'price': '200'},
+            ])
+
+            assert set(ids) == {'https://olx.com.br/bulk-1', 'https://olx.com.br/bulk-2'}
+            ad = get_ad_by_id(ids['https://olx.com.br/bulk-2'])
+            assert ad['title'] == 'Bulk 2'
+            assert json.loads(ad['images']) == ['https://img.olx.com.br/a.jpg']
+            assert create_ads_bulk([]) == {}
+
     def test_mark_ad_seen(self, in_memory_db):
         """Should mark ad as seen"""
         with self._patch_db(in_memory_db):
@@ -254,6 +555,21 @@ class TestPriceHistory:
             assert history[0]['price'] == '100,00'
             assert history[-1]['price'] == '80,00'
 
+    def test_get_price_histories_groups_by_ad(self, in_memory_db):
+        """Should fetch several histories at once, grouped by ad"""
+        with self._patch_db(in_memory_db):
+            from services.database import add_price_history, get_price_histories
+
+            add_price_history(1, '100,00')
+            add_price_history(2, '50,00')
+            add_price_history(1, '90,00')
+
+            histories = get_price_histories([1, 2, 3])
+            assert [h['price'] for h in histories[1]] == ['100,00', '90,00']
+            assert [h['price'] for h in histories[2]] == ['50,00']
+            assert 3 not in histories
+            assert get_price_histories([]) == {}
+
 
 class TestPriceAlerts:
     """Tests for price alerts operations"""
@@ -306,6 +622,40 @@ class TestPriceAlerts:
             alert = get_price_alert(ad_id)
             assert alert is None
 
+    def test_get_triggerable_price_alerts(self, in_memory_db):
+        """Should return only untriggered alerts whose target was reached"""
+        with self._patch_db(in_memory_db):
+            from services.database import (
+                create_ad, create_price_alert, mark_alert_triggered, get_triggerable_price_alerts
+            )
+
+            def ad(i, price):
+                return create_ad(
+                    url=f'https://olx.com.br/item-{i}',
+                    title=f'Item {i}', price=price, description='', state='',
+                    municipality='', neighbourhood='', zipcode='', seller='',
+                    condition='', published_at='', main_category='', sub_category='',
+                    hobbie_type='', images=[], olx_pay=False, olx_delivery=False, search_id=1
+                )
+
+            below_hit = ad(1, '900,00')
+            below_miss = ad(2, '1.100,00')
+            above_hit = ad(3, '1.000,00')
+            fired = ad(4, '500,00')
+            create_price_alert(below_hit, target_price=1000.0, notify_below=True)
+            create_price_alert(below_miss, target_price=1000.0, notify_below=True)
+            create_price_alert(above_hit, target_price=1000.0, notify_below=False)
+            create_price_alert(fired, target_price=1000.0, notify_below=True)
+            mark_alert_triggered(fired)
+            # Preços que não são "1.234,56" nunca disparam (price_cents deles seria 0)
+            for i, price in enumerate(['abc', 'R$ 100', '100abc', '']):
+                create_price_alert(ad(10 + i, price), target_price=1000.0, notify_below=True)
+
+            alerts = get_triggerable_price_alerts()
+
+            assert sorted(a['ad_id'] for a in alerts) == [below_hit, above_hit]
+            assert {a['title'] for a in alerts} == {'Item 1', 'Item 3'}
+
 
 class TestSettings:
     """Tests for settings operations"""
@@ -335,6 +685,21 @@ class TestSettings:
             set_setting('test_key', 'new_value')
             assert get_setting('test_key') == 'new_value'
 
+    def test_get_setting_is_cached_until_set(self, in_memory_db):
+        """Should read a setting from the database once and refresh it on set_setting"""
+        with self._patch_db(in_memory_db):
+            from services.database import get_setting, set_setting
+
+            set_setting('delivery_zipcode', '01001000')
+            assert get_setting('delivery_zipcode') == '01001000'
+
+            # Writes outside set_setting are not seen until the next set_setting
+            in_memory_db.execute("UPDATE settings SET value = '99999999' WHERE key = 'delivery_zipcode'")
+            assert get_setting('delivery_zipcode') == '01001000'
+
+            set_setting('delivery_zipcode', '72860175')
+            assert get_setting('delivery_zipcode') == '72860175'
+
 
 class TestGetAdsWithFilters:
     """Tests for get_ads with various filters"""
@@ -507,6 +872,22 @@ class TestGetAdsWithFilters:
             ads = get_ads(search_text='console')
             assert len(ads) == 3
 
+    def test_search_text_matches_word_prefixes_without_accents(self, in_memory_db):
+        """Should match word prefixes, ignore accents and follow title updates"""
+        with self._patch_db(in_memory_db):
+            from services.database import get_ads
+
+            self._create_test_ads()
+
+            assert [ad['title'] for ad in get_ads(search_text='nint lite')] == ['Nintendo Switch Lite']
+            assert len(get_ads(search_text='MICROSOFT')) == 1
+            assert get_ads(search_text='"') == get_ads()
+
+            in_memory_db.execute("UPDATE ads SET title = 'Videogame Usado' WHERE title = 'Xbox Series S'")
+            in_memory_db.commit()
+            assert get_ads(search_text='xbox') == []
+            assert [ad['title'] for ad in get_ads(search_text='videogame')] == ['Videogame Usado']
+
     def test_sort_by_price_asc(self, in_memory_db):
         """Should sort ads by price ascending"""
         with self._patch_db(in_memory_db):
@@ -542,6 +923,22 @@ class TestGetAdsWithFilters:
             ads = get_ads(limit=2, offset=1)
             assert len(ads) == 2
 
+    def test_get_ads_page_reports_has_more(self, in_memory_db):
+        """Should return one page and whether another page exists"""
+        with self._patch_db(in_memory_db):
+            from services.database import get_ads_page
+
+            self._create_test_ads()
+
+            ads, has_more = get_ads_page(limit=2, offset=0)
+            assert len(ads) == 2 and has_more is True
+
+            ads, has_more = get_ads_page(limit=2, offset=2)
+            assert len(ads) == 1 and has_more is False
+
+            ads, has_more = get_ads_page(search_text='nintendo', limit=1)
+            assert len(ads) == 1 and has_more is False
+
 
 class TestWatchingAds:
     """Tests for watching ads functionality"""
@@ -621,6 +1018,46 @@ class TestWatchingAds:
                 assert len(watching) == 1
                 assert watching[0]['title'] == 'Expensive RJ'
 
+    def test_get_watching_ads_images(self, in_memory_db):
+        """Should return decoded image lists for watched ads only"""
+        with self._patch_db(in_memory_db):
+            from services.database import get_watching_ads_images
+
+            cursor = in_memory_db.cursor()
+            cursor.execute("INSERT INTO ads (id, url, images, watching) VALUES (1, 'https://olx.com.br/a', '[\"https://img/1.jpg\"]', 1)")
+            cursor.execute("INSERT INTO ads (id, url, images, watching) VALUES (2, 'https://olx.com.br/b', NULL, 1)")
+            cursor.execute("INSERT INTO ads (id, url, images, watching) VALUES (3, 'https://olx.com.br/c', '[\"https://img/3.jpg\"]', 0)")
+
+            assert get_watching_ads_images() == [(1, ['https://img/1.jpg']), (2, [])]
+
+    def test_get_watching_ads_with_history(self, in_memory_db):
+        """Should aggregate the last 5 prices and the first price in the same query"""
+        with self._patch_db(in_memory_db):
+            from services.database import get_watching_ads
+
+            cursor = in_memory_db.cursor()
+            cursor.execute("INSERT INTO ads (url, title, price, watching) VALUES ('https://olx.com.br/item-1', 'Item 1', '40,00', 1)")
+            ad_id = cursor.lastrowid
+            for i, price in enumerate(['100,00', '90,00', '80,00', '70,00', '60,00', '50,00', '40,00']):
+                cursor.execute(
+                    "INSERT INTO price_history (ad_id, price, checked_at) VALUES (?, ?, ?)",
+                    (ad_id, price, f'2024-01-0{i + 1} 10:00:00')
+                )
+            cursor.execute("INSERT INTO ads (url, title, price, watching) VALUES ('https://olx.com.br/item-2', 'Item 2', '10,00', 1)")
+            in_memory_db.commit()
+
+            watching = {ad['title']: ad for ad in get_watching_ads(with_history=True)}
+
+            assert json.loads(watching['Item 1']['recent_prices']) == ['80,00', '70,00', '60,00', '50,00', '40,00']
+            assert watching['Item 1']['first_price'] == '100,00'
+            assert watching['Item 1']['last_price'] == '40,00'
+            assert watching['Item 1']['variation'] == pytest.approx(-60.0)
+            assert watching['Item 1']['distinct_price_count'] == 5
+            assert json.loads(watching['Item 2']['recent_prices']) == []
+            assert watching['Item 2']['first_price'] is None
+            assert watching['Item 2']['variation'] == 0
+            assert watching['Item 2']['distinct_price_count'] == 0
+
 
 class TestInactiveAds:
     """Tests for inactive ads functionality"""
@@ -714,6 +1151,20 @@ class TestPushSubscriptions:
             subs = get_all_push_subscriptions()
             assert len(subs) == 0
 
+    def test_delete_subscriptions_bulk(self, in_memory_db):
+        """Should delete only the given push subscriptions"""
+        with self._patch_db(in_memory_db):
+            from services.database import (
+                save_push_subscription, delete_push_subscriptions_bulk, get_all_push_subscriptions
+            )
+
+            for i in range(3):
+                save_push_subscription(f'https://push.example.com/{i}', 'p256dh', 'auth')
+            delete_push_subscriptions_bulk(['https://push.example.com/0', 'https://push.example.com/2'])
+            delete_push_subscriptions_bulk([])
+
+            assert [s['endpoint'] for s in get_all_push_subscriptions()] == ['https://push.example.com/1']
+
 
 class TestAdditionalOperations:
     """Tests for additional database operations"""
@@ -745,6 +1196,36 @@ class TestAdditionalOperations:
             ad = get_ad_by_id(ad_id)
             assert ad['price'] == '80,00'
 
+    def test_bulk_status_and_price_history(self, in_memory_db):
+        """Should apply status changes, new prices and price checks for many ads at once"""
+        with self._patch_db(in_memory_db):
+            from services.database import (
+                create_ad, get_ad_by_id, get_price_history,
+                update_ads_status_bulk, update_ad_prices_bulk, add_price_history_bulk
+            )
+
+            ids = [
+                create_ad(
+                    url=f'https://olx.com.br/item-{i}',
+                    title='Test', price='100,00', description='', state='',
+                    municipality='', neighbourhood='', zipcode='', seller='',
+                    condition='', published_at='', main_category='', sub_category='',
+                    hobbie_type='', images=[], olx_pay=False, olx_delivery=False, search_id=1
+                )
+                for i in range(2)
+            ]
+
+            update_ads_status_bulk([(ids[0], 'inactive'), (ids[1], 'active')])
+            update_ad_prices_bulk([(ids[1], '95,00')])
+            add_price_history_bulk([(ids[0], '90,00'), (ids[1], '95,00'), (ids[0], '85,00')])
+
+            assert get_ad_by_id(ids[0])['price'] == '100,00'
+            assert get_ad_by_id(ids[1])['price'] == '95,00'
+            assert get_ad_by_id(ids[0])['status'] == 'inactive'
+            assert get_ad_by_id(ids[0])['deactivated_at'] is not None
+            assert get_ad_by_id(ids[1])['deactivated_at'] is None
+            assert [h['price'] for h in get_price_history(ids[0])] == ['90,00', '85,00']
+
     def test_get_last_price_check(self, in_memory_db):
         """Should return most recent price check (by ID since timestamps can be identical)"""
         with self._patch_db(in_memory_db):
@@ -774,6 +1255,26 @@ class TestAdditionalOperations:
             last = get_last_price_check(ad_id)
             assert last is not None
 
+    def test_get_last_price_checks(self, in_memory_db):
+        """Should return the newest price of each ad in one call"""
+        with self._patch_db(in_memory_db):
+            from services.database import create_ad, add_price_history_bulk, get_last_price_checks
+
+            ids = [
+                create_ad(
+                    url=f'https://olx.com.br/item-{i}',
+                    title='Test', price='100', description='', state='',
+                    municipality='', neighbourhood='', zipcode='', seller='',
+                    condition='', published_at='', main_category='', sub_category='',
+                    hobbie_type='', images=[], olx_pay=False, olx_delivery=False, search_id=1
+                )
+                for i in range(3)
+            ]
+            add_price_history_bulk([(ids[0], '100,00'), (ids[1], '50,00'), (ids[0], '80,00')])
+
+            assert get_last_price_checks(ids) == {ids[0]: '80,00', ids[1]: '50,00'}
+            assert get_last_price_checks([]) == {}
+
     def test_get_ads_to_check(self, in_memory_db):
         """Should return active ads for status checking"""
         with self._patch_db(in_memory_db):
@@ -800,6 +1301,31 @@ class TestAdditionalOperations:
             assert len(ads) == 1
             assert ads[0]['url'] == 'https://olx.com.br/item-1'
 
+    def test_get_ads_to_check_pages_by_key(self, in_memory_db):
+        """Pages continue after the last row even if earlier rows were deactivated"""
+        with self._patch_db(in_memory_db):
+            from services.database import create_ad, update_ads_status_bulk, get_ads_to_check
+
+            ids = [
+                create_ad(
+                    url=f'https://olx.com.br/item-{i}',
+                    title='Active', price='100', description='', state='',
+                    municipality='', neighbourhood='', zipcode='', seller='',
+                    condition='', published_at='', main_category='', sub_category='',
+                    hobbie_type='', images=[], olx_pay=False, olx_delivery=False, search_id=1
+                )
+                for i in range(5)
+            ]
+
+            first = get_ads_to_check(limit=2)
+            update_ads_status_bulk([(ad['id'], 'inactive') for ad in first])
+            second = get_ads_to_check(limit=2, after=first[-1])
+            third = get_ads_to_check(limit=2, after=second[-1])
+
+            seen = [ad['id'] for ad in first + second + third]
+            assert sorted(seen) == sorted(ids)
+            assert len(third) == 1
+
     def test_get_ads_count(self, in_memory_db):
         """Should count ads with filters"""
         with self._patch_db(in_memory_db):
@@ -855,6 +1381,32 @@ class TestAdditionalOperations:
             assert '#SP' in states
             assert '#RJ' in states
 
+    def test_state_options_are_cached_until_new_state(self, in_memory_db, monkeypatch):
+        """Should serve states from cache and refresh only when a new state appears"""
+        import services.database as database
+        monkeypatch.setattr(database, '_states_cache', None)
+
+        with self._patch_db(in_memory_db):
+            cursor = in_memory_db.cursor()
+            cursor.execute("INSERT INTO ads (url, state) VALUES ('https://olx.com.br/item-1', '#SP')")
+            in_memory_db.commit()
+
+            assert database.get_state_options() == {None: 'Todos', '#SP': 'SP'}
+
+            # Writes outside create_ad are not seen while the cache is fresh
+            cursor.execute("INSERT INTO ads (url, state) VALUES ('https://olx.com.br/item-2', '#RJ')")
+            in_memory_db.commit()
+            assert database.get_distinct_states() == ['#SP']
+
+            database.create_ad(
+                url='https://olx.com.br/item-3',
+                title='Item 3', price='100', description='', state='#MG',
+                municipality='', neighbourhood='', zipcode='', seller='',
+                condition='', published_at='', main_category='', sub_category='',
+                hobbie_type='', images=[], olx_pay=False, olx_delivery=False, search_id=1
+            )
+            assert database.get_distinct_states() == ['#MG', '#RJ', '#SP']
+
     def test_update_search(self, in_memory_db):
         """Should update search configuration"""
         with self._patch_db(in_memory_db):
@@ -900,3 +1452,31 @@ class TestAdditionalOperations:
 
             alert = get_price_alert(ad_id)
             assert alert['triggered_at'] is not None
+
+
+class TestNotificationHistory:
+    """Tests for notification history operations"""
+
+    @contextmanager
+    def _patch_db(self, in_memory_db):
+        @contextmanager
+        def mock_connection():
+            yield in_memory_db
+
+        with patch('services.database.get_connection', mock_connection):
+            yield
+
+    def test_mark_notifications_read(self, in_memory_db):
+        """Should mark unread notifications and skip the update when none are left"""
+        with self._patch_db(in_memory_db):
+            from services.database import (
+                save_notification, mark_notifications_read, get_unread_notification_count
+            )
+
+            save_notification('cheap_ad', 'Item 1', '100', 'https://olx.com.br/item-1')
+            save_notification('price_drop', 'Item 2', '90', 'https://olx.com.br/item-2')
+
+            assert get_unread_notification_count() == 2
+            assert mark_notifications_read() == 2
+            assert get_unread_notification_count() == 0
+            assert mark_notifications_read() == 0
@@ -8,10 +8,18 @@ import httpx
 
 from services.delivery import (
     DeliveryOption, DeliveryQuote,
-    get_delivery_quote, get_delivery_quote_async
+    get_delivery_quote, get_delivery_quote_async, _parse_quote
 )
 
 
+@pytest.fixture(autouse=True)
+def fresh_clients(monkeypatch):
+    """Each test builds the shared clients from its own patched httpx classes"""
+    monkeypatch.setattr('services.delivery._client', None)
+    monkeypatch.setattr('services.delivery._async_client', None)
+    monkeypatch.setattr('services.delivery._quote_cache', {})
+
+
 class TestDeliveryQuote:
     """Tests for DeliveryQuote dataclass"""
 
@@ -203,6 +211,65 @@ class TestGetDeliveryQuote:
         assert quote.standard.is_free is True
 
 
+class TestParseQuote:
+    """Tests for the API response parser shared by sync and async paths"""
+
+    def test_maps_known_companies_and_ignores_others(self):
+        """Should fill standard/express and skip pickup or unknown companies"""
+        quote = _parse_quote({
+            'deliveryOptions': [
+                {'company': {'name': 'Retirar'}, 'price': {'raw': 0}, 'dueDate': 0},
+                {'company': {'name': 'Outra'}, 'price': {'raw': 9.0}, 'dueDate': 3},
+                {'company': {'name': 'Expressa'}, 'price': {'raw': 30.0}, 'dueDate': 1},
+            ]
+        })
+
+        assert quote.standard is None
+        assert quote.express.price == 30.0
+        assert quote.express.price_label == 'R$ 30.00'
+
+    def test_returns_none_without_options(self):
+        """Should return None when the payload has no usable option"""
+        assert _parse_quote({}) is None
+
+
+class TestQuoteCache:
+    """Tests for the (list_id, zipcode) quote cache"""
+
+    @patch('services.delivery.get_setting')
+    @patch('services.delivery.httpx.Client')
+    def test_repeated_quote_is_served_from_cache(self, mock_client_class, mock_setting):
+        """Should hit the API once per (list_id, zipcode) within the TTL"""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            'deliveryOptions': [
+                {'company': {'name': 'Padrão'}, 'price': {'raw': 15.90, 'label': 'R$ 15,90'}, 'dueDate': 5}
+            ]
+        }
+        mock_client = MagicMock()
+        mock_client.post.return_value = mock_response
+        mock_client_class.return_value = mock_client
+
+        first = get_delivery_quote(123456, zipcode='01310100')
+        second = get_delivery_quote(123456, zipcode='01310100')
+        get_delivery_quote(123456, zipcode='12345678')
+
+        assert first is second
+        assert mock_client.post.call_count == 2
+
+    @patch('services.delivery.get_setting')
+    @patch('services.delivery.httpx.Client')
+    def test_errors_are_not_cached(self, mock_client_class, mock_setting):
+        """Should retry the API after a failed request"""
+        mock_client = MagicMock()
+        mock_client.post.side_effect = httpx.HTTPError("Connection failed")
+        mock_client_class.return_value = mock_client
+
+        assert get_delivery_quote(123456, zipcode='01310100') is None
+        assert get_delivery_quote(123456, zipcode='01310100') is None
+        assert mock_client.post.call_count == 2
+
+
 class TestGetDeliveryQuoteAsync:
     """Tests for async delivery quote fetching"""
 
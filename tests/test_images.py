@@ -2,6 +2,7 @@
 Tests for images service - local image storage and management
 """
 
+import io
 from unittest.mock import patch, MagicMock
 from pathlib import Path
 import tempfile
@@ -16,15 +17,22 @@ from services.images import (
 class TestDownloadAdImages:
     """Tests for image downloading"""
 
-    @patch('services.images.requests.get')
+    @patch('services.images._get_session')
     @patch('services.images.IMAGES_DIR', new_callable=lambda: Path(tempfile.mkdtemp()))
-    def test_downloads_images_successfully(self, mock_dir, mock_get):
-        """Should download and save images to local storage"""
-        # Setup mock response
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.content = b'fake image data'
-        mock_get.return_value = mock_response
+    def test_downloads_images_successfully(self, mock_dir, mock_session):
+        """Should download and save images to local storage, in URL order"""
+        mock_get = mock_session.return_value.get
+        responses = []
+
+        def fake_get(url, **kwargs):
+            response = MagicMock()
+            response.status_code = 200
+            response.headers = {'Content-Length': '32'}
+            response.raw = io.BytesIO(b'fake image data')
+            responses.append(response)
+            return response
+
+        mock_get.side_effect = fake_get
 
         try:
             mock_dir.mkdir(parents=True, exist_ok=True)
@@ -32,15 +40,20 @@ class TestDownloadAdImages:
             urls = ['https://img.olx.com.br/image1.jpg', 'https://img.olx.com.br/image2.jpg']
             paths = download_ad_images(1, urls)
 
-            assert len(paths) == 2
+            assert paths == [str(mock_dir / '1_0.jpg'), str(mock_dir / '1_1.jpg')]
+            # Preallocated past the body (wrong Content-Length) and trimmed back
+            assert (mock_dir / '1_0.jpg').read_bytes() == b'fake image data'
+            assert not list(mock_dir.glob('*.part'))
             assert mock_get.call_count == 2
+            assert all(r.close.called and r.raw.decode_content for r in responses)
         finally:
             shutil.rmtree(mock_dir, ignore_errors=True)
 
-    @patch('services.images.requests.get')
+    @patch('services.images._get_session')
     @patch('services.images.IMAGES_DIR', new_callable=lambda: Path(tempfile.mkdtemp()))
-    def test_skips_existing_images(self, mock_dir, mock_get):
+    def test_skips_existing_images(self, mock_dir, mock_session):
         """Should skip downloading if image already exists"""
+        mock_get = mock_session.return_value.get
         try:
             mock_dir.mkdir(parents=True, exist_ok=True)
 
@@ -57,10 +70,43 @@ class TestDownloadAdImages:
         finally:
             shutil.rmtree(mock_dir, ignore_errors=True)
 
-    @patch('services.images.requests.get')
+    @patch('services.images._get_session')
+    @patch('services.images.IMAGES_DIR', new_callable=lambda: Path(tempfile.mkdtemp()))
+    def test_refresh_revalidates_with_saved_etag(self, mock_dir, mock_session):
+        """Should store the ETag and, on refresh, send it back and keep the file on 304"""
+        mock_get = mock_session.return_value.get
+        url = 'https://img.olx.com.br/image1.jpg'
+
+        try:
+            mock_dir.mkdir(parents=True, exist_ok=True)
+
+            mock_get.return_value = MagicMock(status_code=200, headers={'ETag': '"abc"'},
+                                              raw=io.BytesIO(b'original'))
+            download_ad_images(1, [url])
+            assert (mock_dir / '1_0.jpg.etag').read_text() == '"abc"'
+
+            mock_get.reset_mock()
+            mock_get.return_value = MagicMock(status_code=304, headers={})
+            paths = download_ad_images(1, [url], refresh=True)
+
+            headers = mock_get.call_args.kwargs['headers']
+            assert headers['If-None-Match'] == '"abc"'
+            assert 'If-Modified-Since' in headers
+            assert paths == [str(mock_dir / '1_0.jpg')]
+            assert (mock_dir / '1_0.jpg').read_bytes() == b'original'
+
+            # Without refresh an existing file is not requested at all
+            mock_get.reset_mock()
+            download_ad_images(1, [url])
+            mock_get.assert_not_called()
+        finally:
+            shutil.rmtree(mock_dir, ignore_errors=True)
+
+    @patch('services.images._get_session')
     @patch('services.images.IMAGES_DIR', new_callable=lambda: Path(tempfile.mkdtemp()))
-    def test_handles_download_error(self, mock_dir, mock_get):
+    def test_handles_download_error(self, mock_dir, mock_session):
         """Should handle HTTP errors gracefully"""
+        mock_get = mock_session.return_value.get
         mock_response = MagicMock()
         mock_response.status_code = 404
         mock_get.return_value = mock_response
@@ -75,10 +121,11 @@ class TestDownloadAdImages:
         finally:
             shutil.rmtree(mock_dir, ignore_errors=True)
 
-    @patch('services.images.requests.get')
+    @patch('services.images._get_session')
     @patch('services.images.IMAGES_DIR', new_callable=lambda: Path(tempfile.mkdtemp()))
-    def test_handles_network_exception(self, mock_dir, mock_get):
+    def test_handles_network_exception(self, mock_dir, mock_session):
         """Should handle network exceptions gracefully"""
+        mock_get = mock_session.return_value.get
         mock_get.side_effect = Exception("Network error")
 
         try:
@@ -92,6 +139,22 @@ class TestDownloadAdImages:
             shutil.rmtree(mock_dir, ignore_errors=True)
 
 
+class TestSession:
+    """Tests for the shared download session"""
+
+    @patch('services.images._session', None)
+    def test_retries_transient_gateway_errors(self):
+        """Adapter retries 502/503/504 with backoff"""
+        from services.images import _get_session
+
+        session = _get_session()
+        retries = session.get_adapter('https://img.olx.com.br/x.jpg').max_retries
+
+        assert session is _get_session()
+        assert retries.total == 3
+        assert set(retries.status_forcelist) == {502, 503, 504}
+
+
 class TestGetLocalImages:
     """Tests for retrieving local images"""
 
@@ -116,20 +179,50 @@ class TestGetLocalImages:
             shutil.rmtree(mock_dir, ignore_errors=True)
 
     @patch('services.images.IMAGES_DIR', new_callable=lambda: Path(tempfile.mkdtemp()))
-    def test_stops_at_missing_index(self, mock_dir):
-        """Should stop counting at first missing index"""
+    def test_keeps_images_after_missing_index(self, mock_dir):
+        """Should list every image in numeric order, even past a gap"""
         try:
             mock_dir.mkdir(parents=True, exist_ok=True)
 
-            # Create images with gap (0, 1, missing 2, 3)
+            # Create images with gap (0, 1, missing 2, 3, 10)
             (mock_dir / '10_0.jpg').write_bytes(b'img0')
             (mock_dir / '10_1.jpg').write_bytes(b'img1')
             (mock_dir / '10_3.jpg').write_bytes(b'img3')  # Gap at 2
+            (mock_dir / '10_10.jpg').write_bytes(b'img10')
+            (mock_dir / '100_0.jpg').write_bytes(b'other ad')
 
             images = get_local_images(10)
 
-            # Should only find 0 and 1, stop at missing 2
-            assert len(images) == 2
+            assert images == ['/images/10_0.jpg', '/images/10_1.jpg', '/images/10_3.jpg', '/images/10_10.jpg']
+        finally:
+            shutil.rmtree(mock_dir, ignore_errors=True)
+
+    @patch('services.images.IMAGES_DIR', new_callable=lambda: Path(tempfile.mkdtemp()))
+    def test_reuses_directory_listing_until_it_changes(self, mock_dir):
+        """Should scan the directory once for several ads and rescan after a new file"""
+        import os
+        try:
+            mock_dir.mkdir(parents=True, exist_ok=True)
+            (mock_dir / '1_0.jpg').write_bytes(b'img')
+            (mock_dir / '2_0.jpg').write_bytes(b'img')
+            (mock_dir / '2_0.part').write_bytes(b'partial')
+
+            with patch('services.images.os.scandir', wraps=os.scandir) as scandir:
+                assert get_local_images(1) == ['/images/1_0.jpg']
+                assert has_local_images(2) is True
+                assert has_local_images(3) is False
+                assert scandir.call_count == 1
+
+                (mock_dir / '3_0.jpg').write_bytes(b'img')
+                os.utime(mock_dir, ns=(0, mock_dir.stat().st_mtime_ns + 1))
+                assert has_local_images(3) is True
+                assert scandir.call_count == 2
+
+                # Files written by this process update the index without a rescan
+                delete_ad_images(1)
+                assert get_local_images(1) == []
+                assert has_local_images(2) is True
+                assert scandir.call_count == 2
         finally:
             shutil.rmtree(mock_dir, ignore_errors=True)
 
@@ -149,10 +242,14 @@ class TestDeleteAdImages:
             img0.write_bytes(b'img0')
             img1.write_bytes(b'img1')
 
+            img3 = mock_dir / '7_3.jpg'
+            img3.write_bytes(b'img3')
+
             delete_ad_images(7)
 
             assert not img0.exists()
             assert not img1.exists()
+            assert not img3.exists()
         finally:
             shutil.rmtree(mock_dir, ignore_errors=True)
 
@@ -185,3 +282,66 @@ class TestHasLocalImages:
             assert has_local_images(8) is True
         finally:
             shutil.rmtree(mock_dir, ignore_errors=True)
+
+
+class TestDownloadWatchingAdsImages:
+    """Tests for the startup batch download"""
+
+    @patch('services.images._get_session')
+    @patch('services.images.IMAGES_DIR', new_callable=lambda: Path(tempfile.mkdtemp()))
+    def test_shared_url_is_downloaded_once(self, mock_dir, mock_session):
+        """Should fetch a URL used by several ads once and link it into each ad"""
+        from services.images import download_watching_ads_images
+
+        mock_get = mock_session.return_value.get
+        mock_get.side_effect = lambda url, **kwargs: MagicMock(status_code=200, headers={},
+                                                               raw=io.BytesIO(b'stock photo'))
+        ads = [
+            (1, ['https://img.olx.com.br/stock.jpg']),
+            (2, ['https://img.olx.com.br/own.jpg', 'https://img.olx.com.br/stock.jpg']),
+        ]
+
+        try:
+            mock_dir.mkdir(parents=True, exist_ok=True)
+
+            with patch('services.database.get_watching_ads_images', return_value=ads):
+                assert download_watching_ads_images() == 2
+
+            assert mock_get.call_count == 2
+            assert (mock_dir / '2_1.jpg').read_bytes() == b'stock photo'
+            assert (mock_dir / '1_0.jpg').stat().st_ino == (mock_dir / '2_1.jpg').stat().st_ino
+        finally:
+            shutil.rmtree(mock_dir, ignore_errors=True)
+
+    @patch('services.images._get_session')
+    @patch('services.images.IMAGES_DIR', new_callable=lambda: Path(tempfile.mkdtemp()))
+    def test_downloads_missing_images_of_all_ads(self, mock_dir, mock_session):
+        """Should fetch every missing image of watched ads, gaps included, in one batch"""
+        from services.images import download_watching_ads_images
+
+        mock_get = mock_session.return_value.get
+        mock_get.side_effect = lambda url, **kwargs: MagicMock(status_code=200, headers={}, raw=io.BytesIO(b'img'))
+
+        ads = [
+            (1, ['https://img.olx.com.br/a.jpg', 'https://img.olx.com.br/b.jpg']),
+            (2, ['https://img.olx.com.br/c.jpg']),
+            (3, ['https://img.olx.com.br/d.jpg']),
+            (4, []),
+            (5, ['https://img.olx.com.br/e.jpg', 'https://img.olx.com.br/f.jpg']),
+        ]
+
+        try:
+            mock_dir.mkdir(parents=True, exist_ok=True)
+            (mock_dir / '3_0.jpg').write_bytes(b'existing')
+            (mock_dir / '5_1.jpg').write_bytes(b'existing')  # index 0 failed earlier
+
+            with patch('services.database.get_watching_ads_images', return_value=ads):
+                downloaded = download_watching_ads_images()
+
+            assert downloaded == 3
+            assert mock_get.call_count == 4
+            assert sorted(p.name for p in mock_dir.glob('*.jpg')) == [
+                '1_0.jpg', '1_1.jpg', '2_0.jpg', '3_0.jpg', '5_0.jpg', '5_1.jpg'
+            ]
+        finally:
+            shutil.rmtree(mock_dir, ignore_errors=True)
@@ -0,0 +1,75 @@
+"""
+Tests for logger - in-memory ring buffer used by the UI
+"""
+
+import logging
+
+from services.logger import MemoryHandler
+
+
+def _emit(handler: MemoryHandler, *messages: str):
+    for message in messages:
+        handler.emit(logging.LogRecord('olx_monitor.test', logging.INFO, __file__, 0, message, None, None))
+
+
+class TestMemoryHandlerGetLogs:
+    """Tests for reading the ring buffer with and without a limit"""
+
+    def test_limit_zero_returns_nothing(self):
+        """limit=0 should build no entries"""
+        handler = MemoryHandler(max_records=3)
+        _emit(handler, 'a', 'b')
+
+        assert handler.get_logs(limit=0) == []
+
+    def test_limit_above_count_returns_everything(self):
+        """A limit larger than the stored records should return all of them, newest first"""
+        handler = MemoryHandler(max_records=5)
+        _emit(handler, 'a', 'b')
+
+        assert [log['message'] for log in handler.get_logs(limit=10)] == ['b', 'a']
+
+    def test_wraps_around_after_buffer_fills(self):
+        """Oldest records are overwritten; limit walks back from the newest"""
+        handler = MemoryHandler(max_records=3)
+        _emit(handler, 'a', 'b', 'c', 'd', 'e')
+
+        assert [log['message'] for log in handler.get_logs()] == ['e', 'd', 'c']
+        assert [log['message'] for log in handler.get_logs(limit=2)] == ['e', 'd']
+
+    def test_entries_carry_level_and_logger(self):
+        """Each entry should expose level and logger name for the UI columns"""
+        handler = MemoryHandler(max_records=2)
+        _emit(handler, 'hello')
+
+        log = handler.get_logs(limit=1)[0]
+        assert log['level'] == 'info'
+        assert log['logger'] == 'olx_monitor.test'
+        assert log['message'] == 'hello'
+
+
+class TestMemoryHandlerCapacity:
+    """Tests for zero capacity and clearing the buffer"""
+
+    def test_zero_capacity_keeps_nothing(self):
+        """max_records=0 should store nothing instead of failing, like deque(maxlen=0)"""
+        handler = MemoryHandler(max_records=0)
+        _emit(handler, 'a', 'b')
+
+        assert handler.get_logs() == []
+        assert handler.get_logs(limit=5) == []
+
+    def test_clear_resets_every_array(self):
+        """clear() should drop all parallel arrays and restart writing at slot 0"""
+        handler = MemoryHandler(max_records=3)
+        _emit(handler, 'a', 'b')
+
+        handler.clear()
+
+        assert handler.get_logs() == []
+        assert handler.head == 0 and handler.count == 0
+        assert list(handler.created) == [0.0] * 3
+        assert handler.levels == handler.messages == handler.loggers == [None] * 3
+
+        _emit(handler, 'c')
+        assert [log['message'] for log in handler.get_logs()] == ['c']
@@ -85,12 +85,74 @@ class TestCheckPriceAlertTrigger:
         assert check_price_alert_trigger(current_price, target, notify_below) is expected
 
 
+class TestNotificationTag:
+    """Tests for notification tags"""
+
+    def test_tag_is_stable_and_distinct(self):
+        """Should derive the same tag for a URL on every run and differ between URLs"""
+        import hashlib
+        from services.notifications import _tag
+
+        tag = _tag('price-drop', 'https://olx.com.br/item-1')
+
+        assert tag == 'price-drop-' + hashlib.blake2b(b'https://olx.com.br/item-1', digest_size=6).hexdigest()
+        assert len(tag) == len('price-drop-') + 12
+        assert tag != _tag('price-drop', 'https://olx.com.br/item-2')
+
+
+class TestVapidKeys:
+    """Tests for VAPID key loading"""
+
+    @patch('services.notifications.get_setting')
+    def test_keys_are_read_once(self, mock_get_setting):
+        """Should hit the settings table only on the first call"""
+        from services.notifications import get_or_create_vapid_keys, reset_vapid_cache
+
+        reset_vapid_cache()
+        mock_get_setting.side_effect = lambda key: {'vapid_public_key': 'pub', 'vapid_private_key': 'priv'}[key]
+
+        try:
+            assert get_or_create_vapid_keys() == ('pub', 'priv')
+            assert get_or_create_vapid_keys() == ('pub', 'priv')
+            assert mock_get_setting.call_count == 2
+        finally:
+            reset_vapid_cache()
+
+
+class TestBuildPushPayload:
+    """Tests for the push payload encoding"""
+
+    def test_payload_is_compact_utf8_json(self):
+        """Should encode once as compact UTF-8 and omit empty fields"""
+        import json
+        from services.notifications import build_push_payload
+
+        payload = build_push_payload('Preço caiu', 'Switch por R$ 1.200,00')
+
+        assert isinstance(payload, bytes)
+        assert 'Preço'.encode('utf-8') in payload
+        assert b': ' not in payload
+        assert json.loads(payload) == {
+            'title': 'Preço caiu', 'body': 'Switch por R$ 1.200,00', 'url': '/', 'tag': 'olx-monitor'
+        }
+
+    def test_payload_keeps_image_when_given(self):
+        """Should include the image URL only when there is one"""
+        import json
+        from services.notifications import build_push_payload
+
+        payload = build_push_payload('T', 'B', url='/watching', image='https://img.olx.com.br/a.jpg')
+
+        assert json.loads(payload)['image'] == 'https://img.olx.com.br/a.jpg'
+        assert json.loads(payload)['url'] == '/watching'
+
+
 class TestSendPushNotification:
     """Tests for push notification delivery"""
 
     @patch('services.notifications.get_all_push_subscriptions')
     @patch('services.notifications.get_or_create_vapid_keys')
-    @patch('services.notifications.webpush')
+    @patch('pywebpush.webpush')
     def test_sends_to_all_subscribers(self, mock_webpush, mock_vapid, mock_subs):
         """Should send notification to every registered subscriber"""
         from services.notifications import send_push_notification
@@ -119,8 +181,8 @@ class TestSendPushNotification:
 
     @patch('services.notifications.get_all_push_subscriptions')
     @patch('services.notifications.get_or_create_vapid_keys')
-    @patch('services.notifications.webpush')
-    @patch('services.notifications.delete_push_subscription')
+    @patch('pywebpush.webpush')
+    @patch('services.notifications.delete_push_subscriptions_bulk')
     def test_removes_expired_subscriptions_on_410_error(self, mock_delete, mock_webpush, mock_vapid, mock_subs):
         """Should delete subscription when push endpoint returns 410 Gone"""
         from services.notifications import send_push_notification
@@ -139,7 +201,7 @@ class TestSendPushNotification:
         sent = send_push_notification('Test Title', 'Test Body')
 
         assert sent == 0
-        mock_delete.assert_called_once_with('https://push.example.com/expired')
+        mock_delete.assert_called_once_with(['https://push.example.com/expired'])
 
 
 class TestNotifyPriceDrop:
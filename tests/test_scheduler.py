@@ -23,6 +23,21 @@ class TestSchedulerLogs:
         assert logs[0]['level'] == "info"
         assert 'timestamp' in logs[0]
 
+    def test_timestamp_is_formatted_once_per_second(self):
+        """Entries within the same second reuse the formatted timestamp"""
+        import time
+        from services.scheduler import _timestamp_now
+
+        with patch('services.scheduler._last_timestamp', (0, "")), \
+                patch('services.scheduler.time.time', return_value=1_700_000_000.2), \
+                patch('services.scheduler.time.strftime', wraps=time.strftime) as mock_fmt:
+            first = _timestamp_now()
+            second = _timestamp_now()
+
+        assert first == second
+        assert len(first) == 19
+        assert mock_fmt.call_count == 1
+
     def test_logs_are_limited_to_max_size(self):
         """Should keep only last MAX_LOGS entries"""
         from services.scheduler import add_log, get_logs, clear_logs, MAX_LOGS
@@ -35,6 +50,20 @@ class TestSchedulerLogs:
 
         logs = get_logs()
         assert len(logs) == MAX_LOGS
+        assert logs[0]['message'] == f"Message {MAX_LOGS + 9}"
+        assert logs[-1]['message'] == "Message 10"
+
+    def test_get_logs_limit_returns_newest_entries(self):
+        """Should copy only the latest `limit` entries"""
+        from services.scheduler import add_log, get_logs, clear_logs
+
+        clear_logs()
+        for i in range(5):
+            add_log(f"Message {i}", "info")
+
+        assert [log['message'] for log in get_logs(limit=2)] == ["Message 4", "Message 3"]
+        assert len(get_logs(limit=50)) == 5
+        assert get_logs(limit=0) == []
 
     def test_clear_logs_removes_all_entries(self):
         """Should remove all log entries"""
@@ -46,6 +75,90 @@ class TestSchedulerLogs:
         assert get_logs() == []
 
 
+class TestLogDrain:
+    """Tests for moving scheduler log output off the job threads"""
+
+    def test_add_log_goes_through_queue_while_draining(self):
+        """Records reach the real handlers via the listener, which is flushed on stop"""
+        import logging
+        from logging.handlers import QueueHandler
+        from services.scheduler import add_log, sched_logger, _start_log_drain, _stop_log_drain
+
+        class Capture(logging.Handler):
+            def __init__(self):
+                super().__init__()
+                self.messages = []
+
+            def emit(self, record):
+                self.messages.append(record.getMessage())
+
+        capture = Capture()
+        original = list(sched_logger.handlers)
+        sched_logger.addHandler(capture)
+        try:
+            _start_log_drain()
+            assert [type(h) for h in sched_logger.handlers] == [QueueHandler]
+
+            add_log("Queued message", "warning")
+            _stop_log_drain()
+
+            assert "Queued message" in capture.messages
+            assert sched_logger.handlers == original + [capture]
+        finally:
+            _stop_log_drain()
+            sched_logger.handlers = original
+
+
+class TestJobsLoop:
+    """Tests for the persistent event loop shared by the jobs"""
+
+    @patch('services.scheduler.scraper')
+    def test_jobs_share_one_loop_until_stopped(self, mock_scraper):
+        """Runs reuse the same loop; closing it closes the scraper session"""
+        import asyncio
+        from services.scheduler import _run_job, _close_jobs_loop
+
+        mock_scraper.close = AsyncMock()
+
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        first = _run_job(current_loop())
+        second = _run_job(current_loop())
+        mock_scraper.close.assert_not_awaited()
+
+        _close_jobs_loop()
+
+        assert first is second
+        assert first.is_closed()
+        mock_scraper.close.assert_awaited_once()
+
+
+class TestNotify:
+    """Tests for sending notifications off the job loop"""
+
+    def test_runs_on_notifier_thread_and_logs_failures(self):
+        """Should call the sender on its own thread and log exceptions"""
+        import threading
+        from services.scheduler import _notify, get_logs, clear_logs
+
+        clear_logs()
+        threads = []
+
+        def ok(title):
+            threads.append(threading.current_thread().name)
+
+        def boom():
+            raise RuntimeError("push service down")
+
+        _notify(ok, 'x').result()
+        _notify(boom).result()
+
+        assert threads[0].startswith('notifications')
+        assert threads[0] != threading.current_thread().name
+        assert 'push service down' in get_logs()[0]['message']
+
+
 class TestSchedulerTaskStatus:
     """Tests for task running status tracking"""
 
@@ -73,6 +186,58 @@ class TestSchedulerTaskStatus:
         assert status['result'] is None
 
 
+class TestTaskSubscribers:
+    """Tests for task completion callbacks"""
+
+    @pytest.mark.asyncio
+    async def test_subscriber_called_once_when_task_finishes(self):
+        """Should call subscribed coroutine with the final status"""
+        import asyncio
+        from services.scheduler import subscribe, running_tasks, task_results, _finish_task
+
+        running_tasks['price_check'] = True
+        callback = AsyncMock()
+        subscribe('price_check', callback)
+
+        task_results['price_check'] = {'success': True, 'price_changes': 2}
+        await asyncio.to_thread(_finish_task, 'price_check')
+        await asyncio.sleep(0.01)
+
+        callback.assert_awaited_once()
+        assert callback.call_args.args[0]['result']['price_changes'] == 2
+        assert running_tasks['price_check'] is False
+
+    @pytest.mark.asyncio
+    async def test_subscribe_after_finish_calls_immediately(self):
+        """Should not miss a task that finished before subscribing"""
+        import asyncio
+        from services.scheduler import subscribe, running_tasks
+
+        running_tasks['price_check'] = False
+        callback = AsyncMock()
+        subscribe('price_check', callback)
+        await asyncio.sleep(0)
+
+        callback.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_wait_for_task_returns_final_status(self):
+        """Should resume the waiter once the task finishes in another thread"""
+        import asyncio
+        from services.scheduler import wait_for_task, running_tasks, task_results, _finish_task
+
+        running_tasks['status_check'] = True
+        waiter = asyncio.create_task(wait_for_task('status_check'))
+        await asyncio.sleep(0)
+
+        task_results['status_check'] = {'success': True, 'deactivated': 1}
+        await asyncio.to_thread(_finish_task, 'status_check')
+
+        status = await asyncio.wait_for(waiter, timeout=1)
+        assert status['running'] is False
+        assert status['result']['deactivated'] == 1
+
+
 class TestRunTaskNow:
     """Tests for manual task execution"""
 
@@ -166,13 +331,135 @@ class TestSchedulerStatus:
         assert status['jobs'] == []
 
 
+class TestRateLimiter:
+    """Tests for the token bucket shared by a job's tasks"""
+
+    @pytest.mark.asyncio
+    async def test_bursts_up_to_rate_then_spaces_requests(self):
+        """First `rate` entries pass at once, the rest wait for refill"""
+        import asyncio
+        from services.scheduler import RateLimiter
+
+        limiter = RateLimiter(2, period=0.2)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        times = []
+
+        async def hit():
+            async with limiter:
+                times.append(loop.time() - start)
+
+        await asyncio.gather(*(hit() for _ in range(4)))
+
+        times.sort()
+        assert times[1] < 0.05
+        assert times[3] >= 0.18
+
+
+class TestAdmissionController:
+    """Tests for the resizable concurrency limit"""
+
+    @pytest.mark.asyncio
+    async def test_never_exceeds_limit(self):
+        """At most cmax tasks run at the same time"""
+        import asyncio
+        from services.scheduler import AdmissionController
+
+        admission = AdmissionController(2)
+        active = peak = 0
+
+        async def task():
+            nonlocal active, peak
+            async with admission:
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(task() for _ in range(6)))
+
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_shrinks_on_rate_limit_and_grows_back(self):
+        """RateLimitError lowers the limit; a success streak restores it"""
+        from services.scheduler import AdmissionController
+        from services.exceptions import RateLimitError
+
+        admission = AdmissionController(3, grow_after=2)
+
+        with pytest.raises(RateLimitError):
+            async with admission:
+                raise RateLimitError("429")
+        assert admission.cmax == 2
+
+        for _ in range(4):
+            async with admission:
+                pass
+        assert admission.cmax == 3
+
+    @pytest.mark.asyncio
+    async def test_growing_wakes_waiting_tasks(self):
+        """Raising cmax admits tasks already waiting"""
+        import asyncio
+        from services.scheduler import AdmissionController
+
+        admission = AdmissionController(2)
+        await admission.set_cmax(1)
+        release = asyncio.Event()
+        entered = []
+
+        async def task(i):
+            async with admission:
+                entered.append(i)
+                await release.wait()
+
+        tasks = [asyncio.create_task(task(i)) for i in range(2)]
+        await asyncio.sleep(0)
+        assert len(entered) == 1
+
+        await admission.set_cmax(2)
+        await asyncio.sleep(0)
+        assert len(entered) == 2
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+
+class TestJobLimits:
+    """Tests for the request budget shared by the jobs"""
+
+    @pytest.mark.asyncio
+    async def test_jobs_on_the_same_loop_share_limits(self):
+        """Every job on a loop gets the same admission controller and limiter"""
+        from services.scheduler import _get_job_limits, MAX_CONCURRENT_REQUESTS
+
+        admission, limiter = _get_job_limits()
+
+        assert _get_job_limits() == (admission, limiter)
+        assert admission.cmax == MAX_CONCURRENT_REQUESTS
+
+    def test_each_loop_gets_its_own_limits(self):
+        """Limits are bound to their loop, so another loop builds new ones"""
+        import asyncio
+        from services.scheduler import _get_job_limits
+
+        async def limits():
+            return _get_job_limits()
+
+        first = asyncio.run(limits())
+        second = asyncio.run(limits())
+
+        assert first[0] is not second[0]
+
+
 class TestJobSearchNewAdsAsync:
     """Tests for async search job"""
 
     @pytest.mark.asyncio
     @patch('services.scheduler.get_active_searches')
     @patch('services.scheduler.scraper')
-    @patch('services.scheduler.create_ad')
+    @patch('services.scheduler.create_ads_bulk')
     @patch('services.scheduler.get_existing_urls')
     async def test_job_finds_and_saves_new_ads(
         self, mock_existing, mock_create, mock_scraper, mock_searches
@@ -228,8 +515,94 @@ class TestJobSearchNewAdsAsync:
 
         await job_search_new_ads_async()
 
-        # Should have called create_ad for new ads
-        assert mock_create.called
+        # Should have saved all new ads in a single batch
+        mock_create.assert_called_once()
+        assert len(mock_create.call_args[0][0]) == 2
+        assert task_results['search']['success'] is True
+
+    @pytest.mark.asyncio
+    @patch('services.scheduler.get_active_searches')
+    @patch('services.scheduler.scraper')
+    @patch('services.scheduler.create_ads_bulk')
+    @patch('services.scheduler.get_existing_urls', return_value=set())
+    async def test_job_saves_ads_in_batches_as_they_arrive(
+        self, mock_existing, mock_create, mock_scraper, mock_searches
+    ):
+        """Should flush every SAVE_BATCH_SIZE ads and then the remainder"""
+        from services.scheduler import job_search_new_ads_async, task_results
+        from services.exceptions import NetworkError
+
+        mock_searches.return_value = [{
+            'id': 1,
+            'name': 'Test Search',
+            'base_url': 'https://olx.com.br/games',
+            'queries': '[]',
+            'categories': '[]',
+            'exclude_keywords': '[]',
+            'active': True
+        }]
+        urls = [f'https://olx.com.br/ad-{i}' for i in range(6)]
+        mock_scraper.build_search_url.return_value = 'https://olx.com.br/games'
+        mock_scraper.get_ad_urls_async = AsyncMock(return_value=urls)
+
+        async def get_info(url):
+            if url.endswith('-5'):
+                raise NetworkError("timeout")
+            ad = MagicMock()
+            ad.url, ad.title, ad.price, ad.images = url, 'Ad', '100', []
+            return ad
+
+        mock_scraper.get_ad_info_async = AsyncMock(side_effect=get_info)
+        mock_create.side_effect = lambda rows: {row['url']: i for i, row in enumerate(rows)}
+
+        with patch('services.scheduler.SAVE_BATCH_SIZE', 2):
+            await job_search_new_ads_async()
+
+        assert [len(call.args[0]) for call in mock_create.call_args_list] == [2, 2, 1]
+        assert task_results['search'] == {'success': True, 'total_new': 5}
+
+    @pytest.mark.asyncio
+    @patch('services.scheduler.get_active_searches')
+    @patch('services.scheduler.scraper')
+    @patch('services.scheduler.create_ads_bulk')
+    @patch('services.scheduler.get_existing_urls', return_value=set())
+    async def test_job_fetches_queries_in_parallel(
+        self, mock_existing, mock_create, mock_scraper, mock_searches
+    ):
+        """Should merge URLs of all queries and skip the ones that fail"""
+        from services.scheduler import job_search_new_ads_async, task_results
+        from services.exceptions import NetworkError
+
+        mock_searches.return_value = [{
+            'id': 1,
+            'name': 'Test Search',
+            'base_url': 'https://olx.com.br/games',
+            'queries': '["nintendo", "xbox", "sega"]',
+            'categories': '[]',
+            'exclude_keywords': '[]',
+            'active': True
+        }]
+        mock_scraper.build_search_url.side_effect = lambda base, q: f'{base}?q={q}'
+        pages = {
+            'https://olx.com.br/games?q=nintendo': ['https://olx.com.br/ad-1', 'https://olx.com.br/ad-2'],
+            'https://olx.com.br/games?q=xbox': ['https://olx.com.br/ad-2', 'https://olx.com.br/ad-3'],
+        }
+
+        async def get_urls(url, categories):
+            if url not in pages:
+                raise NetworkError("timeout")
+            return pages[url]
+
+        mock_scraper.get_ad_urls_async = AsyncMock(side_effect=get_urls)
+        mock_scraper.get_ad_info_async = AsyncMock(return_value=None)
+        mock_scraper.close = AsyncMock()
+
+        await job_search_new_ads_async()
+
+        assert mock_scraper.get_ad_urls_async.await_count == 3
+        assert set(mock_existing.call_args[0][0]) == {
+            'https://olx.com.br/ad-1', 'https://olx.com.br/ad-2', 'https://olx.com.br/ad-3'
+        }
         assert task_results['search']['success'] is True
 
 
@@ -237,17 +610,20 @@ class TestJobCheckPricesAsync:
     """Tests for async price check job"""
 
     @pytest.mark.asyncio
+    @patch('services.scheduler.get_triggerable_price_alerts', return_value=[])
     @patch('services.scheduler.get_watching_ads')
     @patch('services.scheduler.scraper')
-    @patch('services.scheduler.get_last_price_check')
-    @patch('services.scheduler.add_price_history')
-    @patch('services.scheduler.update_ad_price')
+    @patch('services.scheduler.get_last_price_checks')
+    @patch('services.scheduler.add_price_history_bulk')
+    @patch('services.scheduler.update_ad_prices_bulk')
     @patch('services.scheduler.notify_price_drop')
     async def test_job_detects_price_changes(
-        self, mock_notify, mock_update, mock_history, mock_last, mock_scraper, mock_watching
+        self, mock_notify, mock_update, mock_history, mock_last, mock_scraper, mock_watching, mock_alerts
     ):
         """Should detect and record price changes"""
-        from services.scheduler import job_check_prices_async, running_tasks, task_results, clear_logs
+        from services.scheduler import (
+            job_check_prices_async, running_tasks, task_results, clear_logs, _notify_executor
+        )
 
         clear_logs()
         running_tasks['price_check'] = False
@@ -266,15 +642,38 @@ class TestJobCheckPricesAsync:
         mock_scraper.close = AsyncMock()
 
         # Last price was different
-        mock_last.return_value = {'price': '1500,00'}
+        mock_last.return_value = {1: '1500,00'}
 
         await job_check_prices_async()
 
         # Should have updated price
-        mock_update.assert_called_once_with(1, '1200,00')
-        mock_history.assert_called()
+        mock_update.assert_called_once_with([(1, '1200,00')])
+        mock_history.assert_called_once_with([(1, '1200,00')])
+        # Price drop notification goes out on the notifier thread
+        _notify_executor.submit(lambda: None).result()
+        mock_notify.assert_called_once_with(
+            'Nintendo Switch', '1500,00', '1200,00', 'https://olx.com.br/ad-1', None, ad_id=1
+        )
         assert task_results['price_check']['success'] is True
 
+    @patch('services.scheduler.mark_alert_triggered')
+    @patch('services.scheduler.notify_price_alert')
+    @patch('services.scheduler.get_triggerable_price_alerts')
+    def test_check_price_alerts_fires_reached_targets(self, mock_alerts, mock_notify, mock_mark):
+        """Should notify and mark every alert the database reports as reached"""
+        from services.scheduler import _check_price_alerts, _notify_executor
+
+        mock_alerts.return_value = [{
+            'title': 'Switch', 'url': 'https://olx.com.br/a', 'images': '["https://img/1.jpg"]',
+            'notify_below': 1, 'triggered_at': None, 'ad_id': 1, 'price': '900,00', 'target_price': 1000.0
+        }]
+
+        assert _check_price_alerts() == 1
+        _notify_executor.submit(lambda: None).result()  # drain the notifier thread
+        mock_notify.assert_called_once_with('Switch', '900,00', 1000.0, 'https://olx.com.br/a',
+                                            'https://img/1.jpg', ad_id=1)
+        mock_mark.assert_called_once_with(1)
+
 
 class TestJobCheckAdStatusAsync:
     """Tests for async ad status check job"""
@@ -282,7 +681,7 @@ class TestJobCheckAdStatusAsync:
     @pytest.mark.asyncio
     @patch('services.scheduler.get_ads_to_check')
     @patch('services.scheduler.scraper')
-    @patch('services.scheduler.update_ad_status')
+    @patch('services.scheduler.update_ads_status_bulk')
     async def test_job_marks_inactive_ads(
         self, mock_update, mock_scraper, mock_ads
     ):
@@ -305,6 +704,57 @@ class TestJobCheckAdStatusAsync:
         await job_check_ad_status_async()
 
         # Should have marked ad 2 as inactive
-        mock_update.assert_called_once_with(2, 'inactive')
+        mock_update.assert_called_once_with([(2, 'inactive')])
         assert task_results['status_check']['success'] is True
         assert task_results['status_check']['deactivated'] == 1
+
+    @pytest.mark.asyncio
+    @patch('services.scheduler.get_ads_to_check')
+    @patch('services.scheduler.scraper')
+    @patch('services.scheduler.update_ads_status_bulk')
+    async def test_job_checks_ads_page_by_page(
+        self, mock_update, mock_scraper, mock_ads
+    ):
+        """Should load the next page after the last ad and save each page's result"""
+        from services.scheduler import job_check_ad_status_async, task_results
+
+        pages = [
+            [{'id': 1, 'url': 'https://olx.com.br/ad-1'}, {'id': 2, 'url': 'https://olx.com.br/ad-2'}],
+            [{'id': 3, 'url': 'https://olx.com.br/ad-3'}],
+        ]
+        mock_ads.side_effect = pages
+        mock_scraper.check_ad_status_async = AsyncMock(side_effect=['inactive', 'active', 'inactive'])
+
+        with patch('services.scheduler.STATUS_CHECK_PAGE_SIZE', 2):
+            await job_check_ad_status_async()
+
+        assert mock_ads.call_args_list[1].kwargs == {'limit': 2, 'after': pages[0][-1]}
+        assert mock_update.call_args_list[0].args == ([(1, 'inactive')],)
+        assert mock_update.call_args_list[1].args == ([(3, 'inactive')],)
+        assert task_results['status_check'] == {'success': True, 'deactivated': 2}
+
+    @pytest.mark.asyncio
+    @patch('services.scheduler.get_ads_to_check')
+    @patch('services.scheduler.scraper')
+    @patch('services.scheduler.update_ads_status_bulk')
+    async def test_job_propagates_cancellation(
+        self, mock_update, mock_scraper, mock_ads
+    ):
+        """A cancelled check stops the job instead of counting as a failed ad"""
+        import asyncio
+        from services.scheduler import job_check_ad_status_async, running_tasks
+
+        running_tasks['status_check'] = False
+        mock_ads.return_value = [
+            {'id': 1, 'url': 'https://olx.com.br/ad-1'},
+            {'id': 2, 'url': 'https://olx.com.br/ad-2'},
+        ]
+        mock_scraper.check_ad_status_async = AsyncMock(
+            side_effect=['inactive', asyncio.CancelledError()]
+        )
+        mock_scraper.close = AsyncMock()
+
+        with pytest.raises(asyncio.CancelledError):
+            await job_check_ad_status_async()
+
+        mock_update.assert_not_called()
@@ -5,7 +5,7 @@ Tests for OLX scraper - parsing and async HTTP operations
 import pytest
 from aioresponses import aioresponses
 
-from services.scraper import OlxScraper, filter_urls_by_keywords
+from services.scraper import OlxScraper, filter_urls_by_keywords, get_shared_scraper, SHARED_CONNECTOR_OPTIONS
 
 
 class TestOlxScraperUrlParsing:
@@ -181,6 +181,17 @@ class TestOlxScraperAsync:
         await scraper.close()
 
 
+class TestSharedScraper:
+    """Tests for the long-lived scraper used by the UI"""
+
+    def test_returns_same_instance(self):
+        """Should reuse one scraper (and its pool) across calls"""
+        scraper = get_shared_scraper()
+
+        assert get_shared_scraper() is scraper
+        assert scraper._connector_options == SHARED_CONNECTOR_OPTIONS
+
+
 class TestFilterUrlsByKeywords:
     """Tests for URL exclusion filter"""
 
@@ -0,0 +1,52 @@
+"""
+Tests for the watching page - filter refresh debounce
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+pytest.importorskip("nicegui")
+
+
+class TestFilterRefresh:
+    """Tests for debounced filter refreshes"""
+
+    @pytest.fixture
+    def page(self):
+        with patch('pages.watching.AdModal'):
+            from pages.watching import WatchingPage
+            page = WatchingPage()
+        page.container = MagicMock()
+        page.grid = MagicMock()
+        page.empty_state = MagicMock()
+        return page
+
+    @patch('pages.watching.get_watching_ads', return_value=[])
+    @patch('pages.watching.ui')
+    def test_identical_debounced_events_query_once(self, mock_ui, mock_get_ads, page):
+        """Re-selecting the same filter value should not run the query again"""
+        timers = []
+        mock_ui.timer.side_effect = lambda delay, callback, once: timers.append(callback) or MagicMock()
+
+        page._set_state('SP')
+        timers[-1]()
+        page._set_state('SP')
+        timers[-1]()
+
+        assert len(timers) == 2
+        mock_get_ads.assert_called_once_with(min_price=None, max_price=None, state='SP', with_history=True)
+
+    @patch('pages.watching.get_watching_ads', return_value=[])
+    @patch('pages.watching.ui')
+    def test_changed_filter_and_forced_refresh_query_again(self, mock_ui, mock_get_ads, page):
+        """A new filter value or refresh(force=True) should skip the guard"""
+        timers = []
+        mock_ui.timer.side_effect = lambda delay, callback, once: timers.append(callback) or MagicMock()
+
+        page._set_state('SP')
+        timers[-1]()
+        page._set_state('RJ')
+        timers[-1]()
+        page.refresh(force=True)
+
+        assert mock_get_ads.call_count == 3